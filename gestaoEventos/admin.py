@@ -1,17 +1,66 @@
+from django.conf import settings
 from django.contrib import admin
 from django.contrib.auth.models import User, Group
+from django.contrib.admin.views.main import ORDER_VAR
 from django.contrib.auth.admin import UserAdmin, GroupAdmin
-from .models import Evento, Atividade, UserEventos, Perfil
-from .utils import render_to_pdf # Importe sua função utilitária
+from django.http import FileResponse
+from django.urls import reverse
+from django.utils.html import format_html
+from .perfilador import formatar
+from .models import Evento, Atividade, UserEventos, Perfil, TarefaRelatorio, PerfilExecucao
+from .relatorios import render_relatorio
+from .certificados import gerar_certificados
+from . import busca, inscricoes, tarefas
 from django.contrib import messages #exibir mensagens
 
 
+def selecao_grande(ids):
+    return len(ids) > getattr(settings, 'RELATORIOS_LIMITE_SINCRONO', 200)
+
+
+def enfileirar_com_link(request, tipo, parametros, arquivo='PDF'):
+    """Coloca a tarefa na fila e mostra no admin o link para acompanhá-la."""
+    tarefa = tarefas.enfileirar(tipo, parametros, request.user)
+    url = reverse('admin:gestaoEventos_tarefarelatorio_change', args=[tarefa.pk])
+    messages.info(request, format_html(
+        'Seleção grande: o {} será gerado em segundo plano. Acompanhe a <a href="{}">tarefa #{}</a>.',
+        arquivo, url, tarefa.pk
+    ))
+
+
+def gerar_ou_enfileirar(request, tipo, ids, titulo):
+    """
+    Gera o PDF na hora para seleções pequenas. Seleções grandes vão para a
+    fila de relatórios e o admin mostra o link da tarefa.
+    """
+    parametros = {'ids': list(ids), 'titulo': titulo}
+
+    if selecao_grande(parametros['ids']):
+        enfileirar_com_link(request, tipo, parametros)
+        return None
+
+    return render_relatorio(tipo, parametros)
+
+
+class BuscaTextoAdminMixin:
+    """A barra de pesquisa usa o índice textual (busca.py) em vez de LIKE em cada campo."""
+
+    def get_search_results(self, request, queryset, search_term):
+        if not search_term.strip():
+            return super().get_search_results(request, queryset, search_term)
+        resultado = busca.filtrar(queryset, search_term)
+        # Os mais relevantes primeiro, a não ser que uma coluna tenha sido escolhida para ordenar
+        if not request.GET.get(ORDER_VAR):
+            resultado = resultado.order_by('-relevancia', '-pk')
+        return resultado, False
+
+
 # 1. Configuração do Admin de EVENTOS
 @admin.register(Evento)
-class EventoAdmin(admin.ModelAdmin):
-    list_display = ('nome', 'data_inicio', 'data_fim', 'local') # O que aparece na lista
+class EventoAdmin(BuscaTextoAdminMixin, admin.ModelAdmin):
+    list_display = ('nome', 'data_inicio', 'data_fim', 'local', 'capacidade') # O que aparece na lista
     list_filter = ('local', 'data_inicio')                      # <--- FILTROS LATERAIS
-    search_fields = ('nome', 'descricao')                       # Barra de pesquisa
+    search_fields = ('nome', 'descricao', 'local')              # Barra de pesquisa (índice de busca.py)
 
     # 1. nome da função abaixo
     actions = ['gerar_pdf_eventos']
@@ -19,22 +68,17 @@ class EventoAdmin(admin.ModelAdmin):
     # 2. A função da ação 
     @admin.action(description='Gerar Relatório PDF dos Selecionados')
     def gerar_pdf_eventos(self, request, queryset):
-        from .utils import render_to_pdf  
-        
-        context = {
-            'eventos': queryset,
-            'titulo': 'Relatório de Eventos Selecionados'
-        }
-        return render_to_pdf('relatorios/relatorio_eventos.html', context)
+        ids = queryset.values_list('pk', flat=True)
+        return gerar_ou_enfileirar(request, 'eventos', ids, 'Relatório de Eventos Selecionados')
     
 
 
 # 2. Configuração do Admin de ATIVIDADES
 @admin.register(Atividade)
-class AtividadeAdmin(admin.ModelAdmin):
+class AtividadeAdmin(BuscaTextoAdminMixin, admin.ModelAdmin):
     list_display = ('titulo', 'evento', 'tipo', 'horario_inicio', 'responsavel')
     list_filter = ('evento', 'tipo', 'responsavel')             # <--- FILTRA POR EVENTO OU TIPO
-    search_fields = ('titulo',)
+    search_fields = ('titulo', 'descricao')
 
     # 1. nome da função abaixo
     actions = ['gerar_pdf_atividades']
@@ -42,18 +86,9 @@ class AtividadeAdmin(admin.ModelAdmin):
     # 2. A função da ação
     @admin.action(description='Gerar Relatório PDF dos Selecionados')
     def gerar_pdf_atividades(self, request, queryset):
-        from .utils import render_to_pdf  
-        
-        # 1. select_related: Carrega evento e responsável para não travar o banco no loop do PDF
-        # 2. order_by: Garante que a lista saia em ordem cronológica
-        atividades = queryset.select_related('evento', 'responsavel').order_by('horario_inicio')
-        
-        context = {
-            'atividades': atividades, 
-            'titulo': 'Relatório de Atividades Selecionadas'
-        }
-        
-        return render_to_pdf('relatorios/relatorio_atividades.html', context)
+        # O relatório já faz select_related de evento/responsável e ordena por horário
+        ids = queryset.values_list('pk', flat=True)
+        return gerar_ou_enfileirar(request, 'atividades', ids, 'Relatório de Atividades Selecionadas')
 
 
 # 3. Configuração do Admin de INSCRIÇÕES (UserEventos)
@@ -64,34 +99,62 @@ class UserEventosAdmin(admin.ModelAdmin):
     search_fields = ('user__username', 'evento__nome')
 
         # 1. nome da função abaixo
-    actions = ['gerar_pdf_inscricoes', 'gerar_certificados']
+    actions = ['gerar_pdf_inscricoes', 'gerar_certificados', 'gerar_certificados_zip',
+               'confirmar_inscricoes', 'marcar_pendentes']
 
     # 2. A função da ação
     @admin.action(description='Gerar Relatório PDF dos Selecionados')
     def gerar_pdf_inscricoes(self, request, queryset):
-        from .utils import render_to_pdf  
-        
-        context = {'inscricoes': queryset, 'titulo': 'Relatório de Inscrições'}
-        return render_to_pdf('relatorios/relatorio_inscricoes.html', context)
+        ids = queryset.values_list('pk', flat=True)
+        return gerar_ou_enfileirar(request, 'inscricoes', ids, 'Relatório de Inscrições')
 
     @admin.action(description='Gerar Certificados (Apenas Confirmados)')
     def gerar_certificados(self, request, queryset):
         # 1. Filtra apenas quem tem status 'C' (Confirmado)
         # Ajuste o 'C' se no seu model for outra letra
-        inscricoes_validas = queryset.filter(status='C').select_related('user', 'evento')
+        ids = list(queryset.filter(status='C').values_list('pk', flat=True))
         
         # 2. Verificação de segurança
-        if not inscricoes_validas.exists():
+        if not ids:
             # Mostra um erro no topo da tela se ninguém for apto
             messages.error(request, "Nenhuma inscrição selecionada possui status 'Confirmado'.")
             return None
     
         # 3. Gera o PDF
-        context = {
-            'inscricoes': inscricoes_validas,
-            'titulo': 'Certificado de Participação'
-        }
-        return render_to_pdf('relatorios/certificado.html', context)
+        return gerar_ou_enfileirar(request, 'certificados', ids, 'Certificado de Participação')
+
+    @admin.action(description='Gerar Certificados Individuais (ZIP)')
+    def gerar_certificados_zip(self, request, queryset):
+        # Um PDF por participante, renderizados em paralelo (ver certificados.py)
+        ids = list(queryset.filter(status='C').values_list('pk', flat=True))
+        if not ids:
+            messages.error(request, "Nenhuma inscrição selecionada possui status 'Confirmado'.")
+            return None
+
+        # Seleções grandes não prendem a requisição (nem o pool de processos): vão para a fila
+        if selecao_grande(ids):
+            enfileirar_com_link(request, 'certificados_zip', {'ids': ids}, arquivo='ZIP')
+            return None
+
+        arquivo, _ = gerar_certificados(
+            UserEventos.objects.filter(pk__in=ids), formato='zip',
+            workers=getattr(settings, 'CERTIFICADOS_WORKERS', 2),
+        )
+        return FileResponse(arquivo, as_attachment=True, filename='certificados.zip',
+                            content_type='application/zip')
+
+    # Mudança de status em massa: um UPDATE por lote, não um save() por linha
+    @admin.action(description='Confirmar inscrições selecionadas')
+    def confirmar_inscricoes(self, request, queryset):
+        resultado = inscricoes.alterar_status(queryset, 'C')
+        messages.success(request, f"{resultado['atualizadas']} inscrição(ões) confirmada(s).")
+        if resultado['sem_vaga']:
+            messages.warning(request, f"{resultado['sem_vaga']} inscrição(ões) sem vaga no evento (capacidade).")
+
+    @admin.action(description='Marcar inscrições selecionadas como pendentes')
+    def marcar_pendentes(self, request, queryset):
+        resultado = inscricoes.alterar_status(queryset, 'P')
+        messages.success(request, f"{resultado['atualizadas']} inscrição(ões) marcada(s) como pendente(s).")
 
 
 # 4. Configuração do Admin de PERFIL (Opcional)
@@ -108,60 +171,73 @@ class PerfilAdmin(admin.ModelAdmin):
     # 2. A função da ação
     @admin.action(description='Gerar Relatório PDF dos Selecionados')
     def gerar_pdf_perfil(self, request, queryset):
-        from .utils import render_to_pdf  
-        
         # 1. Extrai apenas os IDs dos usuários ligados aos perfis selecionados
-        user_ids = queryset.values_list('user_id', flat=True)
-
-        # Busca os objetos User completos
         # Isso garante que o template receba "User" e não "Perfil"
-        users = User.objects.filter(id__in=user_ids).prefetch_related(
-            'perfil',
-            'usereventos_set__evento',
-            'atividades_responsavel'
-        )
+        user_ids = queryset.values_list('user_id', flat=True)
 
-        # 3. Reutiliza o mesmo HTML
-        context = {
-            'participantes': users,  # A variável tem que chamar 'participantes' para bater com o HTML
-            'titulo': 'Relatório de Perfis Selecionados'
-        }
-        
-        return render_to_pdf('relatorios/relatorio_participantes.html', context)
+        # 2. Reutiliza o mesmo relatório de participantes
+        return gerar_ou_enfileirar(request, 'participantes', user_ids, 'Relatório de Perfis Selecionados')
     
 
 # --- Ação para USUÁRIOS ---
 @admin.action(description='Gerar PDF de Usuários (Detalhado)')
 def gerar_pdf_usuarios(modeladmin, request, queryset):
-    # Otimização: Traz Perfil, Inscrições (com evento) e Atividades Responsáveis
-    users = queryset.select_related('perfil').prefetch_related(
-        'perfil',
-        'usereventos_set__evento',
-        'atividades_responsavel'  
-    )
-    
-    context = {
-        'participantes': users, 
-        'titulo': 'Relatório de Usuários Selecionados'
-    }
-
-    return render_to_pdf('relatorios/relatorio_participantes.html', context)
+    # O relatório traz Perfil, Inscrições (com evento) e Atividades Responsáveis
+    ids = queryset.values_list('pk', flat=True)
+    return gerar_ou_enfileirar(request, 'participantes', ids, 'Relatório de Usuários Selecionados')
 
 # --- Ação para GRUPOS ---
 @admin.action(description='Gerar PDF de Grupos (Detalhado)')
 def gerar_pdf_grupos(modeladmin, request, queryset):
-    # Otimização: Carrega usuários, inscrições (e seus eventos) e atividades que o usuário é dono
-    grupos = queryset.prefetch_related(
-        'user_set',                           # Traz os usuários do grupo
-        'user_set__usereventos_set__evento',  # Traz os eventos onde o usuário se inscreveu
-        'user_set__atividades_responsavel'             # Traz as atividades onde o usuário é responsável
-    )
-    
-    context = {
-        'grupos': grupos, 
-        'titulo': 'Relatório Detalhado de Grupos'
-    }
-    return render_to_pdf('relatorios/relatorio_grupos.html', context)
+    # O relatório carrega usuários, inscrições (e seus eventos) e atividades que o usuário é dono
+    ids = queryset.values_list('pk', flat=True)
+    return gerar_ou_enfileirar(request, 'grupos', ids, 'Relatório Detalhado de Grupos')
+
+
+# 5. Configuração do Admin da FILA DE RELATÓRIOS
+@admin.register(TarefaRelatorio)
+class TarefaRelatorioAdmin(admin.ModelAdmin):
+    list_display = ('id', 'tipo', 'status', 'solicitante', 'criado_em', 'concluido_em', 'link_download')
+    list_filter = ('status', 'tipo')
+    readonly_fields = ('tipo', 'parametros', 'status', 'arquivo', 'erro', 'solicitante',
+                       'criado_em', 'iniciado_em', 'concluido_em', 'link_download')
+
+    # As tarefas são criadas pelos relatórios, não manualmente
+    def has_add_permission(self, request):
+        return False
+
+    @admin.display(description='PDF')
+    def link_download(self, obj):
+        if obj.status != 'C':
+            return '-'
+        url = reverse('relatorio_tarefa_download', args=[obj.pk])
+        return format_html('<a href="{}" target="_blank"><i class="fas fa-file-pdf"></i> Baixar</a>', url)
+
+
+# 6. Perfis de execução (?perfilar=1 nas rotas, ver perfilador.py)
+@admin.register(PerfilExecucao)
+class PerfilExecucaoAdmin(admin.ModelAdmin):
+    list_display = ('caminho', 'view', 'status', 'duracao_ms', 'queries', 'sql_ms', 'areas', 'usuario', 'criado_em')
+    list_filter = ('view',)
+    # Os mais lentos primeiro (só os PERFILADOR_MAX mais recentes ficam guardados)
+    ordering = ('-duracao_ms',)
+    fields = ('caminho', 'view', 'status', 'duracao_ms', 'usuario', 'criado_em', 'relatorio_formatado')
+    readonly_fields = fields
+
+    # Os perfis são gravados pelo middleware, não manualmente
+    def has_add_permission(self, request):
+        return False
+
+    def has_change_permission(self, request, obj=None):
+        return False
+
+    @admin.display(description='Tempo por área (ms)')
+    def areas(self, obj):
+        return ', '.join(f'{area} {ms:.0f}' for area, ms in list(obj.por_area.items())[:3])
+
+    @admin.display(description='Relatório (pstats, tempo acumulado)')
+    def relatorio_formatado(self, obj):
+        return format_html('<pre style="font-size: 11px">{}</pre>', formatar(obj))
 
 
 # Desregistra o admin original
@@ -5,3 +5,7 @@ class GestaoeventosConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'gestaoEventos'
     verbose_name = 'Gestão de Eventos' # nome que aparece no menu
+
+    def ready(self):
+        # Registra os signals (versões das tabelas, caches)
+        from . import signals  # noqa: F401
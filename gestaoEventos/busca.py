@@ -0,0 +1,211 @@
+import re
+from abc import ABC, abstractmethod
+from functools import reduce
+from operator import and_, or_
+
+from django.conf import settings
+from django.db import connection
+from django.db.models import BooleanField, Expression, FloatField, Q, Value
+from django.utils.module_loading import import_string
+from rest_framework.filters import BaseFilterBackend
+
+from .models import Atividade, Evento, IndiceBuscaAtividade, IndiceBuscaEvento
+from . import versoes
+
+# ---------------------------------------------------------
+# Busca textual em eventos e atividades
+# ---------------------------------------------------------
+# O search_fields do admin vira LIKE '%termo%' em cada campo: varre a tabela
+# inteira. No SQLite a busca usa índices FTS5 (tabelas virtuais criadas na
+# migração 0011), uma por model, com o id do registro como rowid. O
+# resultado vem com a anotação `relevancia` (bm25, maior = melhor; o título
+# pesa mais que a descrição).
+#
+# Os índices são mantidos pelos signals (post_save/post_delete). Quem grava
+# em massa (bulk_create/update) chama reconstruir() no final, como já faz
+# com estatisticas.recalcular(); o comando reconstruir_busca faz o mesmo.
+#
+# Outros bancos usam BUSCA_BACKEND (caminho de uma subclasse de
+# BackendBusca); sem isso, caem no BuscaLike (icontains, sem ranking).
+
+
+class Indice:
+    def __init__(self, modelo, tabela_modelo, campos, pesos):
+        self.modelo = modelo
+        # Model não gerenciado da tabela FTS5 (relação `indice_busca` a partir de `modelo`)
+        self.tabela_modelo = tabela_modelo
+        self.tabela = tabela_modelo._meta.db_table
+        self.campos = campos
+        # Peso de cada campo no bm25, na mesma ordem de `campos`
+        self.pesos = pesos
+
+
+INDICES = {
+    Evento: Indice(Evento, IndiceBuscaEvento, ('nome', 'descricao', 'local'), (10.0, 1.0, 4.0)),
+    Atividade: Indice(Atividade, IndiceBuscaAtividade, ('titulo', 'descricao'), (10.0, 1.0)),
+}
+
+# Palavras usadas de cada termo (o resto é ignorado)
+MAX_PALAVRAS = 10
+_PALAVRAS = re.compile(r'\w+')
+
+
+def palavras(termo):
+    return _PALAVRAS.findall(termo)[:MAX_PALAVRAS]
+
+
+class BackendBusca(ABC):
+    """Interface dos backends: manter o índice e filtrar/ordenar um queryset."""
+
+    def indexar(self, modelo, objetos):
+        pass
+
+    def remover(self, modelo, ids):
+        pass
+
+    def reconstruir(self):
+        pass
+
+    @abstractmethod
+    def filtrar(self, queryset, termo):
+        """`queryset` só com os registros que batem com `termo`, anotado com `relevancia`."""
+
+
+class BuscaLike(BackendBusca):
+    """Sem índice: icontains em todos os campos (cada palavra em algum campo)."""
+
+    def filtrar(self, queryset, termo):
+        indice = INDICES[queryset.model]
+        condicoes = [
+            reduce(or_, [Q(**{f'{campo}__icontains': palavra}) for campo in indice.campos])
+            for palavra in palavras(termo)
+        ]
+        if not condicoes:
+            return queryset.none()
+        return queryset.filter(reduce(and_, condicoes)).annotate(relevancia=Value(0.0, output_field=FloatField()))
+
+
+class SqlDoIndice(Expression):
+    """
+    SQL que cita a tabela FTS5 (MATCH, bm25) pelo alias do JOIN na query. Ao
+    contrário de um RawSQL com o nome fixo, acompanha a troca de aliases que o
+    Django faz quando o queryset vira subquery (relabeled_clone).
+
+    A coluna oculta do FTS5 tem sempre o nome da tabela: com alias ela é
+    "alias"."tabela" (só "alias" não existe como coluna).
+    """
+
+    def __init__(self, alias, tabela, template, params=(), output_field=None):
+        super().__init__(output_field=output_field)
+        self.alias = alias
+        self.tabela = tabela
+        self.template = template
+        self.params = list(params)
+
+    def relabeled_clone(self, change_map):
+        clone = self.copy()
+        clone.alias = change_map.get(self.alias, self.alias)
+        return clone
+
+    def as_sql(self, compiler, connection):
+        coluna = f'{connection.ops.quote_name(self.alias)}.{connection.ops.quote_name(self.tabela)}'
+        return self.template.format(tabela=coluna), self.params
+
+
+class BuscaFTS5(BackendBusca):
+    """Índices FTS5 do SQLite (tokenizer unicode61 sem acentos: "sessao" acha "Sessão")."""
+
+    def indexar(self, modelo, objetos):
+        indice = INDICES.get(modelo)
+        if indice is None:
+            return
+        linhas = [(objeto.pk, *(getattr(objeto, campo) for campo in indice.campos)) for objeto in objetos]
+        if not linhas:
+            return
+        colunas = ', '.join(indice.campos)
+        marcadores = ', '.join(['%s'] * (len(indice.campos) + 1))
+        with connection.cursor() as cursor:
+            cursor.executemany(f'DELETE FROM {indice.tabela} WHERE rowid = %s', [(linha[0],) for linha in linhas])
+            cursor.executemany(f'INSERT INTO {indice.tabela} (rowid, {colunas}) VALUES ({marcadores})', linhas)
+
+    def remover(self, modelo, ids):
+        indice = INDICES.get(modelo)
+        if indice is None:
+            return
+        with connection.cursor() as cursor:
+            cursor.executemany(f'DELETE FROM {indice.tabela} WHERE rowid = %s', [(pk,) for pk in ids])
+
+    def reconstruir(self):
+        with connection.cursor() as cursor:
+            for indice in INDICES.values():
+                colunas = ', '.join(indice.campos)
+                origem = indice.modelo._meta
+                cursor.execute(f'DELETE FROM {indice.tabela}')
+                cursor.execute(
+                    f'INSERT INTO {indice.tabela} (rowid, {colunas}) '
+                    f'SELECT {origem.pk.column}, {colunas} FROM {connection.ops.quote_name(origem.db_table)}'
+                )
+                # Junta os segmentos do índice (deixa as próximas buscas mais rápidas)
+                cursor.execute(f"INSERT INTO {indice.tabela} ({indice.tabela}) VALUES ('optimize')")
+
+    def filtrar(self, queryset, termo):
+        indice = INDICES[queryset.model]
+        # Cada palavra entre aspas (sem operadores do FTS5) e como prefixo: "conf" acha "Conferência"
+        consulta = ' '.join(f'"{palavra}"*' for palavra in palavras(termo))
+        if not consulta:
+            return queryset.none()
+
+        pesos = ', '.join(str(peso) for peso in indice.pesos)
+        # O JOIN com a tabela do índice (relação indice_busca, rowid = id) faz o SQLite partir do
+        # MATCH e calcular o bm25 uma vez por resultado. Um "pk IN (...)" + subquery correlacionada
+        # para o bm25 refazia o MATCH para cada linha (quadrático com muitos resultados).
+        queryset = queryset.filter(indice_busca__isnull=False)
+        # O alias só é o nome da tabela no primeiro JOIN dela: procura o que liga a tabela base ao índice
+        query = queryset.query
+        alias = next(
+            alias for alias, join in query.alias_map.items()
+            if join.table_name == indice.tabela and join.parent_alias == query.base_table
+        )
+        return queryset.filter(
+            SqlDoIndice(alias, indice.tabela, '{tabela} MATCH %s', [consulta], output_field=BooleanField()),
+        ).annotate(
+            # bm25 é negativo (menor = melhor): invertido para ordenar por -relevancia
+            relevancia=SqlDoIndice(alias, indice.tabela, f'-bm25({{tabela}}, {pesos})', output_field=FloatField()),
+        )
+
+
+def backend():
+    caminho = getattr(settings, 'BUSCA_BACKEND', None)
+    if caminho:
+        return import_string(caminho)()
+    return BuscaFTS5() if connection.vendor == 'sqlite' else BuscaLike()
+
+
+def filtrar(queryset, termo):
+    """Registros de `queryset` que batem com `termo`, anotados com `relevancia`."""
+    return backend().filtrar(queryset, termo)
+
+
+def reconstruir():
+    """Refaz todos os índices a partir das tabelas (depois de cargas em massa)."""
+    backend().reconstruir()
+    # O resultado do ?search= pode mudar: invalida os ETags/cache das listagens
+    versoes.invalidar(versoes.EVENTO, versoes.ATIVIDADE)
+
+
+class BuscaTextoFilter(BaseFilterBackend):
+    """?search=termo nas ViewSets de Evento/Atividade (a paginação ordena pela relevância)."""
+    parametro = 'search'
+
+    def filter_queryset(self, request, queryset, view):
+        termo = request.query_params.get(self.parametro, '').strip()
+        return filtrar(queryset, termo) if termo else queryset
+
+    def get_schema_operation_parameters(self, view):
+        return [{
+            'name': self.parametro,
+            'required': False,
+            'in': 'query',
+            'description': 'Busca textual; resultados ordenados pela relevância.',
+            'schema': {'type': 'string'},
+        }]
@@ -0,0 +1,95 @@
+import functools
+import hashlib
+import json
+
+from django.conf import settings
+from django.core.cache import caches
+from django.utils.cache import get_conditional_response
+from rest_framework.response import Response
+
+from . import versoes
+
+# ---------------------------------------------------------
+# Cache HTTP das leituras da API (ETag + GET condicional)
+# ---------------------------------------------------------
+# Mesmo esquema dos PDFs (cache_relatorios.py): o ETag é o hash do endereço
+# pedido + versões das tabelas que a resposta usa (versoes.py, mantidas pelos
+# signals). Se o cliente manda o mesmo ETag em If-None-Match, a resposta é
+# 304 sem executar queryset nem serializer. Senão, os dados serializados são
+# procurados no cache API_CACHE (um alias de CACHES): a expiração e a
+# política de expulsão são as do backend configurado lá (TIMEOUT,
+# MAX_ENTRIES/CULL_FREQUENCY do LocMemCache, LRU do Redis...). Como a chave
+# muda junto com os dados, não existe invalidação explícita.
+#
+# Só vale para respostas JSON: a API navegável (HTML) mostra o usuário logado.
+
+
+def _cache():
+    """Cache das respostas (None se o alias não estiver em CACHES: só o 304 funciona)."""
+    alias = getattr(settings, 'API_CACHE', 'api')
+    if alias not in settings.CACHES:
+        return None
+    return caches[alias]
+
+
+def calcular_etag(request, tabelas):
+    versoes_atuais, ultima_alteracao = versoes.obter(*tabelas)
+    conteudo = json.dumps(
+        {
+            'url': request.build_absolute_uri(),
+            'versoes': versoes_atuais,
+            # Versões voltam a valores antigos se o banco for restaurado: a data evita colisão
+            'alteracao': ultima_alteracao,
+        },
+        sort_keys=True, default=str,
+    )
+    return hashlib.sha256(conteudo.encode('utf-8')).hexdigest()
+
+
+def com_cache_http(metodo):
+    """
+    Decora uma action de leitura de uma ViewSet com `tabelas_cache`
+    ({action: tabelas de que a resposta depende}).
+    """
+    @functools.wraps(metodo)
+    def wrapper(self, request, *args, **kwargs):
+        tabelas = getattr(self, 'tabelas_cache', {}).get(self.action)
+        if not tabelas or request.method != 'GET' or request.accepted_renderer.format != 'json':
+            return metodo(self, request, *args, **kwargs)
+
+        versao = calcular_etag(request, tabelas)
+        etag = f'"{versao}"'
+        nao_modificado = get_conditional_response(request, etag=etag)
+        if nao_modificado is not None:
+            return nao_modificado
+
+        cache = _cache()
+        chave = f'gestaoEventos:api:{versao}'
+        dados = cache.get(chave) if cache is not None else None
+        if dados is not None:
+            resposta = Response(dados)
+        else:
+            resposta = metodo(self, request, *args, **kwargs)
+            if resposta.status_code != 200:
+                return resposta
+            if cache is not None:
+                cache.set(chave, resposta.data)
+
+        resposta['ETag'] = etag
+        # Dados públicos, mas o cliente revalida sempre (If-None-Match)
+        resposta['Cache-Control'] = 'no-cache'
+        return resposta
+    return wrapper
+
+
+class CacheHttpMixin:
+    """ETag/304 e cache de respostas para list/retrieve (ver com_cache_http)."""
+    tabelas_cache = {}
+
+    @com_cache_http
+    def list(self, request, *args, **kwargs):
+        return super().list(request, *args, **kwargs)
+
+    @com_cache_http
+    def retrieve(self, request, *args, **kwargs):
+        return super().retrieve(request, *args, **kwargs)
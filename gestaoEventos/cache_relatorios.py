@@ -0,0 +1,80 @@
+import hashlib
+import json
+import os
+import shutil
+import tempfile
+from pathlib import Path
+
+from django.conf import settings
+
+# ---------------------------------------------------------
+# Cache em disco dos PDFs de relatório
+# ---------------------------------------------------------
+# A chave é o hash do tipo + parâmetros + versões das tabelas envolvidas
+# (endereçamento por conteúdo): quando algum dado muda a chave muda junto,
+# então não existe invalidação explícita de arquivo. Os arquivos antigos
+# saem por LRU quando o diretório passa de RELATORIOS_CACHE_MAX_BYTES.
+
+
+def _diretorio():
+    diretorio = Path(getattr(settings, 'RELATORIOS_CACHE_DIR', Path(settings.BASE_DIR) / 'cache' / 'relatorios'))
+    diretorio.mkdir(parents=True, exist_ok=True)
+    return diretorio
+
+
+def ativo():
+    return getattr(settings, 'RELATORIOS_CACHE_ATIVO', True)
+
+
+def calcular_chave(tipo, parametros, versoes):
+    conteudo = json.dumps(
+        {'tipo': tipo, 'parametros': parametros or {}, 'versoes': versoes},
+        sort_keys=True, default=str,
+    )
+    return hashlib.sha256(conteudo.encode('utf-8')).hexdigest()
+
+
+def buscar(chave):
+    """Caminho do PDF em cache (ou None). Um acerto renova a posição do arquivo no LRU."""
+    caminho = _diretorio() / f'{chave}.pdf'
+    try:
+        os.utime(caminho)
+    except FileNotFoundError:
+        return None
+    return caminho
+
+
+def guardar(chave, arquivo):
+    """Copia o PDF gerado para o cache e aplica o limite de tamanho. Devolve o caminho."""
+    diretorio = _diretorio()
+    destino = diretorio / f'{chave}.pdf'
+
+    # Escreve em um temporário e renomeia: quem estiver lendo nunca vê um PDF pela metade
+    with tempfile.NamedTemporaryFile(dir=diretorio, suffix='.tmp', delete=False) as temporario:
+        arquivo.seek(0)
+        shutil.copyfileobj(arquivo, temporario)
+    os.replace(temporario.name, destino)
+
+    despejar()
+    return destino
+
+
+def despejar(limite=None):
+    """Remove os PDFs usados há mais tempo até o diretório caber no limite."""
+    limite = limite if limite is not None else getattr(settings, 'RELATORIOS_CACHE_MAX_BYTES', 200 * 1024 * 1024)
+    arquivos = []
+    total = 0
+    for entrada in os.scandir(_diretorio()):
+        if entrada.is_file() and entrada.name.endswith('.pdf'):
+            info = entrada.stat()
+            arquivos.append((info.st_mtime, info.st_size, entrada.path))
+            total += info.st_size
+
+    for _, tamanho, caminho in sorted(arquivos):
+        if total <= limite:
+            break
+        try:
+            os.remove(caminho)
+        except FileNotFoundError:
+            pass
+        total -= tamanho
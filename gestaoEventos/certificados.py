@@ -0,0 +1,121 @@
+import time
+import zipfile
+from concurrent.futures import ProcessPoolExecutor
+from io import BytesIO
+
+from django.db import connections
+from django.template.loader import get_template
+from xhtml2pdf import pisa
+
+from .models import UserEventos
+from .utils import JuntadorPdf, arquivo_temporario
+
+# ---------------------------------------------------------
+# Emissão de certificados em massa
+# ---------------------------------------------------------
+# Cada certificado é renderizado separadamente (um pisa por participante),
+# espalhado por um pool de processos. O processo principal lê o banco uma
+# vez só e manda para os workers apenas dicionários simples, então os
+# workers não abrem conexão com o banco. O resultado é um PDF único
+# (formato 'pdf') ou um ZIP com um PDF por participante (formato 'zip').
+
+TEMPLATE_CERTIFICADO = 'relatorios/certificado.html'
+
+# Template compilado uma vez por processo (preenchido em _inicializar_worker)
+_template = None
+
+
+def _carregar_template():
+    global _template
+    _template = get_template(TEMPLATE_CERTIFICADO)
+
+
+def _inicializar_worker():
+    # O worker não usa o banco. A conexão herdada no fork é a mesma do processo
+    # principal: close() encerraria a sessão dele também, então só é esquecida
+    for conexao in connections.all(initialized_only=True):
+        conexao.connection = None
+    _carregar_template()
+
+
+def _renderizar(dados):
+    """Roda no worker: gera o PDF de um único certificado e devolve (id, username, bytes)."""
+    if _template is None:
+        _carregar_template()  # sem pool (workers=0): roda no processo principal
+    html = _template.render({'inscricoes': [dados], 'titulo': 'Certificado de Participação'})
+    resultado = BytesIO()
+    pdf = pisa.pisaDocument(html, resultado, encoding='UTF-8')
+    if pdf.err:
+        raise RuntimeError(f'Erro ao gerar o certificado #{dados["id"]}')
+    return dados['id'], dados['user']['username'], resultado.getvalue()
+
+
+def carregar_dados(inscricoes):
+    """
+    Monta os dados de cada certificado em uma única query
+    (a carga horária já vem gravada no evento).
+    """
+    inscricoes = inscricoes.filter(status='C').select_related('user', 'evento').order_by('evento_id', 'id')
+
+    return [
+        {
+            'id': inscricao.id,
+            'user': {
+                'username': inscricao.user.username,
+                'first_name': inscricao.user.first_name,
+                'last_name': inscricao.user.last_name,
+            },
+            'evento': {
+                'nome': inscricao.evento.nome,
+                'data_inicio': inscricao.evento.data_inicio,
+                'carga_horaria_total': inscricao.evento.carga_horaria_total,
+            },
+        }
+        for inscricao in inscricoes
+    ]
+
+
+def _certificados(dados, workers):
+    """Gera os certificados em ordem, no pool (workers > 0) ou no próprio processo."""
+    if workers <= 0 or len(dados) <= 1:
+        yield from map(_renderizar, dados)
+        return
+    # chunksize agrupa vários certificados por ida ao worker, reduzindo o custo de IPC
+    chunksize = max(1, min(50, len(dados) // (workers * 4)))
+    with ProcessPoolExecutor(max_workers=workers, initializer=_inicializar_worker) as pool:
+        yield from pool.map(_renderizar, dados, chunksize=chunksize)
+
+
+def gerar_certificados(inscricoes=None, formato='pdf', workers=2):
+    """
+    Gera os certificados das inscrições confirmadas de `inscricoes` (queryset).
+    Devolve (arquivo temporário posicionado no início, estatísticas).
+    """
+    if formato not in ('pdf', 'zip'):
+        raise ValueError("O formato deve ser 'pdf' ou 'zip'.")
+    if inscricoes is None:
+        inscricoes = UserEventos.objects.all()
+
+    inicio = time.perf_counter()
+    dados = carregar_dados(inscricoes)
+    arquivo = arquivo_temporario()
+
+    if formato == 'zip':
+        with zipfile.ZipFile(arquivo, 'w', compression=zipfile.ZIP_DEFLATED) as pacote:
+            for inscricao_id, username, conteudo in _certificados(dados, workers):
+                pacote.writestr(f'certificado_{inscricao_id}_{username}.pdf', conteudo)
+    else:
+        # Cada certificado vai direto para o arquivo: na memória fica um PDF por vez
+        juntador = JuntadorPdf(arquivo)
+        for _, _, conteudo in _certificados(dados, workers):
+            juntador.adicionar(BytesIO(conteudo))
+        juntador.finalizar()
+
+    segundos = time.perf_counter() - inicio
+    arquivo.seek(0)
+    estatisticas = {
+        'total': len(dados),
+        'segundos': round(segundos, 2),
+        'por_segundo': round(len(dados) / segundos, 2) if segundos else 0,
+    }
+    return arquivo, estatisticas
@@ -0,0 +1,182 @@
+from datetime import timedelta
+
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.db import transaction
+from django.db.models import Count, DurationField, F, Q, Sum
+from django.db.models.functions import TruncDate
+from django.utils import timezone
+
+from .models import Atividade, Contador, EstatisticaEvento, Evento, UserEventos
+from . import versoes
+
+# ---------------------------------------------------------
+# Estatísticas do dashboard do admin
+# ---------------------------------------------------------
+# Os totais ficam em tabelas próprias (Contador e EstatisticaEvento) e são
+# ajustados pelos signals a cada inscrição/evento/usuário criado ou removido,
+# então o dashboard lê poucos registros, independente do volume de dados.
+# Na frente disso fica um cache, limpo sempre que algum contador muda.
+#
+# As inscrições só mexem na linha do próprio evento (EstatisticaEvento): um
+# contador geral seria uma linha única atualizada por todas as inscrições ao
+# mesmo tempo. O total de confirmadas é a SUM das linhas por evento: uma
+# query sobre uma linha por evento (não por inscrição), feita só quando o
+# cache do dashboard está vazio.
+#
+# Operações em massa (update()/bulk_create()) não disparam signals: depois
+# delas chame recalcular() (ou o comando `recalcular_estatisticas`).
+
+EVENTOS = 'eventos'
+INSCRICOES_CONFIRMADAS = 'inscricoes_confirmadas'
+USUARIOS = 'usuarios'
+
+CHAVE_CACHE = 'gestaoEventos:dashboard_stats'
+
+
+def limpar_cache():
+    # Só limpa depois do commit, para ninguém recolocar no cache um valor antigo
+    transaction.on_commit(lambda: cache.delete(CHAVE_CACHE))
+
+
+def somar(chave, delta):
+    if not delta:
+        return
+    if not Contador.objects.filter(chave=chave).update(valor=F('valor') + delta):
+        # Contador ainda não existe (banco novo): calcula tudo do zero
+        recalcular()
+    limpar_cache()
+
+
+def somar_inscricao(evento_id, delta_total, delta_confirmadas):
+    """Ajusta os contadores de um evento."""
+    if delta_total or delta_confirmadas:
+        atualizadas = EstatisticaEvento.objects.filter(evento_id=evento_id).update(
+            total_inscricoes=F('total_inscricoes') + delta_total,
+            total_confirmadas=F('total_confirmadas') + delta_confirmadas,
+        )
+        if not atualizadas:
+            # A contagem a partir das inscrições já inclui esta mudança
+            criar_contador_evento(evento_id)
+    limpar_cache()
+
+
+def criar_contador_evento(evento_id):
+    # Sem linha de contador (evento criado por bulk_create): cria a partir das inscrições
+    totais = UserEventos.objects.filter(evento_id=evento_id).aggregate(
+        total=Count('id'), confirmadas=Count('id', filter=Q(status='C')),
+    )
+    EstatisticaEvento.objects.get_or_create(
+        evento_id=evento_id,
+        defaults={'total_inscricoes': totais['total'], 'total_confirmadas': totais['confirmadas']},
+    )
+
+
+def criar_evento(evento_id):
+    EstatisticaEvento.objects.get_or_create(evento_id=evento_id)
+    somar(EVENTOS, 1)
+
+
+@transaction.atomic
+def recalcular():
+    """Reconstrói todos os contadores a partir das tabelas (poucas queries agregadas)."""
+    valores = {
+        EVENTOS: Evento.objects.count(),
+        USUARIOS: User.objects.count(),
+    }
+    for chave, valor in valores.items():
+        Contador.objects.update_or_create(chave=chave, defaults={'valor': valor})
+    # Contador geral de confirmadas das versões antigas (o total agora vem de EstatisticaEvento)
+    Contador.objects.filter(chave=INSCRICOES_CONFIRMADAS).delete()
+
+    EstatisticaEvento.objects.all().delete()
+    eventos = Evento.objects.annotate(
+        num_inscricoes=Count('usereventos'),
+        num_confirmadas=Count('usereventos', filter=Q(usereventos__status='C')),
+    ).values_list('id', 'num_inscricoes', 'num_confirmadas')
+    EstatisticaEvento.objects.bulk_create(
+        (EstatisticaEvento(evento_id=evento_id, total_inscricoes=total, total_confirmadas=confirmadas)
+         for evento_id, total, confirmadas in eventos.iterator(chunk_size=2000)),
+        batch_size=2000,
+    )
+    limpar_cache()
+    # As respostas da API com os totais dos eventos dependem destas versões
+    versoes.invalidar(versoes.INSCRICAO, versoes.EVENTO)
+    valores[INSCRICOES_CONFIRMADAS] = total_confirmadas()
+    return valores
+
+
+def total_confirmadas():
+    """SUM de EstatisticaEvento.total_confirmadas: lê uma linha por evento, nunca as inscrições."""
+    return EstatisticaEvento.objects.aggregate(total=Sum('total_confirmadas'))['total'] or 0
+
+
+def obter_dashboard():
+    """Dados do dashboard do admin (cache -> contadores)."""
+    dados = cache.get(CHAVE_CACHE)
+    if dados is not None:
+        return dados
+
+    contadores = dict(Contador.objects.values_list('chave', 'valor'))
+    populares = EstatisticaEvento.objects.select_related('evento').order_by('-total_inscricoes')[:5]
+    proximos_eventos = list(
+        Evento.objects.filter(data_inicio__gte=timezone.now()).order_by('data_inicio')[:5]
+    )
+
+    dados = {
+        'total_eventos': contadores.get(EVENTOS, 0),
+        'total_inscricoes': total_confirmadas(),
+        'total_usuarios': contadores.get(USUARIOS, 0),
+        'proximos_eventos': proximos_eventos,
+        'chart_labels': [e.evento.nome for e in populares],
+        'chart_data': [e.total_inscricoes for e in populares],
+    }
+    # Os próximos eventos dependem da hora atual: o cache também expira sozinho
+    cache.set(CHAVE_CACHE, dados, getattr(settings, 'DASHBOARD_CACHE_SEGUNDOS', 60))
+    return dados
+
+
+# ---------------------------------------------------------
+# Agregações da API (/api/eventos/estatisticas/)
+# ---------------------------------------------------------
+# Calculadas na hora pelo banco (GROUP BY) sobre os filtros pedidos: a
+# resposta traz só os totais, nunca as linhas.
+
+def _horas(duracao):
+    return round(duracao.total_seconds() / 3600, 2) if duracao else 0
+
+
+def agregar(inscricoes, atividades):
+    """
+    Totais de um conjunto de inscrições e de atividades (querysets já filtrados):
+    inscrições por status e por dia, atividades e horas por tipo. Três queries.
+    """
+    por_status = dict(inscricoes.order_by().values_list('status').annotate(total=Count('id')))
+
+    por_tipo = {}
+    horas = timedelta(0)
+    duracao = Sum(F('horario_fim') - F('horario_inicio'), output_field=DurationField())
+    for tipo, total, soma in atividades.order_by().values_list('tipo').annotate(total=Count('id'), soma=duracao):
+        por_tipo[tipo] = {'total': total, 'horas': _horas(soma)}
+        horas += soma or timedelta(0)
+
+    por_dia = (
+        inscricoes.annotate(dia=TruncDate('data_inscricao')).values_list('dia')
+        .annotate(total=Count('id')).order_by('dia')
+    )
+
+    return {
+        'inscricoes': {
+            'total': sum(por_status.values()),
+            'por_status': {codigo: por_status.get(codigo, 0) for codigo, _ in UserEventos.status_inscrito},
+        },
+        'atividades': {
+            'total': sum(item['total'] for item in por_tipo.values()),
+            'horas': _horas(horas),
+            'por_tipo': {
+                codigo: por_tipo.get(codigo, {'total': 0, 'horas': 0}) for codigo, _ in Atividade.tipo_atividade
+            },
+        },
+        'inscricoes_por_dia': [{'dia': dia, 'total': total} for dia, total in por_dia],
+    }
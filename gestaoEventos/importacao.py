@@ -0,0 +1,318 @@
+import csv
+import gzip
+import os
+from concurrent.futures import ProcessPoolExecutor
+from functools import partial
+
+from django.contrib.auth.hashers import PBKDF2PasswordHasher, make_password
+from django.contrib.auth.models import User
+from django.db import transaction
+from django.utils import timezone
+from django.utils.dateparse import parse_datetime
+
+from .models import Evento, Atividade, Perfil, UserEventos, CheckpointImportacao
+from . import busca, estatisticas, versoes
+
+# ---------------------------------------------------------
+# Importação em massa (comando importar_dados --em-massa)
+# ---------------------------------------------------------
+# Em vez de get_or_create linha a linha, cada lote de linhas do CSV vira
+# poucas queries: os mapas de busca (username -> id, nome do evento -> id,
+# ...) são carregados uma vez por tabela e as gravações usam bulk_create.
+# As regras são as mesmas do modo linha a linha: usuários, eventos,
+# atividades e inscrições que já existem não são alterados; o perfil
+# (tipo/celular) e os grupos são sempre atualizados.
+#
+# bulk_create não dispara signals nem Perfil.save(): por isso os grupos são
+# gravados por Perfil.objects.atribuir_grupos() e, ao final, as versões das
+# tabelas e os contadores do dashboard são atualizados (finalizar()).
+#
+# Os arquivos são lidos em streaming (nunca inteiros na memória), aceitam
+# .csv.gz e cada lote é gravado na mesma transação que o checkpoint do
+# arquivo (posição em bytes): se a importação cair, --retomar continua do
+# último lote gravado.
+
+
+# Iterações do PBKDF2 no modo --senha-rapida (bases de teste/homologação).
+# O hash continua sendo pbkdf2_sha256 válido: no primeiro login o Django
+# percebe que há menos iterações que o padrão e refaz o hash sozinho.
+ITERACOES_SENHA_RAPIDA = 1000
+
+
+# -----------------------------------------------------------
+# Leitura em streaming e checkpoints
+# -----------------------------------------------------------
+
+def localizar_arquivo(diretorio, nome):
+    """Caminho de `nome` (ou `nome`.gz) em `diretorio`, ou None."""
+    for candidato in (nome, f'{nome}.gz'):
+        caminho = os.path.join(diretorio, candidato)
+        if os.path.exists(caminho):
+            return os.path.abspath(caminho)
+    return None
+
+
+def abrir_csv(caminho):
+    """Abre o CSV em modo binário (os offsets são em bytes), descompactando .gz."""
+    if caminho.endswith('.gz'):
+        return gzip.open(caminho, 'rb')
+    return open(caminho, 'rb')
+
+
+def ler_lotes(arquivo, colunas, tamanho, posicao=0):
+    """
+    Lê o CSV aberto por abrir_csv() a partir do byte `posicao`, em lotes de até
+    `tamanho` linhas (pula as incompletas). Devolve (lote, posição logo depois do lote).
+    """
+    # Em .gz o seek descompacta até a posição: é lento, mas só acontece ao retomar
+    arquivo.seek(posicao)
+    lidos = [posicao]
+
+    def linhas_texto():
+        for linha in arquivo:
+            lidos[0] += len(linha)
+            yield linha.decode('utf-8')
+
+    # O csv.reader só pede a próxima linha quando precisa: depois de cada registro,
+    # lidos[0] aponta exatamente para o fim dele (mesmo com campos de várias linhas)
+    lote = []
+    for row in csv.reader(linhas_texto()):
+        if len(row) >= colunas:
+            lote.append(row[:colunas])
+        if len(lote) >= tamanho:
+            yield lote, lidos[0]
+            lote = []
+    if lote:
+        yield lote, lidos[0]
+
+
+def _assinatura(caminho):
+    info = os.stat(caminho)
+    return f'{info.st_size}:{info.st_mtime_ns}'
+
+
+def obter_checkpoint(caminho, retomar=False):
+    """
+    Checkpoint do arquivo. Sem `retomar`, ou se o arquivo mudou desde a última
+    importação, começa do zero.
+    """
+    assinatura = _assinatura(caminho)
+    checkpoint, criado = CheckpointImportacao.objects.get_or_create(
+        arquivo=caminho, defaults={'assinatura': assinatura},
+    )
+    if not criado and (not retomar or checkpoint.assinatura != assinatura):
+        checkpoint.assinatura = assinatura
+        checkpoint.posicao = checkpoint.linhas = 0
+        checkpoint.concluido = False
+        checkpoint.save()
+    return checkpoint
+
+
+def _data(texto):
+    # Datas sem fuso no CSV valem no fuso do projeto (o mesmo que o Django assumiria,
+    # mas sem o aviso de "naive datetime" a cada linha)
+    data = parse_datetime(texto)
+    if data is None:
+        raise ValueError(f'Data inválida: {texto}')
+    return timezone.make_aware(data) if timezone.is_naive(data) else data
+
+
+def _hash_senha(senha, rapida=False):
+    if rapida:
+        hasher = PBKDF2PasswordHasher()
+        return hasher.encode(senha, hasher.salt(), iterations=ITERACOES_SENHA_RAPIDA)
+    return make_password(senha)
+
+
+def gerar_hashes(senhas, pool=None, workers=1, rapida=False):
+    """
+    Hash de cada senha, na mesma ordem. Com `pool`, o PBKDF2 roda nos processos
+    do pool (`workers` é o tamanho dele, usado para dividir o lote).
+    """
+    funcao = partial(_hash_senha, rapida=rapida)
+    if pool is None or len(senhas) <= 1:
+        return [funcao(senha) for senha in senhas]
+    # Pedaços grandes o bastante para diluir o custo de IPC, pequenos o bastante para dividir o lote
+    chunksize = max(1, min(100, len(senhas) // (workers * 4)))
+    return list(pool.map(funcao, senhas, chunksize=chunksize))
+
+
+class ImportadorEmMassa:
+    """
+    Usar como context manager quando `workers_senha` > 0, para encerrar o pool:
+
+        with ImportadorEmMassa(workers_senha=4) as importador:
+            importador.importar_usuarios(linhas)
+    """
+
+    def __init__(self, tamanho_lote=1000, workers_senha=0, senha_rapida=False):
+        self.tamanho_lote = tamanho_lote
+        self.senha_rapida = senha_rapida
+        self.workers_senha = workers_senha
+        self.erros = []
+        self.pool = None
+        if workers_senha > 0:
+            # Os workers só calculam hashes e nunca usam a conexão com o banco herdada
+            self.pool = ProcessPoolExecutor(max_workers=workers_senha)
+        # Mapas de busca: uma query por tabela, atualizados conforme os lotes são gravados
+        self.usuarios = dict(User.objects.values_list('username', 'id'))
+        self.eventos = {}
+        for nome, evento_id in Evento.objects.order_by('-id').values_list('nome', 'id'):
+            self.eventos[nome] = evento_id  # nomes repetidos: fica o mais antigo
+        self.atividades = set(Atividade.objects.values_list('titulo', flat=True))
+        Perfil.objects.ids_grupos()  # cria os grupos antes dos lotes
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        if self.pool is not None:
+            self.pool.shutdown()
+            self.pool = None
+
+    def erro(self, mensagem):
+        self.erros.append(mensagem)
+
+    # -----------------------------------------------------------
+    # 1. Usuários (+ Perfil e grupos)
+    # -----------------------------------------------------------
+    def importar_usuarios(self, linhas):
+        novos = {}
+        perfis = {}
+        for username, password, email, nome, tipo, celular in linhas:
+            if username not in self.usuarios and username not in novos:
+                novos[username] = User(
+                    username=username, email=email,
+                    first_name=nome.split()[0] if nome.split() else '',
+                    password=password,
+                )
+            perfis[username] = (tipo, celular)  # a última linha do usuário vale
+
+        # O hash (lento de propósito) é feito antes de abrir a transação
+        hashes = gerar_hashes(
+            [user.password for user in novos.values()], self.pool, self.workers_senha, self.senha_rapida,
+        )
+        for user, senha in zip(novos.values(), hashes):
+            user.password = senha
+
+        with transaction.atomic():
+            if novos:
+                User.objects.bulk_create(novos.values(), batch_size=self.tamanho_lote)
+                self._mapear_ids(novos)
+
+            Perfil.objects.bulk_create(
+                [Perfil(user_id=self.usuarios[username], tipo=tipo, celular=celular)
+                 for username, (tipo, celular) in perfis.items()],
+                update_conflicts=True, unique_fields=['user'], update_fields=['tipo', 'celular'],
+                batch_size=self.tamanho_lote,
+            )
+            # Versões invalidadas uma vez só, no finalizar()
+            Perfil.objects.atribuir_grupos(
+                {self.usuarios[username]: tipo for username, (tipo, _) in perfis.items()}, invalidar=False,
+            )
+        return len(novos)
+
+    def _mapear_ids(self, novos):
+        # Bancos sem RETURNING (ex.: MySQL) não preenchem o id no bulk_create
+        if any(user.pk is None for user in novos.values()):
+            self.usuarios.update(User.objects.filter(username__in=novos).values_list('username', 'id'))
+        else:
+            self.usuarios.update((username, user.pk) for username, user in novos.items())
+
+    # -----------------------------------------------------------
+    # 2. Eventos
+    # -----------------------------------------------------------
+    @transaction.atomic
+    def importar_eventos(self, linhas):
+        novos = {}
+        for nome, desc, inicio, fim, local in linhas:
+            if nome not in self.eventos and nome not in novos:
+                # Uma data inválida perde só a linha (como no modo linha a linha), não o lote
+                try:
+                    data_inicio, data_fim = _data(inicio), _data(fim)
+                except ValueError as e:
+                    self.erro(f'Erro no evento {nome}: {e}')
+                    continue
+                novos[nome] = Evento(
+                    nome=nome, descricao=desc, data_inicio=data_inicio, data_fim=data_fim, local=local,
+                )
+
+        if novos:
+            Evento.objects.bulk_create(novos.values(), batch_size=self.tamanho_lote)
+            if any(evento.pk is None for evento in novos.values()):
+                for nome, evento_id in Evento.objects.filter(nome__in=novos).order_by('-id').values_list('nome', 'id'):
+                    self.eventos[nome] = evento_id
+            else:
+                self.eventos.update((nome, evento.pk) for nome, evento in novos.items())
+        return len(novos)
+
+    # -----------------------------------------------------------
+    # 3. Atividades
+    # -----------------------------------------------------------
+    @transaction.atomic
+    def importar_atividades(self, linhas):
+        novas = {}
+        for titulo, desc, h_inicio, h_fim, tipo, nome_evento, username_resp in linhas:
+            if titulo in self.atividades or titulo in novas:
+                continue
+            evento_id = self.eventos.get(nome_evento)
+            responsavel_id = self.usuarios.get(username_resp)
+            if evento_id is None:
+                self.erro(f'Evento não achado para a atividade {titulo}: {nome_evento}')
+            elif responsavel_id is None:
+                self.erro(f'Responsável não achado para a atividade {titulo}: {username_resp}')
+            else:
+                try:
+                    horario_inicio, horario_fim = _data(h_inicio), _data(h_fim)
+                except ValueError as e:
+                    self.erro(f'Erro na atividade {titulo}: {e}')
+                    continue
+                novas[titulo] = Atividade(
+                    titulo=titulo, descricao=desc, horario_inicio=horario_inicio, horario_fim=horario_fim,
+                    tipo=tipo, evento_id=evento_id, responsavel_id=responsavel_id,
+                )
+
+        Atividade.objects.bulk_create(novas.values(), batch_size=self.tamanho_lote)
+        self.atividades.update(novas)
+        return len(novas)
+
+    # -----------------------------------------------------------
+    # 4. Inscrições (UserEventos)
+    # -----------------------------------------------------------
+    @transaction.atomic
+    def importar_inscricoes(self, linhas):
+        novas = {}
+        for username_user, nome_evento, status in linhas:
+            user_id = self.usuarios.get(username_user)
+            evento_id = self.eventos.get(nome_evento)
+            if user_id is None:
+                self.erro(f'Usuário não achado para inscrição: {username_user}')
+            elif evento_id is None:
+                self.erro(f'Evento não achado para inscrição: {nome_evento}')
+            else:
+                novas.setdefault((user_id, evento_id), status)
+
+        # Inscrições que já existem ficam como estão (mesmo efeito do get_or_create)
+        existentes = set(
+            UserEventos.objects.filter(
+                user_id__in={user_id for user_id, _ in novas},
+                evento_id__in={evento_id for _, evento_id in novas},
+            ).values_list('user_id', 'evento_id')
+        ) if novas else set()
+        inscricoes = [
+            UserEventos(user_id=user_id, evento_id=evento_id, status=status)
+            for (user_id, evento_id), status in novas.items()
+            if (user_id, evento_id) not in existentes
+        ]
+        UserEventos.objects.bulk_create(inscricoes, batch_size=self.tamanho_lote, ignore_conflicts=True)
+        return len(inscricoes)
+
+    def finalizar(self):
+        """bulk_create não dispara signals: atualiza versões, contadores, cargas horárias e a busca de uma vez."""
+        versoes.invalidar(
+            versoes.USUARIO, versoes.PERFIL, versoes.GRUPO,
+            versoes.EVENTO, versoes.ATIVIDADE, versoes.INSCRICAO,
+        )
+        estatisticas.recalcular()
+        Evento.objects.atualizar_carga_horaria()
+        busca.reconstruir()
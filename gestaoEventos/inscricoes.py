@@ -0,0 +1,263 @@
+from collections import Counter
+
+from django.contrib.auth.models import User
+from django.db import IntegrityError, transaction
+from django.db.models import Count, F, Q
+
+from .models import EstatisticaEvento, Evento, UserEventos
+from .signals import status_inscricoes_alterado
+from . import estatisticas, versoes
+
+# ---------------------------------------------------------
+# Inscrição em eventos
+# ---------------------------------------------------------
+# Feita para aguentar picos de inscrição no mesmo evento:
+#
+# - a duplicidade é resolvida pelo próprio banco (unique_together): um único
+#   INSERT, sem o SELECT de "já existe?" antes, e sem erro 500 quando duas
+#   requisições do mesmo usuário chegam juntas;
+# - a capacidade usa o contador EstatisticaEvento.total_inscricoes com um
+#   UPDATE condicional (total < capacidade): o banco trava a linha do
+#   contador, então dois pedidos simultâneos nunca ocupam a mesma vaga.
+#   Se o INSERT falhar, a transação desfaz a reserva.
+
+
+class InscricaoRecusada(Exception):
+    mensagem = 'Não foi possível fazer a inscrição.'
+
+    def __init__(self, mensagem=None):
+        super().__init__(mensagem or self.mensagem)
+
+
+class JaInscrito(InscricaoRecusada):
+    mensagem = 'Você já está inscrito neste evento.'
+
+
+class EventoLotado(InscricaoRecusada):
+    mensagem = 'Não há mais vagas neste evento.'
+
+
+def _reservar_vaga(evento, confirmada):
+    """UPDATE condicional no contador do evento: devolve True se conseguiu a vaga."""
+    contadores = EstatisticaEvento.objects.filter(evento_id=evento.pk, total_inscricoes__lt=evento.capacidade)
+    atualizacao = {'total_inscricoes': F('total_inscricoes') + 1}
+    if confirmada:
+        atualizacao['total_confirmadas'] = F('total_confirmadas') + 1
+    if contadores.update(**atualizacao):
+        return True
+
+    if not EstatisticaEvento.objects.filter(evento_id=evento.pk).exists():
+        estatisticas.criar_contador_evento(evento.pk)
+        return bool(contadores.update(**atualizacao))
+    return False
+
+
+def inscrever(user, evento, status='C'):
+    """
+    Inscreve `user` em `evento` e devolve a inscrição.
+    Levanta JaInscrito ou EventoLotado (subclasses de InscricaoRecusada).
+    """
+    inscricao = UserEventos(user=user, evento=evento, status=status)
+    try:
+        with transaction.atomic():
+            if evento.capacidade is not None:
+                if not _reservar_vaga(evento, status == 'C'):
+                    # Só no caminho da recusa: quem já está inscrito recebe o motivo certo
+                    if UserEventos.objects.filter(user=user, evento=evento).exists():
+                        raise JaInscrito()
+                    raise EventoLotado()
+                # Os contadores do evento já foram ajustados acima (ver signals.contar_inscricao)
+                inscricao._vaga_reservada = True
+            # A versão de usereventos (linha única de VersaoTabela) só sobe depois do
+            # commit (signals.invalidar_versao): a transação trava só o contador do evento
+            inscricao.save(force_insert=True)
+    except IntegrityError:
+        # Só a violação do unique (user, evento) vira JaInscrito; o resto sobe como está
+        if UserEventos.objects.filter(user=user, evento=evento).exists():
+            raise JaInscrito()
+        raise
+    return inscricao
+
+
+# ---------------------------------------------------------
+# Inscrição em lote (turmas inteiras de uma vez)
+# ---------------------------------------------------------
+
+CRIADA = 'criada'
+EXISTENTE = 'existente'
+FALHA = 'falha'
+
+
+def _travar_contador(evento_id):
+    """
+    Trava a linha do contador do evento até o fim da transação. Um UPDATE sem
+    mudança funciona em qualquer banco (no SQLite, select_for_update é ignorado)
+    e serializa o lote com as inscrições individuais, que também fazem UPDATE nela.
+    """
+    if not EstatisticaEvento.objects.filter(evento_id=evento_id).update(total_inscricoes=F('total_inscricoes')):
+        estatisticas.criar_contador_evento(evento_id)
+        EstatisticaEvento.objects.filter(evento_id=evento_id).update(total_inscricoes=F('total_inscricoes'))
+    return EstatisticaEvento.objects.get(evento_id=evento_id)
+
+
+def _inserir_lote(evento, novos, status, resultados):
+    """
+    Insere as inscrições de `novos` e devolve os ids que de fato entraram.
+    Sem ignore_conflicts, que pularia em silêncio quem outra transação inscreveu
+    depois da consulta dos existentes: num conflito, esses passam a "existente"
+    e o lote é inserido de novo sem eles.
+    """
+    while novos:
+        try:
+            with transaction.atomic():
+                UserEventos.objects.bulk_create(
+                    [UserEventos(user_id=user_id, evento=evento, status=status) for user_id in novos],
+                    batch_size=1000,
+                )
+            return novos
+        except IntegrityError:
+            outros = set(
+                UserEventos.objects.filter(evento=evento, user_id__in=novos).values_list('user_id', flat=True)
+            )
+            if not outros:
+                raise
+            novos = [user_id for user_id in novos if user_id not in outros]
+            for item in resultados:
+                if item['resultado'] == CRIADA and item['user_id'] in outros:
+                    item['resultado'] = EXISTENTE
+    return novos
+
+
+def inscrever_em_massa(evento, ids=(), usernames=(), status='C'):
+    """
+    Inscreve vários usuários (por id e/ou username) em `evento` com um número
+    fixo de queries. Devolve os totais e o resultado de cada item, na ordem
+    do pedido: criada, existente ou falha (com o motivo).
+    """
+    ids, usernames = list(ids), list(usernames)
+    # Uma query resolve ids e usernames juntos
+    por_id, por_username = {}, {}
+    for user_id, username in User.objects.filter(Q(id__in=ids) | Q(username__in=usernames)).values_list('id', 'username'):
+        por_id[user_id] = user_id
+        por_username[username] = user_id
+
+    pedidos = [('id', valor, por_id.get(valor)) for valor in ids]
+    pedidos += [('username', valor, por_username.get(valor)) for valor in usernames]
+
+    with transaction.atomic():
+        contador = _travar_contador(evento.pk)
+        existentes = set(
+            UserEventos.objects.filter(
+                evento=evento, user_id__in={user_id for _, _, user_id in pedidos if user_id}
+            ).values_list('user_id', flat=True)
+        )
+        vagas = None
+        if evento.capacidade is not None:
+            vagas = max(0, evento.capacidade - contador.total_inscricoes)
+
+        resultados = []
+        novos = []
+        for campo, valor, user_id in pedidos:
+            item = {campo: valor, 'user_id': user_id}
+            if user_id is None:
+                item.update(resultado=FALHA, motivo='Usuário não encontrado.')
+            elif user_id in existentes:
+                item.update(resultado=EXISTENTE)
+            elif vagas is not None and len(novos) >= vagas:
+                item.update(resultado=FALHA, motivo='Não há mais vagas neste evento.')
+            else:
+                item.update(resultado=CRIADA)
+                novos.append(user_id)
+                existentes.add(user_id)  # o mesmo usuário repetido no pedido conta como existente
+            resultados.append(item)
+
+        novos = _inserir_lote(evento, novos, status, resultados)
+        # bulk_create não dispara signals: ajusta contadores e versão uma vez para o lote todo
+        if novos:
+            estatisticas.somar_inscricao(evento.pk, len(novos), len(novos) if status == 'C' else 0)
+            versoes.invalidar(versoes.INSCRICAO)
+
+    totais = {CRIADA: 0, EXISTENTE: 0, FALHA: 0}
+    for item in resultados:
+        totais[item['resultado']] += 1
+    return {
+        'criadas': totais[CRIADA],
+        'existentes': totais[EXISTENTE],
+        'falhas': totais[FALHA],
+        'resultados': resultados,
+    }
+
+
+# ---------------------------------------------------------
+# Mudança de status em massa (ex.: confirmar pendentes)
+# ---------------------------------------------------------
+
+def _vagas_para_confirmar(alvo):
+    """
+    Vagas livres para confirmação em cada evento com capacidade tocado por `alvo`.
+    Trava o contador de cada evento antes (as inscrições individuais, que fazem
+    UPDATE nele, esperam o fim da transação) e conta as confirmadas nas próprias
+    inscrições: um contador desatualizado não deixa passar do limite.
+    """
+    capacidades = dict(
+        Evento.objects.filter(pk__in=alvo.values('evento_id'), capacidade__isnull=False)
+        .order_by('pk').values_list('pk', 'capacidade')
+    )
+    for evento_id in capacidades:
+        _travar_contador(evento_id)
+    confirmadas = dict(
+        UserEventos.objects.filter(evento_id__in=capacidades, status='C').order_by()
+        .values_list('evento_id').annotate(total=Count('id'))
+    )
+    return {evento_id: max(0, capacidade - confirmadas.get(evento_id, 0))
+            for evento_id, capacidade in capacidades.items()}
+
+
+def alterar_status(inscricoes, para, de=None, tamanho_lote=1000):
+    """
+    Muda para `para` o status das inscrições do queryset `inscricoes` (só as
+    que estão em `de`, se informado), com um UPDATE por lote de ids. No final
+    envia um único signal status_inscricoes_alterado, em vez de um post_save
+    por linha. Confirmações respeitam a capacidade do evento: as que não cabem
+    ficam como estão e entram em `sem_vaga`.
+    Devolve {'atualizadas': n, 'sem_vaga': n, 'por_evento': {evento_id: n}}.
+    """
+    alvo = inscricoes.exclude(status=para)
+    if de is not None:
+        alvo = alvo.filter(status=de)
+
+    atualizadas = Counter()
+    confirmadas = Counter()
+    sem_vaga = 0
+    ultimo_id = 0
+    with transaction.atomic():
+        # A validação da capacidade e os UPDATEs ficam na mesma transação, com os contadores travados
+        vagas = _vagas_para_confirmar(alvo) if para == 'C' else {}
+        while True:
+            # Percorre por id (keyset), travando as linhas do lote até o UPDATE
+            lote = list(
+                alvo.filter(pk__gt=ultimo_id).order_by('pk').select_for_update()
+                .values_list('pk', 'evento_id', 'status')[:tamanho_lote]
+            )
+            if not lote:
+                break
+            ultimo_id = lote[-1][0]
+
+            ids = []
+            for pk, evento_id, anterior in lote:
+                if evento_id in vagas:
+                    if not vagas[evento_id]:
+                        sem_vaga += 1
+                        continue
+                    vagas[evento_id] -= 1
+                ids.append(pk)
+                atualizadas[evento_id] += 1
+                confirmadas[evento_id] += (para == 'C') - (anterior == 'C')
+            if ids:
+                UserEventos.objects.filter(pk__in=ids).update(status=para)
+
+        total = sum(atualizadas.values())
+        status_inscricoes_alterado.send(
+            sender=UserEventos, para=para, total=total, confirmadas_por_evento=dict(confirmadas),
+        )
+    return {'atualizadas': total, 'sem_vaga': sem_vaga, 'por_evento': dict(atualizadas)}
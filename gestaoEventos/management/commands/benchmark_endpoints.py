@@ -0,0 +1,224 @@
+import json
+import statistics
+import time
+import tracemalloc
+from pathlib import Path
+
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.test import Client
+from django.test.utils import CaptureQueriesContext, override_settings
+from django.utils import timezone
+
+from gestaoEventos.models import Atividade, EstatisticaEvento, TarefaRelatorio, UserEventos
+from gestaoEventos.sinteticos import GeradorSintetico
+
+# Rotas GET de projeto/urls.py medidas ({evento}, {atividade}, {user} e {tarefa} são substituídos).
+# Ficam de fora o admin, a documentação, o token e o download da tarefa (precisa do PDF pronto).
+ROTAS = (
+    '/api/eventos/',
+    '/api/eventos/{evento}/',
+    '/api/eventos/{evento}/atividades/',
+    '/api/eventos/{evento}/participantes/',
+    '/api/eventos/{evento}/dashboard/',
+    '/api/eventos/{evento}/estatisticas/',
+    '/api/eventos/dashboard/',
+    '/api/eventos/estatisticas/',
+    '/api/atividades/',
+    '/api/atividades/{atividade}/',
+    '/api/participantes/',
+    '/api/participantes/{user}/',
+    '/relatorios/eventos/',
+    '/relatorios/atividades/',
+    '/relatorios/participantes/',
+    '/relatorios/inscricoes/',
+    '/relatorios/grupos/geral/',
+    '/relatorios/tarefas/{tarefa}/',
+)
+
+USUARIO_BENCHMARK = 'benchmark_endpoints'
+
+
+def percentil(valores, p):
+    ordenados = sorted(valores)
+    return ordenados[min(len(ordenados) - 1, int(len(ordenados) * p / 100))]
+
+
+class Command(BaseCommand):
+    help = (
+        'Mede cada rota da API e dos relatórios (queries, tempo p50/p95/p99 e pico de memória), grava o '
+        'resultado em JSON e compara com uma base salva: regressões fazem o comando falhar.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--inscricoes', type=int, default=20_000,
+                            help='Se o banco tiver menos inscrições que isso, gera dados sintéticos até chegar lá')
+        parser.add_argument('--repeticoes', type=int, default=10, help='Requisições medidas por rota da API')
+        parser.add_argument('--repeticoes-relatorios', type=int, default=2,
+                            help='Requisições medidas por relatório (cada uma gera o PDF inteiro)')
+        parser.add_argument('--saida', default=str(Path(settings.BASE_DIR) / 'benchmarks' / 'endpoints.json'),
+                            help='Arquivo JSON com os resultados')
+        parser.add_argument('--base', default=str(Path(settings.BASE_DIR) / 'benchmarks' / 'endpoints_base.json'),
+                            help='Resultados de referência para a comparação')
+        parser.add_argument('--salvar-base', action='store_true', help='Grava os resultados também como a nova base')
+        parser.add_argument('--tolerancia', type=float, default=0.5,
+                            help='Aumento aceito no tempo (p50) e na memória em relação à base (0.5 = 50%%)')
+        parser.add_argument('--folga-ms', type=float, default=5,
+                            help='Diferenças de tempo menores que isso (ms) nunca contam como regressão')
+        parser.add_argument('--com-cache', action='store_true',
+                            help='Mantém o cache de respostas da API e dos PDFs (por padrão mede sem eles)')
+        parser.add_argument('--rota', action='append', help='Mede só esta rota (pode repetir)')
+
+    def handle(self, *args, **options):
+        faltam = options['inscricoes'] - UserEventos.objects.count()
+        if faltam > 0:
+            self.stdout.write(f'Gerando {faltam} inscrições sintéticas...')
+            qtd_eventos = max(20, faltam // 1000)
+            # Usuários suficientes para caber as inscrições (no máximo uma por usuário e evento)
+            qtd_usuarios = max(faltam // 20, -(-faltam // qtd_eventos))
+            GeradorSintetico(prefixo=f'bendp{time.time_ns()}').gerar(
+                usuarios=qtd_usuarios, eventos=qtd_eventos, atividades=qtd_eventos * 5, inscricoes=faltam,
+            )
+
+        # O django.test.Client usa o host "testserver"
+        configuracao = {'ALLOWED_HOSTS': [*settings.ALLOWED_HOSTS, 'testserver']}
+        if not options['com_cache']:
+            # Sem os caches de resposta, mede o caminho completo (queries + serialização/PDF)
+            configuracao.update(API_CACHE=None, RELATORIOS_CACHE_ATIVO=False)
+        try:
+            urls = self.montar_urls(options['rota'])
+            with override_settings(**configuracao):
+                resultados = {
+                    rota: self.medir(url, options['repeticoes_relatorios' if rota.startswith('/relatorios/') else 'repeticoes'])
+                    for rota, url in urls.items()
+                }
+        finally:
+            TarefaRelatorio.objects.filter(solicitante__username=USUARIO_BENCHMARK).delete()
+            User.objects.filter(username=USUARIO_BENCHMARK).delete()
+
+        self.relatar(resultados)
+        dados = {
+            'gerado_em': timezone.now().isoformat(),
+            'banco': connection.vendor,
+            'inscricoes': UserEventos.objects.count(),
+            'com_cache': options['com_cache'],
+            'rotas': resultados,
+        }
+        self.gravar(options['saida'], dados)
+        if options['salvar_base']:
+            self.gravar(options['base'], dados)
+            return
+        self.comparar(resultados, options)
+
+    # -----------------------------------------------------------
+    # Rotas e medição
+    # -----------------------------------------------------------
+    def montar_urls(self, filtro):
+        rotas = [rota for rota in ROTAS if not filtro or rota in filtro]
+        if filtro and len(rotas) != len(set(filtro)):
+            raise CommandError(f'Rotas desconhecidas: {", ".join(sorted(set(filtro) - set(ROTAS)))}')
+
+        # O evento mais procurado: as rotas aninhadas pegam o maior volume
+        estatistica = EstatisticaEvento.objects.order_by('-total_inscricoes').first()
+        atividade = Atividade.objects.order_by('id').first()
+        inscricao = UserEventos.objects.order_by('id').first()
+        if estatistica is None or atividade is None or inscricao is None:
+            raise CommandError('O banco precisa de ao menos um evento, uma atividade e uma inscrição.')
+
+        self.usuario, _ = User.objects.get_or_create(
+            username=USUARIO_BENCHMARK, defaults={'is_staff': True, 'is_superuser': True},
+        )
+        tarefa = TarefaRelatorio.objects.create(tipo='eventos', solicitante=self.usuario)
+
+        valores = {'evento': estatistica.evento_id, 'atividade': atividade.pk, 'user': inscricao.user_id, 'tarefa': tarefa.pk}
+        return {rota: rota.format(**valores) for rota in rotas}
+
+    def medir(self, url, repeticoes):
+        cliente = Client()
+        cliente.force_login(self.usuario)
+
+        # A primeira requisição (fora da medição de tempo) aquece imports, templates e o
+        # planejador do banco e mede o pico de memória: o tracemalloc deixa tudo mais lento
+        tracemalloc.start()
+        try:
+            self.requisitar(cliente, url)
+            _, pico = tracemalloc.get_traced_memory()
+        finally:
+            tracemalloc.stop()
+
+        tempos = []
+        for _ in range(max(1, repeticoes)):
+            with CaptureQueriesContext(connection) as contexto:
+                inicio = time.perf_counter()
+                self.requisitar(cliente, url)
+                tempos.append((time.perf_counter() - inicio) * 1000)
+
+        resultado = {
+            'queries': len(contexto.captured_queries),
+            'p50_ms': round(statistics.median(tempos), 2),
+            'p95_ms': round(percentil(tempos, 95), 2),
+            'p99_ms': round(percentil(tempos, 99), 2),
+            'max_ms': round(max(tempos), 2),
+            'pico_memoria_kb': round(pico / 1024),
+        }
+        self.stdout.write(f'{url}: {resultado["queries"]} queries, p50 {resultado["p50_ms"]} ms')
+        return resultado
+
+    def requisitar(self, cliente, url):
+        # Accept JSON: o navegável (HTML) da API não é o que os clientes usam
+        resposta = cliente.get(url, HTTP_ACCEPT='application/json')
+        if resposta.status_code != 200:
+            raise CommandError(f'{url} respondeu {resposta.status_code}.')
+        if resposta.streaming:
+            for _ in resposta.streaming_content:
+                pass
+        resposta.close()
+
+    # -----------------------------------------------------------
+    # Resultado e comparação
+    # -----------------------------------------------------------
+    def relatar(self, resultados):
+        self.stdout.write(self.style.MIGRATE_HEADING('Resultados'))
+        self.stdout.write(f'{"rota":<42} {"queries":>7} {"p50":>9} {"p95":>9} {"p99":>9} {"memória":>10}')
+        for rota, r in resultados.items():
+            self.stdout.write(
+                f'{rota:<42} {r["queries"]:>7} {r["p50_ms"]:>7.1f}ms {r["p95_ms"]:>7.1f}ms '
+                f'{r["p99_ms"]:>7.1f}ms {r["pico_memoria_kb"]:>8}KB'
+            )
+
+    def gravar(self, caminho, dados):
+        caminho = Path(caminho)
+        caminho.parent.mkdir(parents=True, exist_ok=True)
+        caminho.write_text(json.dumps(dados, indent=2, ensure_ascii=False), encoding='utf-8')
+        self.stdout.write(f'Resultados gravados em {caminho}')
+
+    def comparar(self, resultados, options):
+        caminho = Path(options['base'])
+        if not caminho.exists():
+            self.stdout.write(self.style.WARNING(f'Sem base em {caminho}: rode com --salvar-base para criar uma.'))
+            return
+        base = json.loads(caminho.read_text(encoding='utf-8'))['rotas']
+        limite = 1 + options['tolerancia']
+
+        regressoes = []
+        for rota, atual in resultados.items():
+            anterior = base.get(rota)
+            if anterior is None:
+                continue
+            # Queries: qualquer aumento é regressão (o número não depende da máquina)
+            if atual['queries'] > anterior['queries']:
+                regressoes.append(f'{rota}: {anterior["queries"]} -> {atual["queries"]} queries')
+            if atual['p50_ms'] > anterior['p50_ms'] * limite and atual['p50_ms'] - anterior['p50_ms'] > options['folga_ms']:
+                regressoes.append(f'{rota}: p50 {anterior["p50_ms"]} -> {atual["p50_ms"]} ms')
+            if atual['pico_memoria_kb'] > anterior['pico_memoria_kb'] * limite:
+                regressoes.append(
+                    f'{rota}: memória {anterior["pico_memoria_kb"]} -> {atual["pico_memoria_kb"]} KB'
+                )
+
+        if regressoes:
+            for regressao in regressoes:
+                self.stdout.write(self.style.ERROR(regressao))
+            raise CommandError(f'{len(regressoes)} regressão(ões) em relação a {caminho}.')
+        self.stdout.write(self.style.SUCCESS(f'Nenhuma regressão em relação a {caminho}.'))
@@ -0,0 +1,159 @@
+import statistics
+import time
+from contextlib import contextmanager
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.utils import timezone
+
+from gestaoEventos.models import Evento, Atividade, Perfil, UserEventos
+from gestaoEventos.sinteticos import GeradorSintetico
+
+# Modelos cujos índices (Meta.indexes) entram na comparação antes/depois
+MODELOS = (Evento, Atividade, Perfil, UserEventos)
+
+
+def consultas():
+    """
+    Consultas dos caminhos mais usados (dashboard, listagens paginadas, relatórios,
+    importação e certificados). Devolve {nome: (queryset, contar)}: com `contar`
+    o tempo medido é o do .count(), senão o da lista.
+    """
+    evento = Evento.objects.order_by('id').values('id', 'nome').first()
+    agora = timezone.now()
+    return {
+        'proximos_eventos': (Evento.objects.filter(data_inicio__gte=agora).order_by('data_inicio')[:5], False),
+        'lista_eventos': (Evento.objects.order_by('data_inicio', 'id')[:50], False),
+        'evento_por_nome': (Evento.objects.filter(nome=evento['nome']), False),
+        'atividades_do_evento': (
+            Atividade.objects.filter(evento_id=evento['id']).order_by('horario_inicio', 'id')[:50], False,
+        ),
+        'lista_atividades': (Atividade.objects.order_by('horario_inicio', 'id')[:50], False),
+        'inscricoes_recentes': (UserEventos.objects.order_by('-data_inscricao', '-id')[:50], False),
+        'certificados_do_evento': (
+            UserEventos.objects.filter(evento_id=evento['id'], status='C').order_by('id')[:50], False,
+        ),
+        'certificados_em_massa': (
+            UserEventos.objects.filter(status='C').order_by('evento_id', 'id')[:50], False,
+        ),
+        'confirmadas_do_evento': (UserEventos.objects.filter(evento_id=evento['id'], status='C').values('id'), True),
+        'total_confirmadas': (UserEventos.objects.filter(status='C').values('id'), True),
+        'perfis_organizadores': (Perfil.objects.filter(tipo='O').values('user_id'), True),
+    }
+
+
+class Command(BaseCommand):
+    help = (
+        'Compara plano de execução e tempo das consultas mais usadas sem e com os índices '
+        'dos modelos (remove e recria os índices e gera dados: só com --confirmar, em DEBUG)'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--inscricoes', type=int, default=1_000_000,
+                            help='Se o banco tiver menos inscrições que isso, gera dados sintéticos até chegar lá')
+        parser.add_argument('--repeticoes', type=int, default=5,
+                            help='Execuções de cada consulta (vale a mediana)')
+        parser.add_argument('--sem-comparar', action='store_true',
+                            help='Só mede com os índices atuais, sem removê-los')
+        parser.add_argument('--planos', action='store_true',
+                            help='Mostra o EXPLAIN completo de cada consulta')
+        parser.add_argument('--confirmar', action='store_true',
+                            help='Confirma que o banco é descartável (gerar dados e remover os índices)')
+
+    def handle(self, *args, **options):
+        faltam = options['inscricoes'] - UserEventos.objects.count()
+        acoes = []
+        if faltam > 0:
+            acoes.append(f'gerar {faltam} inscrições sintéticas')
+        if not options['sem_comparar']:
+            acoes.append('remover e recriar os índices')
+        if acoes and not settings.DEBUG:
+            raise CommandError(f'DEBUG desligado: recusando {" e ".join(acoes)} neste banco.')
+        if acoes and not options['confirmar']:
+            raise CommandError(
+                f'Este comando vai {" e ".join(acoes)}. Rode de novo com --confirmar '
+                '(ou com --sem-comparar e --inscricoes 0 para só medir).'
+            )
+
+        if faltam > 0:
+            self.semear(faltam)
+        if not Evento.objects.exists():
+            raise CommandError('Nenhum evento no banco para medir.')
+
+        resultados = {}
+        if not options['sem_comparar']:
+            self.stdout.write(self.style.MIGRATE_HEADING('Sem os índices'))
+            with self.sem_indices():
+                resultados['sem'] = self.medir(options)
+        self.stdout.write(self.style.MIGRATE_HEADING('Com os índices'))
+        resultados['com'] = self.medir(options)
+
+        self.stdout.write(self.style.MIGRATE_HEADING('Resumo (mediana em ms)'))
+        for nome, (ms_com, _) in resultados['com'].items():
+            if 'sem' in resultados:
+                ms_sem = resultados['sem'][nome][0]
+                ganho = f'{ms_sem / ms_com:.1f}x' if ms_com else '-'
+                self.stdout.write(f'{nome:<24} {ms_sem:>10.2f} -> {ms_com:>8.2f}  ({ganho})')
+            else:
+                self.stdout.write(f'{nome:<24} {ms_com:>10.2f}')
+
+    # -----------------------------------------------------------
+    # Medição
+    # -----------------------------------------------------------
+    def medir(self, options):
+        self.analisar()
+        resultados = {}
+        for nome, (queryset, contar) in consultas().items():
+            tempos = []
+            for _ in range(options['repeticoes']):
+                inicio = time.perf_counter()
+                queryset.count() if contar else list(queryset.all())
+                tempos.append((time.perf_counter() - inicio) * 1000)
+            plano = queryset.explain()
+            resultados[nome] = (statistics.median(tempos), plano)
+
+            self.stdout.write(f'{nome}: {resultados[nome][0]:.2f} ms')
+            linhas_plano = plano.splitlines()
+            for linha in (linhas_plano if options['planos'] else linhas_plano[:3]):
+                self.stdout.write(f'    {linha}')
+        return resultados
+
+    def analisar(self):
+        # Atualiza as estatísticas do planejador (senão ele pode ignorar um índice recém-criado)
+        if connection.vendor in ('sqlite', 'postgresql'):
+            with connection.cursor() as cursor:
+                cursor.execute('ANALYZE')
+
+    @contextmanager
+    def sem_indices(self):
+        removidos = []
+        try:
+            for modelo in MODELOS:
+                for indice in modelo._meta.indexes:
+                    with connection.schema_editor() as editor:
+                        editor.remove_index(modelo, indice)
+                    removidos.append((modelo, indice))
+            yield
+        finally:
+            # Recria mesmo se a remoção ou a medição falhar (só os que chegaram a ser removidos)
+            self.stdout.write('Recriando os índices...')
+            with connection.schema_editor() as editor:
+                for modelo, indice in removidos:
+                    editor.add_index(modelo, indice)
+
+    # -----------------------------------------------------------
+    # Dados sintéticos
+    # -----------------------------------------------------------
+    def semear(self, total):
+        """Gera `total` inscrições (mais usuários, eventos e atividades proporcionais), ver sinteticos.py."""
+        self.stdout.write(f'Gerando {total} inscrições sintéticas...')
+        inicio = time.perf_counter()
+        qtd_eventos = max(20, total // 1000)
+        gerador = GeradorSintetico(semente=42, prefixo=f'bench{int(time.time())}')
+        criadas = gerador.gerar(
+            usuarios=max(1, total // 20), eventos=qtd_eventos, atividades=qtd_eventos * 5, inscricoes=total,
+        )
+        self.stdout.write(self.style.SUCCESS(
+            f'{criadas["inscricoes"]} inscrições geradas em {time.perf_counter() - inicio:.1f}s.'
+        ))
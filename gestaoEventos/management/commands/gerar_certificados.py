@@ -0,0 +1,38 @@
+import shutil
+
+from django.core.management.base import BaseCommand, CommandError
+
+from gestaoEventos.certificados import gerar_certificados
+from gestaoEventos.models import UserEventos
+
+
+class Command(BaseCommand):
+    help = 'Gera em massa os certificados das inscrições confirmadas (PDF único ou ZIP com um PDF por participante)'
+
+    def add_arguments(self, parser):
+        parser.add_argument('saida', help='Arquivo de saída (.pdf ou .zip)')
+        parser.add_argument('--evento', type=int, action='append', help='ID do evento (pode repetir)')
+        parser.add_argument('--formato', choices=['pdf', 'zip'],
+                            help='Padrão: deduzido da extensão do arquivo de saída')
+        parser.add_argument('--workers', type=int, default=2,
+                            help='Processos no pool (0 = sem pool)')
+
+    def handle(self, *args, **options):
+        saida = options['saida']
+        formato = options['formato'] or ('zip' if saida.lower().endswith('.zip') else 'pdf')
+
+        inscricoes = UserEventos.objects.all()
+        if options['evento']:
+            inscricoes = inscricoes.filter(evento_id__in=options['evento'])
+        if not inscricoes.filter(status='C').exists():
+            raise CommandError("Nenhuma inscrição com status 'Confirmado' encontrada.")
+
+        self.stdout.write(f'Gerando certificados com {options["workers"]} processo(s)...')
+        arquivo, estatisticas = gerar_certificados(inscricoes, formato=formato, workers=options['workers'])
+        with arquivo, open(saida, 'wb') as destino:
+            shutil.copyfileobj(arquivo, destino)
+
+        self.stdout.write(self.style.SUCCESS(
+            f'{estatisticas["total"]} certificados em {estatisticas["segundos"]}s '
+            f'({estatisticas["por_segundo"]} certificados/segundo) -> {saida}'
+        ))
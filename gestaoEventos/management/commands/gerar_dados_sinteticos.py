@@ -0,0 +1,69 @@
+import time
+from datetime import datetime
+
+from django.core.management.base import BaseCommand, CommandError
+from django.utils import timezone
+from django.utils.dateparse import parse_date
+
+from gestaoEventos.sinteticos import GeradorSintetico
+
+
+class Command(BaseCommand):
+    help = (
+        'Gera dados sintéticos (usuários com perfil, eventos, atividades e inscrições) em lotes de '
+        'bulk_create, para testes de escala. A mesma --semente (e --referencia) gera os mesmos dados.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--usuarios', type=int, default=100_000, help='Usuários (com Perfil e grupos)')
+        parser.add_argument('--eventos', type=int, default=10_000, help='Eventos')
+        parser.add_argument('--atividades', type=int, default=200_000, help='Atividades (repartidas entre os eventos)')
+        parser.add_argument('--inscricoes', type=int, default=5_000_000,
+                            help='Inscrições (limitadas a usuários x eventos)')
+        parser.add_argument('--semente', type=int, default=42, help='Semente do gerador aleatório')
+        parser.add_argument('--referencia',
+                            help='Data AAAA-MM-DD usada como "hoje" dos dados (padrão: sinteticos.REFERENCIA)')
+        parser.add_argument('--prefixo', help='Prefixo dos usernames e nomes gerados (padrão: sint<semente>)')
+        parser.add_argument('--lote', type=int, default=20_000, help='Registros por bulk_create (cada um é uma transação)')
+        parser.add_argument('--concentracao', type=float, default=1.1,
+                            help='Expoente da popularidade dos eventos (0 = uniforme; maior = mais concentrado)')
+        parser.add_argument('--senha', default='senha123', help='Senha de todos os usuários gerados')
+
+    def handle(self, *args, **options):
+        for opcao in ('usuarios', 'eventos', 'atividades', 'inscricoes'):
+            if options[opcao] < 0:
+                raise CommandError(f'--{opcao} não pode ser negativo.')
+        if options['lote'] < 1:
+            raise CommandError('--lote deve ser maior que zero.')
+
+        referencia = self.referencia(options['referencia'])
+        gerador = GeradorSintetico(
+            semente=options['semente'],
+            prefixo=options['prefixo'] or f'sint{options["semente"]}',
+            tamanho_lote=options['lote'],
+            concentracao=options['concentracao'],
+            log=self.stdout.write,
+            referencia=referencia,
+        )
+        if gerador.existe():
+            raise CommandError(
+                f'Já existem dados com o prefixo "{gerador.prefixo}". Use outro --prefixo (ou outra --semente).'
+            )
+
+        inicio = time.perf_counter()
+        criadas = gerador.gerar(
+            usuarios=options['usuarios'], eventos=options['eventos'],
+            atividades=options['atividades'], inscricoes=options['inscricoes'], senha=options['senha'],
+        )
+        self.stdout.write(self.style.SUCCESS(
+            f'{criadas["usuarios"]} usuário(s), {criadas["eventos"]} evento(s), {criadas["atividades"]} atividade(s) '
+            f'e {criadas["inscricoes"]} inscrição(ões) geradas em {time.perf_counter() - inicio:.1f}s.'
+        ))
+
+    def referencia(self, valor):
+        if valor is None:
+            return None
+        data = parse_date(valor)
+        if data is None:
+            raise CommandError('--referencia deve estar no formato AAAA-MM-DD.')
+        return timezone.make_aware(datetime.combine(data, datetime.min.time()))
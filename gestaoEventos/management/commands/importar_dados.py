@@ -1,15 +1,46 @@
 import csv
 import os
-from django.core.management.base import BaseCommand
+import time
+from django.core.management.base import BaseCommand, CommandError
 from django.contrib.auth.models import User
 from django.conf import settings
+from django.db import transaction
+from gestaoEventos.importacao import ImportadorEmMassa, abrir_csv, ler_lotes, localizar_arquivo, obter_checkpoint
 from gestaoEventos.models import Evento, Atividade, Perfil, UserEventos
 
+# Arquivos na ordem de importação: (arquivo, colunas, método do ImportadorEmMassa)
+ARQUIVOS = [
+    ('usuarios.csv', 6, 'importar_usuarios'),
+    ('eventos.csv', 5, 'importar_eventos'),
+    ('atividades.csv', 7, 'importar_atividades'),
+    ('inscricoes.csv', 3, 'importar_inscricoes'),
+]
+
+
 class Command(BaseCommand):
     help = 'Importa dados iniciais de arquivos CSV'
 
+    def add_arguments(self, parser):
+        parser.add_argument('--path', help='Diretório com os CSVs (padrão: data/ do projeto)')
+        parser.add_argument('--em-massa', action='store_true',
+                            help='Importa em streaming, em lotes com bulk_create (recomendado para arquivos grandes; aceita .csv.gz)')
+        parser.add_argument('--retomar', action='store_true',
+                            help='No modo --em-massa, continua cada arquivo do último lote gravado')
+        parser.add_argument('--lote', type=int, default=1000,
+                            help='Linhas por lote no modo --em-massa')
+        parser.add_argument('--workers-senha', type=int, default=0,
+                            help='Processos para calcular os hashes de senha no modo --em-massa (0 = sem pool)')
+        parser.add_argument('--senha-rapida', action='store_true',
+                            help='Hash de senha barato, só para bases de teste/homologação (refeito no primeiro login)')
+
     def handle(self, *args, **kwargs):
-        base_path = os.path.join(settings.BASE_DIR, 'data')
+        base_path = kwargs.get('path') or os.path.join(settings.BASE_DIR, 'data')
+        if not os.path.isdir(base_path):
+            raise CommandError(f'Diretório não encontrado: {base_path}')
+        if kwargs.get('em_massa'):
+            return self.importar_em_massa(base_path, kwargs)
+        if kwargs.get('workers_senha') or kwargs.get('senha_rapida') or kwargs.get('retomar'):
+            raise CommandError('--workers-senha, --senha-rapida e --retomar só valem com --em-massa.')
         self.stdout.write('Iniciando importação...')
 
         # -----------------------------------------------------------
@@ -154,4 +185,71 @@ class Command(BaseCommand):
                     except Evento.DoesNotExist:
                         self.stdout.write(self.style.ERROR(f'Evento não achado para inscrição: {nome_evento}'))
         else:
-            self.stdout.write(self.style.WARNING('Arquivo inscricoes.csv não encontrado (opcional).'))
\ No newline at end of file
+            self.stdout.write(self.style.WARNING('Arquivo inscricoes.csv não encontrado (opcional).'))
+
+    # -----------------------------------------------------------
+    # Modo em massa: streaming em lotes, cada lote em uma transação com checkpoint
+    # -----------------------------------------------------------
+    def importar_em_massa(self, base_path, options):
+        tamanho_lote = options['lote']
+        self.stdout.write(f'Iniciando importação em massa de {base_path} (lotes de {tamanho_lote} linhas)...')
+        inicio_total = time.perf_counter()
+        total_linhas = 0
+
+        importador = ImportadorEmMassa(
+            tamanho_lote, workers_senha=options['workers_senha'], senha_rapida=options['senha_rapida'],
+        )
+        with importador:
+            for arquivo, colunas, metodo in ARQUIVOS:
+                caminho = localizar_arquivo(base_path, arquivo)
+                if caminho is None:
+                    self.stdout.write(self.style.WARNING(f'Arquivo {arquivo} não encontrado.'))
+                    continue
+                total_linhas += self.importar_arquivo(
+                    caminho, colunas, getattr(importador, metodo), tamanho_lote, options['retomar'],
+                )
+
+            importador.finalizar()
+
+        for mensagem in importador.erros:
+            self.stdout.write(self.style.ERROR(mensagem))
+        segundos = time.perf_counter() - inicio_total
+        self.stdout.write(self.style.SUCCESS(
+            f'Importação concluída: {total_linhas} linha(s) em {segundos:.2f}s '
+            f'({self.por_segundo(total_linhas, segundos)} linhas/s)'
+        ))
+
+    def importar_arquivo(self, caminho, colunas, importar_lote, tamanho_lote, retomar):
+        nome = os.path.basename(caminho)
+        checkpoint = obter_checkpoint(caminho, retomar)
+        if checkpoint.concluido:
+            self.stdout.write(f'{nome}: já importado ({checkpoint.linhas} linhas), pulando.')
+            return 0
+        if checkpoint.posicao:
+            self.stdout.write(f'{nome}: retomando depois de {checkpoint.linhas} linha(s).')
+
+        inicio = time.perf_counter()
+        linhas = criados = 0
+        with abrir_csv(caminho) as arquivo:
+            for lote, posicao in ler_lotes(arquivo, colunas, tamanho_lote, checkpoint.posicao):
+                # O lote e o checkpoint são gravados juntos: ou entram os dois, ou nenhum
+                with transaction.atomic():
+                    criados += importar_lote(lote)
+                    checkpoint.posicao = posicao
+                    checkpoint.linhas += len(lote)
+                    checkpoint.save(update_fields=['posicao', 'linhas', 'atualizado_em'])
+                linhas += len(lote)
+
+        checkpoint.concluido = True
+        checkpoint.save(update_fields=['concluido', 'atualizado_em'])
+
+        segundos = time.perf_counter() - inicio
+        self.stdout.write(self.style.SUCCESS(
+            f'{nome}: {linhas} linha(s), {criados} registro(s) novo(s) '
+            f'em {segundos:.2f}s ({self.por_segundo(linhas, segundos)} linhas/s)'
+        ))
+        return linhas
+
+    @staticmethod
+    def por_segundo(linhas, segundos):
+        return round(linhas / segundos) if segundos else linhas
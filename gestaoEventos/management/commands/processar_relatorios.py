@@ -0,0 +1,76 @@
+import time
+from concurrent.futures import ProcessPoolExecutor, FIRST_COMPLETED, wait
+
+from django.core.management.base import BaseCommand
+
+from gestaoEventos import tarefas
+
+
+class Command(BaseCommand):
+    help = 'Worker da fila de relatórios: gera os PDFs pendentes em um pool de processos'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--workers', type=int, default=2,
+                            help='Processos no pool (0 = executa no próprio processo, útil para depurar)')
+        parser.add_argument('--intervalo', type=float, default=2.0,
+                            help='Segundos entre as verificações da fila')
+        parser.add_argument('--uma-vez', action='store_true',
+                            help='Processa o que estiver pendente e encerra')
+        parser.add_argument('--recuperar', action='store_true',
+                            help='Antes de começar, devolve para a fila as tarefas que ficaram "Em execução"')
+
+    def handle(self, *args, **options):
+        if options['recuperar']:
+            total = tarefas.recuperar_interrompidas()
+            self.stdout.write(f'{total} tarefa(s) interrompida(s) devolvida(s) para a fila.')
+
+        if options['workers'] <= 0:
+            self.processar_local(options)
+        else:
+            self.processar_pool(options)
+
+    def relatar(self, tarefa_id, status):
+        if status == 'C':
+            self.stdout.write(self.style.SUCCESS(f'Tarefa #{tarefa_id} concluída.'))
+        else:
+            self.stdout.write(self.style.ERROR(f'Tarefa #{tarefa_id} falhou.'))
+
+    def processar_local(self, options):
+        while True:
+            reservadas = tarefas.reservar_pendentes(1)
+            if not reservadas:
+                if options['uma_vez']:
+                    return
+                time.sleep(options['intervalo'])
+                continue
+            for tarefa_id in reservadas:
+                self.relatar(tarefa_id, tarefas.executar_tarefa(tarefa_id))
+
+    def processar_pool(self, options):
+        workers = options['workers']
+        self.stdout.write(f'Worker iniciado com {workers} processo(s).')
+
+        with ProcessPoolExecutor(max_workers=workers, initializer=tarefas.inicializar_worker) as pool:
+            em_andamento = {}
+            while True:
+                # Só reserva o que o pool consegue começar agora
+                for tarefa_id in tarefas.reservar_pendentes(workers - len(em_andamento)):
+                    em_andamento[pool.submit(tarefas.executar_tarefa, tarefa_id)] = tarefa_id
+
+                if not em_andamento:
+                    if options['uma_vez']:
+                        return
+                    time.sleep(options['intervalo'])
+                    continue
+
+                prontas, _ = wait(em_andamento, timeout=options['intervalo'], return_when=FIRST_COMPLETED)
+                for futura in prontas:
+                    tarefa_id = em_andamento.pop(futura)
+                    try:
+                        status = futura.result()
+                    except Exception as e:
+                        # O processo do pool morreu antes de registrar o resultado
+                        self.stderr.write(f'Tarefa #{tarefa_id}: {e}')
+                        tarefas.marcar_falha(tarefa_id, str(e))
+                        status = 'F'
+                    self.relatar(tarefa_id, status)
@@ -0,0 +1,15 @@
+from django.core.management.base import BaseCommand
+
+from gestaoEventos import estatisticas
+
+
+class Command(BaseCommand):
+    help = 'Reconstrói os contadores do dashboard do admin a partir das tabelas (use após cargas em massa)'
+
+    def handle(self, *args, **options):
+        valores = estatisticas.recalcular()
+        self.stdout.write(self.style.SUCCESS(
+            f'Contadores recalculados: {valores[estatisticas.EVENTOS]} evento(s), '
+            f'{valores[estatisticas.INSCRICOES_CONFIRMADAS]} inscrição(ões) confirmada(s), '
+            f'{valores[estatisticas.USUARIOS]} usuário(s).'
+        ))
@@ -0,0 +1,16 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from gestaoEventos import busca
+
+
+class Command(BaseCommand):
+    help = 'Reconstrói os índices da busca textual de eventos e atividades (use após cargas em massa)'
+
+    def handle(self, *args, **options):
+        inicio = time.perf_counter()
+        busca.reconstruir()
+        self.stdout.write(self.style.SUCCESS(
+            f'Índices de busca ({type(busca.backend()).__name__}) reconstruídos em {time.perf_counter() - inicio:.1f}s.'
+        ))
@@ -0,0 +1,132 @@
+import json
+import statistics
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import timedelta
+from urllib.error import HTTPError, URLError
+from urllib.request import Request, urlopen
+
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand, CommandError
+from django.db.models import Count
+from django.utils import timezone
+from rest_framework.authtoken.models import Token
+
+from gestaoEventos import estatisticas
+from gestaoEventos.models import EstatisticaEvento, Evento, UserEventos
+
+
+def percentil(valores, p):
+    ordenados = sorted(valores)
+    return ordenados[min(len(ordenados) - 1, int(len(ordenados) * p / 100))]
+
+
+class Command(BaseCommand):
+    help = (
+        'Teste de carga das inscrições: vários clientes simultâneos inscrevendo usuários no mesmo evento '
+        'via API. Confere duplicidade e capacidade e mostra a latência (p50/p99). '
+        'O servidor precisa estar rodando (ex.: python manage.py runserver).'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--url', default='http://127.0.0.1:8000', help='Endereço do servidor')
+        parser.add_argument('--usuarios', type=int, default=500, help='Usuários de teste criados')
+        parser.add_argument('--capacidade', type=int, default=300, help='Vagas do evento de teste (0 = sem limite)')
+        parser.add_argument('--clientes', type=int, default=50, help='Requisições simultâneas')
+        parser.add_argument('--tentativas', type=int, default=2,
+                            help='Quantas vezes cada usuário tenta se inscrever (>1 testa a duplicidade)')
+        parser.add_argument('--manter', action='store_true', help='Não apaga o evento e os usuários de teste no final')
+
+    def handle(self, *args, **options):
+        prefixo = f'carga{int(time.time())}'
+        evento, tokens = self.preparar(prefixo, options)
+        endereco = f'{options["url"].rstrip("/")}/api/eventos/{evento.pk}/participantes/'
+
+        # Cada usuário aparece `tentativas` vezes, intercalado com os outros
+        pedidos = [token for _ in range(options['tentativas']) for token in tokens]
+        self.stdout.write(
+            f'{len(pedidos)} requisições de {len(tokens)} usuários, {options["clientes"]} clientes simultâneos, '
+            f'capacidade {evento.capacidade or "ilimitada"}...'
+        )
+        try:
+            inicio = time.perf_counter()
+            with ThreadPoolExecutor(max_workers=options['clientes']) as pool:
+                resultados = list(pool.map(lambda token: self.inscrever(endereco, token), pedidos))
+            duracao = time.perf_counter() - inicio
+            self.relatar(evento, resultados, duracao)
+        finally:
+            if not options['manter']:
+                evento.delete()
+                User.objects.filter(username__startswith=f'{prefixo}_').delete()
+
+    def preparar(self, prefixo, options):
+        agora = timezone.now()
+        evento = Evento.objects.create(
+            nome=f'{prefixo} evento', descricao='Teste de carga', local='Online',
+            data_inicio=agora + timedelta(days=30), data_fim=agora + timedelta(days=30, hours=4),
+            capacidade=options['capacidade'] or None,
+        )
+        usuarios = User.objects.bulk_create(
+            [User(username=f'{prefixo}_{i}', password='!') for i in range(options['usuarios'])], batch_size=1000,
+        )
+        # bulk_create não dispara signals, mas a limpeza (delete) dispara: conta os usuários aqui
+        estatisticas.somar(estatisticas.USUARIOS, len(usuarios))
+        # Token (e não usuário/senha): o hash da senha em cada requisição dominaria a medição
+        tokens = [
+            Token(key=Token.generate_key(), user_id=user_id)
+            for user_id in User.objects.filter(username__startswith=f'{prefixo}_').values_list('id', flat=True)
+        ]
+        Token.objects.bulk_create(tokens, batch_size=1000)
+        return evento, [token.key for token in tokens]
+
+    def inscrever(self, endereco, token):
+        requisicao = Request(endereco, data=b'{}', method='POST', headers={
+            'Authorization': f'Token {token}', 'Content-Type': 'application/json',
+        })
+        inicio = time.perf_counter()
+        try:
+            with urlopen(requisicao, timeout=60) as resposta:
+                codigo = resposta.status
+        except HTTPError as erro:
+            codigo = erro.code
+        except URLError as erro:
+            raise CommandError(f'Não foi possível acessar {endereco}: {erro.reason}')
+        return codigo, (time.perf_counter() - inicio) * 1000
+
+    def relatar(self, evento, resultados, duracao):
+        codigos = {}
+        for codigo, _ in resultados:
+            codigos[codigo] = codigos.get(codigo, 0) + 1
+        latencias = [ms for _, ms in resultados]
+
+        self.stdout.write(f'Respostas: {json.dumps(codigos, sort_keys=True)}')
+        self.stdout.write(
+            f'Latência: p50 {statistics.median(latencias):.1f} ms | p99 {percentil(latencias, 99):.1f} ms | '
+            f'máx {max(latencias):.1f} ms'
+        )
+        self.stdout.write(f'Vazão: {len(resultados) / duracao:.0f} requisições/s em {duracao:.1f}s')
+
+        inscricoes = UserEventos.objects.filter(evento=evento)
+        total = inscricoes.count()
+        duplicadas = inscricoes.values('user').annotate(n=Count('id')).filter(n__gt=1).count()
+        contador = EstatisticaEvento.objects.get(evento=evento).total_inscricoes
+
+        problemas = []
+        if duplicadas:
+            problemas.append(f'{duplicadas} usuário(s) inscrito(s) mais de uma vez')
+        if evento.capacidade is not None and total > evento.capacidade:
+            problemas.append(f'{total} inscrições para {evento.capacidade} vagas (overbooking)')
+        if total != codigos.get(201, 0):
+            problemas.append(f'{codigos.get(201, 0)} respostas 201 para {total} inscrições gravadas')
+        if contador != total:
+            problemas.append(f'contador do evento ({contador}) diferente das inscrições gravadas ({total})')
+        erros_servidor = sum(n for codigo, n in codigos.items() if codigo >= 500)
+        if erros_servidor:
+            problemas.append(f'{erros_servidor} erro(s) 5xx')
+
+        self.stdout.write(f'Inscrições gravadas: {total}')
+        if problemas:
+            for problema in problemas:
+                self.stdout.write(self.style.ERROR(problema))
+            raise CommandError('Teste de carga reprovado.')
+        self.stdout.write(self.style.SUCCESS('Sem duplicidade, sem overbooking e contadores corretos.'))
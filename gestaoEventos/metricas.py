@@ -0,0 +1,233 @@
+import bisect
+import hashlib
+import logging
+import re
+import threading
+import time
+from collections import Counter, defaultdict
+
+from django.conf import settings
+from django.db import connection
+
+logger = logging.getLogger(__name__)
+
+# ---------------------------------------------------------
+# Métricas por requisição (middleware + endpoint Prometheus)
+# ---------------------------------------------------------
+# MetricasMiddleware mede cada requisição: latência, queries (quantidade e
+# tempo, via connection.execute_wrapper), tamanho da resposta e queries
+# repetidas (o mesmo SQL executado várias vezes = sinal de N+1). Tudo é
+# agregado por view (nome da rota resolvida) em histogramas na memória do
+# processo: com vários workers, cada um tem os seus números e o Prometheus
+# soma na consulta. /metricas/ devolve o formato texto do Prometheus.
+#
+# Requisições mais lentas que METRICAS_LENTA_MS vão para o log
+# "gestaoEventos.metricas" com os SQLs mais repetidos.
+
+# Limites (le) de cada histograma
+LIMITES_SEGUNDOS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30)
+LIMITES_QUERIES = (1, 2, 5, 10, 20, 50, 100, 200, 500, 1000)
+LIMITES_BYTES = (1_000, 10_000, 100_000, 1_000_000, 10_000_000, 100_000_000)
+
+VIEW_NAO_RESOLVIDA = '<nao_resolvida>'
+# Assinaturas de SQL repetido guardadas por view (as mais frequentes ficam)
+MAX_ASSINATURAS_POR_VIEW = 10
+
+# Listas de parâmetros de tamanho variável (IN (%s, %s, ...)) contam como o mesmo SQL
+_LISTA_PARAMETROS = re.compile(r'\((?:%s,\s*)+%s\)')
+_ESPACOS = re.compile(r'\s+')
+
+
+def normalizar_sql(sql):
+    return _ESPACOS.sub(' ', _LISTA_PARAMETROS.sub('(%s, ...)', sql)).strip()
+
+
+def assinatura_sql(sql):
+    """Identificador curto de um SQL normalizado (vai no rótulo da métrica e no log)."""
+    return hashlib.sha1(sql.encode('utf-8')).hexdigest()[:12]
+
+
+class Histograma:
+    def __init__(self, limites):
+        self.limites = limites
+        self.contagens = [0] * (len(limites) + 1)  # a última é o +Inf
+        self.soma = 0
+        self.total = 0
+
+    def observar(self, valor):
+        self.contagens[bisect.bisect_left(self.limites, valor)] += 1
+        self.soma += valor
+        self.total += 1
+
+    def acumulado(self):
+        """[(le, contagem acumulada)] como o Prometheus espera, terminando em +Inf."""
+        linhas, acumulado = [], 0
+        for limite, contagem in zip((*self.limites, '+Inf'), self.contagens):
+            acumulado += contagem
+            linhas.append((limite, acumulado))
+        return linhas
+
+
+class MetricasView:
+    def __init__(self):
+        self.latencia = Histograma(LIMITES_SEGUNDOS)
+        self.queries = Histograma(LIMITES_QUERIES)
+        self.tempo_sql = Histograma(LIMITES_SEGUNDOS)
+        self.tamanho = Histograma(LIMITES_BYTES)
+        self.por_status = Counter()
+        # Assinatura -> requisições em que aquele SQL se repetiu
+        self.repetidas = Counter()
+
+
+class Registro:
+    """Métricas agregadas do processo (uma instância global: `registro`)."""
+
+    def __init__(self):
+        self._trava = threading.Lock()
+        self._views = defaultdict(MetricasView)
+
+    def registrar(self, view, status, segundos, consultas, tamanho):
+        with self._trava:
+            metricas = self._views[view]
+            metricas.latencia.observar(segundos)
+            metricas.queries.observar(consultas.total)
+            metricas.tempo_sql.observar(consultas.segundos)
+            if tamanho is not None:
+                metricas.tamanho.observar(tamanho)
+            metricas.por_status[status] += 1
+            for assinatura, _ in consultas.repetidas():
+                metricas.repetidas[assinatura] += 1
+            if len(metricas.repetidas) > MAX_ASSINATURAS_POR_VIEW:
+                metricas.repetidas = Counter(dict(metricas.repetidas.most_common(MAX_ASSINATURAS_POR_VIEW)))
+
+    def limpar(self):
+        with self._trava:
+            self._views.clear()
+
+    def exportar(self):
+        """Texto no formato de exposição do Prometheus (versão 0.0.4)."""
+        with self._trava:
+            views = sorted(self._views.items())
+            linhas = []
+
+            def histograma(nome, descricao, atributo):
+                linhas.append(f'# HELP {nome} {descricao}')
+                linhas.append(f'# TYPE {nome} histogram')
+                for view, metricas in views:
+                    hist = getattr(metricas, atributo)
+                    if not hist.total:
+                        continue
+                    rotulo = f'view="{_escapar(view)}"'
+                    for limite, acumulado in hist.acumulado():
+                        linhas.append(f'{nome}_bucket{{{rotulo},le="{limite}"}} {acumulado}')
+                    linhas.append(f'{nome}_sum{{{rotulo}}} {_numero(hist.soma)}')
+                    linhas.append(f'{nome}_count{{{rotulo}}} {hist.total}')
+
+            histograma('gestaoeventos_requisicao_segundos', 'Latência das requisições.', 'latencia')
+            histograma('gestaoeventos_sql_queries', 'Queries executadas por requisição.', 'queries')
+            histograma('gestaoeventos_sql_segundos', 'Tempo gasto em SQL por requisição.', 'tempo_sql')
+            histograma('gestaoeventos_resposta_bytes', 'Tamanho do corpo das respostas.', 'tamanho')
+
+            linhas.append('# HELP gestaoeventos_requisicoes_total Requisições por view e status HTTP.')
+            linhas.append('# TYPE gestaoeventos_requisicoes_total counter')
+            for view, metricas in views:
+                for status, total in sorted(metricas.por_status.items()):
+                    linhas.append(
+                        f'gestaoeventos_requisicoes_total{{view="{_escapar(view)}",status="{status}"}} {total}'
+                    )
+
+            linhas.append(
+                '# HELP gestaoeventos_sql_repetido_total Requisições em que o mesmo SQL (assinatura) '
+                'se repetiu METRICAS_LIMITE_REPETICOES vezes ou mais (N+1).'
+            )
+            linhas.append('# TYPE gestaoeventos_sql_repetido_total counter')
+            for view, metricas in views:
+                for assinatura, total in sorted(metricas.repetidas.items()):
+                    linhas.append(
+                        f'gestaoeventos_sql_repetido_total{{view="{_escapar(view)}",assinatura="{assinatura}"}} {total}'
+                    )
+        return '\n'.join(linhas) + '\n'
+
+
+def _escapar(valor):
+    return str(valor).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+def _numero(valor):
+    return repr(round(valor, 6)) if isinstance(valor, float) else str(valor)
+
+
+registro = Registro()
+
+
+class ContadorQueries:
+    """execute_wrapper que conta e cronometra as queries de uma requisição."""
+
+    def __init__(self):
+        self.total = 0
+        self.segundos = 0.0
+        # SQL normalizado -> [execuções, segundos]
+        self.por_sql = defaultdict(lambda: [0, 0.0])
+
+    def __call__(self, execute, sql, params, many, context):
+        inicio = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            duracao = time.perf_counter() - inicio
+            self.total += 1
+            self.segundos += duracao
+            estatistica = self.por_sql[normalizar_sql(sql)]
+            estatistica[0] += 1
+            estatistica[1] += duracao
+
+    def repetidas(self):
+        """[(assinatura, sql)] dos SQLs executados METRICAS_LIMITE_REPETICOES vezes ou mais."""
+        limite = getattr(settings, 'METRICAS_LIMITE_REPETICOES', 5)
+        return [(assinatura_sql(sql), sql) for sql, (vezes, _) in self.por_sql.items() if vezes >= limite]
+
+    def mais_repetidas(self, quantidade=5):
+        return sorted(self.por_sql.items(), key=lambda item: item[1][0], reverse=True)[:quantidade]
+
+
+class MetricasMiddleware:
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        if not getattr(settings, 'METRICAS_ATIVAS', True):
+            return self.get_response(request)
+
+        consultas = ContadorQueries()
+        inicio = time.perf_counter()
+        with connection.execute_wrapper(consultas):
+            response = self.get_response(request)
+        segundos = time.perf_counter() - inicio
+
+        match = getattr(request, 'resolver_match', None)
+        view = (match.view_name or match._func_path) if match else VIEW_NAO_RESOLVIDA
+        registro.registrar(view, response.status_code, segundos, consultas, tamanho_resposta(response))
+
+        if segundos * 1000 >= getattr(settings, 'METRICAS_LENTA_MS', 1000):
+            registrar_lenta(request, view, segundos, consultas)
+        return response
+
+
+def tamanho_resposta(response):
+    # Respostas em streaming só têm tamanho conhecido se trouxerem Content-Length (ex.: FileResponse)
+    if response.streaming:
+        tamanho = response.get('Content-Length')
+        return int(tamanho) if tamanho else None
+    return len(response.content)
+
+
+def registrar_lenta(request, view, segundos, consultas):
+    repetidas = '\n'.join(
+        f'  {vezes}x {duracao * 1000:.1f}ms [{assinatura_sql(sql)}] {sql[:300]}'
+        for sql, (vezes, duracao) in consultas.mais_repetidas()
+    )
+    logger.warning(
+        'Requisição lenta: %s %s (view %s) em %.0fms, %d queries (%.0fms em SQL). SQLs mais repetidos:\n%s',
+        request.method, request.get_full_path(), view, segundos * 1000,
+        consultas.total, consultas.segundos * 1000, repetidas,
+    )
@@ -0,0 +1,37 @@
+# Generated by Django 5.2.8 on 2026-10-18 07:43
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('gestaoEventos', '0002_alter_usereventos_options'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='TarefaRelatorio',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('tipo', models.CharField(choices=[('eventos', 'Eventos'), ('atividades', 'Atividades'), ('participantes', 'Participantes'), ('inscricoes', 'Inscrições'), ('grupos', 'Grupos'), ('certificados', 'Certificados')], max_length=20)),
+                ('parametros', models.JSONField(blank=True, default=dict)),
+                ('status', models.CharField(choices=[('P', 'Pendente'), ('E', 'Em execução'), ('C', 'Concluída'), ('F', 'Falhou')], default='P', max_length=1)),
+                ('arquivo', models.FileField(blank=True, upload_to='relatorios/')),
+                ('erro', models.TextField(blank=True)),
+                ('criado_em', models.DateTimeField(auto_now_add=True)),
+                ('iniciado_em', models.DateTimeField(blank=True, null=True)),
+                ('concluido_em', models.DateTimeField(blank=True, null=True)),
+                ('solicitante', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='tarefas_relatorio', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'verbose_name': 'Tarefa de Relatório',
+                'verbose_name_plural': 'Tarefas de Relatório',
+                'ordering': ['-criado_em'],
+                'indexes': [models.Index(fields=['status', 'criado_em'], name='gestaoEvent_status_85900d_idx')],
+            },
+        ),
+    ]
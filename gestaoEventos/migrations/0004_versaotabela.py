@@ -0,0 +1,25 @@
+# Generated by Django 5.2.8 on 2026-10-18 07:46
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('gestaoEventos', '0003_tarefarelatorio'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='VersaoTabela',
+            fields=[
+                ('tabela', models.CharField(max_length=100, primary_key=True, serialize=False)),
+                ('versao', models.PositiveBigIntegerField(default=0)),
+                ('atualizado_em', models.DateTimeField(auto_now=True)),
+            ],
+            options={
+                'verbose_name': 'Versão de Tabela',
+                'verbose_name_plural': 'Versões de Tabelas',
+            },
+        ),
+    ]
@@ -0,0 +1,67 @@
+# Generated by Django 5.2.8 on 2026-10-18 07:49
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+def popular_contadores(apps, schema_editor):
+    # Mesma conta de estatisticas.recalcular(), com os modelos históricos
+    from django.db.models import Count, Q
+
+    Contador = apps.get_model('gestaoEventos', 'Contador')
+    EstatisticaEvento = apps.get_model('gestaoEventos', 'EstatisticaEvento')
+    Evento = apps.get_model('gestaoEventos', 'Evento')
+    UserEventos = apps.get_model('gestaoEventos', 'UserEventos')
+    User = apps.get_model('auth', 'User')
+
+    Contador.objects.bulk_create([
+        Contador(chave='eventos', valor=Evento.objects.count()),
+        Contador(chave='inscricoes_confirmadas', valor=UserEventos.objects.filter(status='C').count()),
+        Contador(chave='usuarios', valor=User.objects.count()),
+    ])
+    eventos = Evento.objects.annotate(
+        num_inscricoes=Count('usereventos'),
+        num_confirmadas=Count('usereventos', filter=Q(usereventos__status='C')),
+    ).values_list('id', 'num_inscricoes', 'num_confirmadas')
+    EstatisticaEvento.objects.bulk_create(
+        [EstatisticaEvento(evento_id=evento_id, total_inscricoes=total, total_confirmadas=confirmadas)
+         for evento_id, total, confirmadas in eventos],
+        batch_size=2000,
+    )
+
+
+def limpar_contadores(apps, schema_editor):
+    apps.get_model('gestaoEventos', 'Contador').objects.all().delete()
+    apps.get_model('gestaoEventos', 'EstatisticaEvento').objects.all().delete()
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('gestaoEventos', '0004_versaotabela'),
+        ('auth', '0012_alter_user_first_name_max_length'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='Contador',
+            fields=[
+                ('chave', models.CharField(max_length=50, primary_key=True, serialize=False)),
+                ('valor', models.BigIntegerField(default=0)),
+            ],
+        ),
+        migrations.CreateModel(
+            name='EstatisticaEvento',
+            fields=[
+                ('evento', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='estatistica', serialize=False, to='gestaoEventos.evento')),
+                ('total_inscricoes', models.IntegerField(default=0)),
+                ('total_confirmadas', models.IntegerField(default=0)),
+            ],
+            options={
+                'verbose_name': 'Estatística de Evento',
+                'verbose_name_plural': 'Estatísticas de Eventos',
+                'indexes': [models.Index(fields=['-total_inscricoes'], name='estatistica_total_idx')],
+            },
+        ),
+        migrations.RunPython(popular_contadores, limpar_contadores),
+    ]
@@ -0,0 +1,28 @@
+# Generated by Django 5.2.8 on 2026-10-18 07:58
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('gestaoEventos', '0005_contadores_dashboard'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='CheckpointImportacao',
+            fields=[
+                ('arquivo', models.CharField(max_length=500, primary_key=True, serialize=False)),
+                ('assinatura', models.CharField(max_length=100)),
+                ('posicao', models.BigIntegerField(default=0)),
+                ('linhas', models.BigIntegerField(default=0)),
+                ('concluido', models.BooleanField(default=False)),
+                ('atualizado_em', models.DateTimeField(auto_now=True)),
+            ],
+            options={
+                'verbose_name': 'Checkpoint de Importação',
+                'verbose_name_plural': 'Checkpoints de Importação',
+            },
+        ),
+    ]
@@ -0,0 +1,43 @@
+# Generated by Django 5.2.8 on 2026-10-18 08:01
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('gestaoEventos', '0006_checkpointimportacao'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='atividade',
+            index=models.Index(fields=['horario_inicio', 'id'], name='atividade_horario_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='atividade',
+            index=models.Index(fields=['evento', 'horario_inicio', 'id'], name='atividade_evento_horario_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='evento',
+            index=models.Index(fields=['data_inicio', 'id'], name='evento_data_inicio_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='evento',
+            index=models.Index(fields=['nome'], name='evento_nome_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='perfil',
+            index=models.Index(fields=['tipo'], name='perfil_tipo_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='usereventos',
+            index=models.Index(fields=['evento', 'status'], name='inscricao_evento_status_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='usereventos',
+            index=models.Index(fields=['data_inscricao', 'id'], name='inscricao_data_idx'),
+        ),
+    ]
@@ -0,0 +1,35 @@
+# Generated by Django 5.2.8 on 2026-10-18 08:04
+
+import datetime
+from django.db import migrations, models
+
+
+def calcular_carga_horaria(apps, schema_editor):
+    # Mesma conta de EventoQuerySet.atualizar_carga_horaria(), com os modelos históricos
+    from django.db.models import DurationField, F, OuterRef, Subquery, Sum, Value
+    from django.db.models.functions import Coalesce
+
+    Evento = apps.get_model('gestaoEventos', 'Evento')
+    Atividade = apps.get_model('gestaoEventos', 'Atividade')
+    soma = Atividade.objects.filter(evento=OuterRef('pk')).values('evento').annotate(
+        total=Sum(F('horario_fim') - F('horario_inicio'), output_field=DurationField())
+    ).values('total')
+    Evento.objects.update(
+        carga_horaria=Coalesce(Subquery(soma, output_field=DurationField()), Value(datetime.timedelta(0)))
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('gestaoEventos', '0007_indices_consultas'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='evento',
+            name='carga_horaria',
+            field=models.DurationField(default=datetime.timedelta(0), editable=False),
+        ),
+        migrations.RunPython(calcular_carga_horaria, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 5.2.8 on 2026-10-18 08:06
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('gestaoEventos', '0008_evento_carga_horaria'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='evento',
+            name='capacidade',
+            field=models.PositiveIntegerField(blank=True, null=True),
+        ),
+    ]
@@ -0,0 +1,37 @@
+from django.db import migrations
+
+# Índices FTS5 da busca textual (ver gestaoEventos/busca.py): só no SQLite.
+# O rowid de cada linha é o id do evento/atividade.
+INDICES = (
+    ('gestaoEventos_busca_evento', 'gestaoEventos_evento', ('nome', 'descricao', 'local')),
+    ('gestaoEventos_busca_atividade', 'gestaoEventos_atividade', ('titulo', 'descricao')),
+)
+
+
+def criar_indices(apps, schema_editor):
+    if schema_editor.connection.vendor != 'sqlite':
+        return
+    for tabela, origem, campos in INDICES:
+        colunas = ', '.join(campos)
+        schema_editor.execute(
+            f"CREATE VIRTUAL TABLE {tabela} USING fts5({colunas}, tokenize='unicode61 remove_diacritics 2')"
+        )
+        schema_editor.execute(f'INSERT INTO {tabela} (rowid, {colunas}) SELECT id, {colunas} FROM "{origem}"')
+
+
+def apagar_indices(apps, schema_editor):
+    if schema_editor.connection.vendor != 'sqlite':
+        return
+    for tabela, _, _ in INDICES:
+        schema_editor.execute(f'DROP TABLE IF EXISTS {tabela}')
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('gestaoEventos', '0010_perfilexecucao'),
+    ]
+
+    operations = [
+        migrations.RunPython(criar_indices, apagar_indices),
+    ]
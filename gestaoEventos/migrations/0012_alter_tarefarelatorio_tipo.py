@@ -0,0 +1,18 @@
+# Generated by Django 5.2.8 on 2026-10-18 09:27
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('gestaoEventos', '0011_indices_busca'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='tarefarelatorio',
+            name='tipo',
+            field=models.CharField(choices=[('eventos', 'Eventos'), ('atividades', 'Atividades'), ('participantes', 'Participantes'), ('inscricoes', 'Inscrições'), ('grupos', 'Grupos'), ('certificados', 'Certificados'), ('certificados_zip', 'Certificados individuais (ZIP)')], max_length=20),
+        ),
+    ]
@@ -0,0 +1,34 @@
+# Generated by Django 5.2.8 on 2026-10-18 09:32
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('gestaoEventos', '0012_alter_tarefarelatorio_tipo'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='IndiceBuscaAtividade',
+            fields=[
+                ('atividade', models.OneToOneField(db_column='rowid', db_constraint=False, on_delete=django.db.models.deletion.DO_NOTHING, primary_key=True, related_name='indice_busca', serialize=False, to='gestaoEventos.atividade')),
+            ],
+            options={
+                'db_table': 'gestaoEventos_busca_atividade',
+                'managed': False,
+            },
+        ),
+        migrations.CreateModel(
+            name='IndiceBuscaEvento',
+            fields=[
+                ('evento', models.OneToOneField(db_column='rowid', db_constraint=False, on_delete=django.db.models.deletion.DO_NOTHING, primary_key=True, related_name='indice_busca', serialize=False, to='gestaoEventos.evento')),
+            ],
+            options={
+                'db_table': 'gestaoEventos_busca_evento',
+                'managed': False,
+            },
+        ),
+    ]
@@ -1,4 +1,8 @@
-from django.db import models
+from datetime import timedelta
+
+from django.db import models, transaction
+from django.db.models import Count, DurationField, F, IntegerField, OuterRef, Subquery, Sum, Value
+from django.db.models.functions import Coalesce
 from django.contrib.auth.models import User, Group # Supondo o uso do User padrão do Django
 
 
@@ -6,6 +10,60 @@ from django.contrib.auth.models import User, Group # Supondo o uso do User padr
 # User padrão do Django, não precisa definir esta classe.
 
 # 2. Tabela Perfil (Extensão do Users)
+GRUPO_PARTICIPANTES = 'Participantes'
+GRUPO_STAFF = 'Staff'
+# Grupo de cada tipo de perfil (tipos fora daqui não ficam em nenhum dos dois)
+GRUPO_DO_TIPO = {'P': GRUPO_PARTICIPANTES, 'C': GRUPO_PARTICIPANTES, 'X': GRUPO_PARTICIPANTES, 'O': GRUPO_STAFF}
+
+
+class PerfilManager(models.Manager):
+    # {nome do grupo: id}, por processo. Só entra no cache depois do commit
+    # (o id de um grupo criado numa transação desfeita não pode ficar guardado)
+    # e é limpo quando um grupo é alterado ou apagado (signals).
+    _ids_grupos = {}
+
+    def ids_grupos(self):
+        """Ids dos grupos Participantes e Staff (criados se não existirem)."""
+        if len(PerfilManager._ids_grupos) == 2:
+            return PerfilManager._ids_grupos
+        ids = {
+            nome: Group.objects.get_or_create(name=nome)[0].id
+            for nome in (GRUPO_PARTICIPANTES, GRUPO_STAFF)
+        }
+        transaction.on_commit(lambda: PerfilManager._ids_grupos.update(ids))
+        return ids
+
+    def limpar_ids_grupos(self):
+        PerfilManager._ids_grupos.clear()
+
+    def atribuir_grupos(self, tipos, invalidar=True):
+        """
+        Coloca cada usuário no grupo do seu tipo ({user_id: tipo}) e marca os
+        organizadores como is_staff. Número fixo de queries, qualquer que seja
+        o tamanho do lote; não dispara signals, por isso invalida as versões
+        de grupos/usuários (a menos que invalidar=False).
+        """
+        if not tipos:
+            return
+        grupos = self.ids_grupos()
+        Membro = User.groups.through
+
+        Membro.objects.filter(user_id__in=tipos, group_id__in=grupos.values()).delete()
+        Membro.objects.bulk_create(
+            [Membro(user_id=user_id, group_id=grupos[GRUPO_DO_TIPO[tipo]])
+             for user_id, tipo in tipos.items() if tipo in GRUPO_DO_TIPO],
+            batch_size=1000,
+        )
+        organizadores = [user_id for user_id, tipo in tipos.items() if GRUPO_DO_TIPO.get(tipo) == GRUPO_STAFF]
+        novos_staff = 0
+        if organizadores:
+            novos_staff = User.objects.filter(pk__in=organizadores, is_staff=False).update(is_staff=True)
+
+        if invalidar:
+            from . import versoes  # versoes importa este módulo
+            versoes.invalidar(versoes.GRUPO, *([versoes.USUARIO] if novos_staff else []))
+
+
 class Perfil(models.Model):
     tipos_usuario = [
         ('P', 'Participante'),
@@ -19,6 +77,19 @@ class Perfil(models.Model):
     tipo = models.CharField(max_length=1, choices=tipos_usuario, default='P')
     # O relacionamento com Eventos N:N não é colocado aqui, e sim na UserEventos.
 
+    objects = PerfilManager()
+
+    class Meta:
+        # relatorio_participantes filtra por tipo
+        indexes = [models.Index(fields=['tipo'], name='perfil_tipo_idx')]
+
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        # Guarda o tipo como veio do banco: se não mudar, os grupos não são mexidos
+        instancia = super().from_db(db, field_names, values)
+        instancia._tipo_salvo = instancia.__dict__.get('tipo')
+        return instancia
+
     # ------ Grupo de acordo com o tipo ---------
     @property
     def is_grupo_participante(self):
@@ -38,31 +109,66 @@ class Perfil(models.Model):
         # 1. Salva os dados do Perfil primeiro
         super().save(*args, **kwargs)
 
-        # 2. Define os nomes dos grupos (certificar que eles existem no Admin)
-        grupo_participantes, _ = Group.objects.get_or_create(name='Participantes')
-        grupo_staff, _ = Group.objects.get_or_create(name='Staff')
-
-        # 3. Lógica para Adicionar/Remover baseada no tipo
-        if self.is_grupo_participante:
-            self.user.groups.add(grupo_participantes)
-            self.user.groups.remove(grupo_staff) # Remove do outro para evitar conflito
-            
-        elif self.is_grupo_staff:
-            self.user.groups.add(grupo_staff)
-            self.user.groups.remove(grupo_participantes)
-            
-            # Opcional: Dar status de is_staff no User do Django se for Staff
+        # 2. Grupos só mudam se o tipo mudou (perfil novo ou tipo diferente do carregado)
+        update_fields = kwargs.get('update_fields')
+        if update_fields is not None and 'tipo' not in update_fields:
+            return
+        if getattr(self, '_tipo_salvo', None) == self.tipo:
+            return
+
+        # 3. Participantes (P, C, X) ou Staff (O, que também vira is_staff);
+        #    ids dos grupos em cache e poucas queries (PerfilManager.atribuir_grupos)
+        Perfil.objects.atribuir_grupos({self.user_id: self.tipo})
+        if self.is_grupo_staff and Perfil.user.is_cached(self):
             self.user.is_staff = True
-            self.user.save()
-        
-        else:
-            # Se não for nenhum (caso adicione outros tipos no futuro), limpa tudo
-            self.user.groups.remove(grupo_participantes)
-            self.user.groups.remove(grupo_staff)
+        self._tipo_salvo = self.tipo
 
 
 
 # 3. Tabela Eventos
+def _duracao_atividades(prefixo=''):
+    # Soma de (fim - inicio) das atividades, calculada pelo banco
+    return Sum(F(f'{prefixo}horario_fim') - F(f'{prefixo}horario_inicio'), output_field=DurationField())
+
+
+class EventoQuerySet(models.QuerySet):
+
+    def com_carga_horaria(self):
+        """Anota `carga_horaria_calculada` (timedelta) somando as atividades no próprio banco."""
+        return self.annotate(
+            carga_horaria_calculada=Coalesce(_duracao_atividades('atividades__'), Value(timedelta(0)))
+        )
+
+    def com_totais(self):
+        """
+        Anota total_inscricoes, total_confirmadas, total_pendentes e total_atividades
+        na mesma query, sem carregar as linhas. Inscrições e confirmadas vêm dos
+        contadores de EstatisticaEvento (JOIN); pendentes e atividades, que não têm
+        contador, de subqueries agregadas.
+        """
+        def contar(modelo, **filtros):
+            contagem = modelo.objects.filter(evento=OuterRef('pk'), **filtros).order_by().values('evento').annotate(
+                total=Count('id')
+            ).values('total')
+            return Coalesce(Subquery(contagem, output_field=IntegerField()), Value(0))
+
+        return self.annotate(
+            total_inscricoes=Coalesce(F('estatistica__total_inscricoes'), Value(0)),
+            total_confirmadas=Coalesce(F('estatistica__total_confirmadas'), Value(0)),
+            total_pendentes=contar(UserEventos, status='P'),
+            total_atividades=contar(Atividade),
+        )
+
+    def atualizar_carga_horaria(self):
+        """Regrava o campo `carga_horaria` destes eventos com um único UPDATE."""
+        soma = Atividade.objects.filter(evento=OuterRef('pk')).values('evento').annotate(
+            total=_duracao_atividades()
+        ).values('total')
+        return self.update(
+            carga_horaria=Coalesce(Subquery(soma, output_field=DurationField()), Value(timedelta(0)))
+        )
+
+
 class Evento(models.Model):
     # Id (PK) é automático
     nome = models.CharField(max_length=255)
@@ -70,33 +176,36 @@ class Evento(models.Model):
     data_inicio = models.DateTimeField()
     data_fim = models.DateTimeField()
     local = models.CharField(max_length=255)
+    # Limite de inscrições (vazio = sem limite). Conferido de forma atômica em inscricoes.inscrever()
+    capacidade = models.PositiveIntegerField(null=True, blank=True)
+
+    # Soma da duração das atividades, mantida pelos signals da Atividade (ver signals.py)
+    carga_horaria = models.DurationField(default=timedelta(0), editable=False)
     
     # Relação N:N com User via UserEventos (through model)
     participantes = models.ManyToManyField(User, through='UserEventos', related_name='eventos_inscritos') 
+
+    objects = EventoQuerySet.as_manager()
     
     @property
     def carga_horaria_total(self):
         """
-        Calcula a duração total somando (fim - inicio) de todas as atividades vinculadas.
-        Retorna o valor em horas (arredondado).
+        Duração total das atividades do evento, em horas (arredondado).
+        Vem do campo `carga_horaria` (ou da anotação de com_carga_horaria()),
+        então não faz nenhuma query.
         """
-        total_segundos = 0
-        
-        # Pega todas as atividades desse evento
-        for atividade in self.atividades.all():
-            # Cria objetos dummy de data para poder subtrair os horários (que são TimeField)
-            # Se seus campos forem DateTimeField, pode subtrair direto: atividade.horario_fim - atividade.horario_inicio
-            
-            # SUPONDO QUE SEJAM DateTimeField (o mais comum e recomendado):
-            if atividade.horario_inicio and atividade.horario_fim:
-                diff = atividade.horario_fim - atividade.horario_inicio
-                total_segundos += diff.total_seconds()
-
-        # Converte segundos para horas
-        horas = total_segundos / 3600
-        
-        # Retorna inteiro (ex: 4) ou com 1 casa decimal (ex: 4.5) se preferir
-        return round(horas)
+        carga = getattr(self, 'carga_horaria_calculada', None)
+        if carga is None:
+            carga = self.carga_horaria
+        return round(carga.total_seconds() / 3600)
+
+    class Meta:
+        indexes = [
+            # Listagem paginada/relatórios (ORDER BY data_inicio, id) e próximos eventos do dashboard
+            models.Index(fields=['data_inicio', 'id'], name='evento_data_inicio_idx'),
+            # Buscas por nome da importação de CSV
+            models.Index(fields=['nome'], name='evento_nome_idx'),
+        ]
 
     def __str__(self):
         return self.nome
@@ -121,6 +230,22 @@ class Atividade(models.Model):
     
     # responsavel_id (ForeignKey) – Relacionamento 1:N com User (responsável pela atividade) 
     responsavel = models.ForeignKey(User, on_delete=models.SET_NULL, null=True, related_name='atividades_responsavel') 
+
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        # Guarda o evento como veio do banco: se a atividade mudar de evento,
+        # a carga horária dos dois eventos é recalculada (signals)
+        instancia = super().from_db(db, field_names, values)
+        instancia._evento_salvo = instancia.__dict__.get('evento_id')
+        return instancia
+
+    class Meta:
+        indexes = [
+            # Listagem paginada/relatório (ORDER BY horario_inicio, id)
+            models.Index(fields=['horario_inicio', 'id'], name='atividade_horario_idx'),
+            # Programação de um evento (/eventos/{id}/atividades/), já na ordem da paginação
+            models.Index(fields=['evento', 'horario_inicio', 'id'], name='atividade_evento_horario_idx'),
+        ]
     
     def __str__(self):
         return f"{self.titulo} ({self.evento.nome})"
@@ -137,11 +262,173 @@ class UserEventos(models.Model):
     evento = models.ForeignKey(Evento, on_delete=models.CASCADE) # id_eventos 
     data_inscricao = models.DateTimeField(auto_now_add=True)
     status = models.CharField(max_length=1, choices=status_inscrito, default='C')
+
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        # Guarda o status/evento como vieram do banco, para os contadores (signals)
+        # saberem se houve troca de status ao salvar
+        instancia = super().from_db(db, field_names, values)
+        instancia._status_salvo = instancia.__dict__.get('status')
+        instancia._evento_salvo = instancia.__dict__.get('evento_id')
+        return instancia
     
     class Meta:
         # Garante que um usuário só pode se inscrever uma vez em um evento específico
         unique_together = ('user', 'evento')
 
+        indexes = [
+            # Inscritos/confirmados por evento (contadores, certificados). Também atende
+            # filter(status='C') sem evento (o planejador percorre os eventos do índice),
+            # por isso não há um índice parcial só das confirmadas.
+            models.Index(fields=['evento', 'status'], name='inscricao_evento_status_idx'),
+            # Listagem paginada/relatório de inscrições (ORDER BY data_inscricao, id)
+            models.Index(fields=['data_inscricao', 'id'], name='inscricao_data_idx'),
+        ]
+
         # Adiciona os nomes bonitos para o Admin
         verbose_name = "Inscrição"
-        verbose_name_plural = "Inscrições"
\ No newline at end of file
+        verbose_name_plural = "Inscrições"
+
+# 6. Tabela de Tarefas de Relatório (fila de PDFs gerados em segundo plano)
+class TarefaRelatorio(models.Model):
+    tipos_relatorio = [
+        ('eventos', 'Eventos'),
+        ('atividades', 'Atividades'),
+        ('participantes', 'Participantes'),
+        ('inscricoes', 'Inscrições'),
+        ('grupos', 'Grupos'),
+        ('certificados', 'Certificados'),
+        ('certificados_zip', 'Certificados individuais (ZIP)'),
+    ]
+    status_tarefa = [
+        ('P', 'Pendente'),
+        ('E', 'Em execução'),
+        ('C', 'Concluída'),
+        ('F', 'Falhou'),
+    ]
+    tipo = models.CharField(max_length=20, choices=tipos_relatorio)
+    # Filtros do relatório (ex.: {"ids": [1, 2], "titulo": "..."})
+    parametros = models.JSONField(default=dict, blank=True)
+    status = models.CharField(max_length=1, choices=status_tarefa, default='P')
+    arquivo = models.FileField(upload_to='relatorios/', blank=True)
+    erro = models.TextField(blank=True)
+    solicitante = models.ForeignKey(User, on_delete=models.SET_NULL, null=True, blank=True, related_name='tarefas_relatorio')
+    criado_em = models.DateTimeField(auto_now_add=True)
+    iniciado_em = models.DateTimeField(null=True, blank=True)
+    concluido_em = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        ordering = ['-criado_em']
+        # O worker busca sempre as pendentes mais antigas
+        indexes = [models.Index(fields=['status', 'criado_em'])]
+        verbose_name = "Tarefa de Relatório"
+        verbose_name_plural = "Tarefas de Relatório"
+
+    def __str__(self):
+        return f"#{self.pk} {self.get_tipo_display()} ({self.get_status_display()})"
+
+
+# 7. Tabela de Versões (marca cada alteração nas tabelas usadas em relatórios/caches)
+class VersaoTabela(models.Model):
+    # Rótulo do model, ex.: 'gestaoEventos.evento' ou 'auth.user'
+    tabela = models.CharField(max_length=100, primary_key=True)
+    versao = models.PositiveBigIntegerField(default=0)
+    atualizado_em = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        verbose_name = "Versão de Tabela"
+        verbose_name_plural = "Versões de Tabelas"
+
+    def __str__(self):
+        return f"{self.tabela} v{self.versao}"
+
+
+# 8. Contadores gerais do dashboard (mantidos pelos signals, ver estatisticas.py)
+class Contador(models.Model):
+    chave = models.CharField(max_length=50, primary_key=True)
+    valor = models.BigIntegerField(default=0)
+
+    def __str__(self):
+        return f"{self.chave}: {self.valor}"
+
+
+# 9. Contadores por evento (evita o Count('usereventos') sobre todos os eventos)
+class EstatisticaEvento(models.Model):
+    evento = models.OneToOneField(Evento, on_delete=models.CASCADE, primary_key=True, related_name='estatistica')
+    total_inscricoes = models.IntegerField(default=0)
+    total_confirmadas = models.IntegerField(default=0)
+
+    class Meta:
+        # Top eventos do dashboard: ORDER BY total_inscricoes DESC LIMIT 5
+        indexes = [models.Index(fields=['-total_inscricoes'], name='estatistica_total_idx')]
+        verbose_name = "Estatística de Evento"
+        verbose_name_plural = "Estatísticas de Eventos"
+
+
+# 10. Checkpoints da importação de CSV (comando importar_dados --em-massa)
+class CheckpointImportacao(models.Model):
+    # Caminho absoluto do arquivo importado
+    arquivo = models.CharField(max_length=500, primary_key=True)
+    # Tamanho e data de modificação: se o arquivo mudar, a importação recomeça do zero
+    assinatura = models.CharField(max_length=100)
+    # Byte logo depois do último lote gravado (no conteúdo descompactado, para .gz)
+    posicao = models.BigIntegerField(default=0)
+    linhas = models.BigIntegerField(default=0)
+    concluido = models.BooleanField(default=False)
+    atualizado_em = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        verbose_name = "Checkpoint de Importação"
+        verbose_name_plural = "Checkpoints de Importação"
+
+    def __str__(self):
+        return f"{self.arquivo} ({self.linhas} linhas)"
+
+
+# 11. Perfis de execução (cProfile) pedidos por staff com ?perfilar=1 (ver perfilador.py)
+class PerfilExecucao(models.Model):
+    metodo = models.CharField(max_length=10)
+    caminho = models.CharField(max_length=500)
+    view = models.CharField(max_length=200, blank=True)
+    status = models.PositiveSmallIntegerField()
+    duracao_ms = models.FloatField()
+    queries = models.PositiveIntegerField(default=0)
+    sql_ms = models.FloatField(default=0)
+    # Tempo próprio (tottime) somado por área: orm, templates, pdf, api, outros
+    por_area = models.JSONField(default=dict)
+    # Saída do pstats ordenada pelo tempo acumulado
+    relatorio = models.TextField()
+    usuario = models.ForeignKey(User, on_delete=models.SET_NULL, null=True, blank=True, related_name='perfis_execucao')
+    criado_em = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        ordering = ['-criado_em']
+        verbose_name = "Perfil de Execução"
+        verbose_name_plural = "Perfis de Execução"
+
+    def __str__(self):
+        return f"{self.metodo} {self.caminho} ({self.duracao_ms:.0f}ms)"
+
+
+# 12. Índices da busca textual: tabelas FTS5 do SQLite criadas na migração 0011 (ver busca.py).
+# Não são gerenciados pelo Django: servem só para a busca fazer o JOIN pelo ORM (rowid = id).
+class IndiceBuscaEvento(models.Model):
+    evento = models.OneToOneField(
+        Evento, on_delete=models.DO_NOTHING, primary_key=True, db_column='rowid',
+        db_constraint=False, related_name='indice_busca',
+    )
+
+    class Meta:
+        managed = False
+        db_table = 'gestaoEventos_busca_evento'
+
+
+class IndiceBuscaAtividade(models.Model):
+    atividade = models.OneToOneField(
+        Atividade, on_delete=models.DO_NOTHING, primary_key=True, db_column='rowid',
+        db_constraint=False, related_name='indice_busca',
+    )
+
+    class Meta:
+        managed = False
+        db_table = 'gestaoEventos_busca_atividade'
@@ -0,0 +1,42 @@
+from django.conf import settings
+from rest_framework.pagination import CursorPagination
+
+# ---------------------------------------------------------
+# Paginação por cursor (keyset)
+# ---------------------------------------------------------
+# Diferente do LIMIT/OFFSET, o cursor guarda a posição do último registro
+# e filtra a partir dele (WHERE coluna > valor), então a página 1000 é tão
+# rápida quanto a primeira. A ordenação precisa ser estável: sempre termina
+# no 'id' para desempatar registros com a mesma data.
+#
+# O tamanho da página vem de REST_FRAMEWORK['PAGE_SIZE'] e o limite que o
+# cliente pode pedir via ?page_size= vem de REST_FRAMEWORK['MAX_PAGE_SIZE'].
+
+
+class CursorPaginacaoPadrao(CursorPagination):
+    """Paginação padrão da API, ordenada pelo id."""
+    ordering = ('id',)
+    page_size_query_param = 'page_size'
+    max_page_size = settings.REST_FRAMEWORK.get('MAX_PAGE_SIZE', 500)
+
+    def get_ordering(self, request, queryset, view):
+        # Com ?search= (busca.py) os mais relevantes vêm primeiro
+        if 'relevancia' in queryset.query.annotations:
+            return ('-relevancia', 'id')
+        return super().get_ordering(request, queryset, view)
+
+
+class EventoPaginacao(CursorPaginacaoPadrao):
+    ordering = ('data_inicio', 'id')
+
+
+class AtividadePaginacao(CursorPaginacaoPadrao):
+    ordering = ('horario_inicio', 'id')
+
+
+class InscricaoPaginacao(CursorPaginacaoPadrao):
+    ordering = ('data_inscricao', 'id')
+
+
+class UsuarioPaginacao(CursorPaginacaoPadrao):
+    ordering = ('id',)
@@ -0,0 +1,159 @@
+import cProfile
+import io
+import pstats
+import time
+from collections import defaultdict
+
+from django.conf import settings
+from django.db import connection
+from django.http import HttpResponse
+from rest_framework.exceptions import APIException
+from rest_framework.request import Request
+from rest_framework.settings import api_settings
+
+from .metricas import ContadorQueries
+from .models import PerfilExecucao
+from .permissoes import is_staff_check
+
+# ---------------------------------------------------------
+# Perfil sob demanda (cProfile) para requisições de staff
+# ---------------------------------------------------------
+# Um usuário staff (is_staff_check) acrescenta ?perfilar=1 (ou o cabeçalho
+# X-Perfilar: 1) a qualquer rota: a requisição roda dentro do cProfile e o
+# resultado fica salvo em PerfilExecucao (o id volta no cabeçalho
+# X-Perfil-Id; a lista fica no admin, ordenada pelo tempo). Com
+# ?perfilar=texto a resposta é o próprio relatório, em texto.
+#
+# Além do pstats, o tempo próprio das funções é somado por área (ORM,
+# templates, layout do PDF...) para mostrar de cara onde o tempo foi gasto.
+#
+# O DRF só autentica dentro da view, depois deste middleware: nas rotas da
+# API sem sessão, o usuário é identificado aqui com os mesmos autenticadores
+# do DRF (token, basic...), senão as chamadas com token nunca seriam perfiladas.
+
+PARAMETRO = 'perfilar'
+CABECALHO = 'HTTP_X_PERFILAR'
+PREFIXO_API = '/api/'
+
+# Trecho do caminho do arquivo -> área (a primeira que bater vale)
+AREAS = (
+    ('django/db/', 'orm'),
+    ('django/template', 'templates'),
+    ('xhtml2pdf', 'pdf'),
+    ('reportlab', 'pdf'),
+    ('html5lib', 'pdf'),
+    ('pypdf', 'pdf'),
+    ('rest_framework', 'api'),
+)
+
+
+def area_do_arquivo(arquivo):
+    arquivo = arquivo.replace('\\', '/')
+    for trecho, area in AREAS:
+        if trecho in arquivo:
+            return area
+    return 'outros'
+
+
+def tempo_por_area(estatisticas):
+    """Soma o tempo próprio (tottime, em ms) das funções de cada área."""
+    areas = defaultdict(float)
+    for (arquivo, _, _), (_, _, tempo_proprio, _, _) in estatisticas.stats.items():
+        areas[area_do_arquivo(arquivo)] += tempo_proprio * 1000
+    return {area: round(ms, 1) for area, ms in sorted(areas.items(), key=lambda item: -item[1])}
+
+
+def usuario_do_pedido(request):
+    """request.user ou, nas rotas da API, o usuário dos autenticadores do DRF."""
+    if request.user.is_authenticated or not request.path.startswith(PREFIXO_API):
+        return request.user
+    autenticadores = [classe() for classe in api_settings.DEFAULT_AUTHENTICATION_CLASSES]
+    try:
+        # Ao autenticar, o Request do DRF também grava o usuário em request.user
+        return Request(request, authenticators=autenticadores).user
+    except APIException:
+        # Credencial inválida: a própria view responde com o erro
+        return request.user
+
+
+def modo_pedido(request):
+    """'texto', 'salvar' ou None (requisição normal)."""
+    valor = request.GET.get(PARAMETRO) or request.META.get(CABECALHO)
+    if not valor or valor == '0' or not getattr(settings, 'PERFILADOR_ATIVO', True):
+        return None
+    if not is_staff_check(usuario_do_pedido(request)):
+        return None
+    return 'texto' if valor == 'texto' else 'salvar'
+
+
+class PerfiladorMiddleware:
+    # Precisa vir depois do AuthenticationMiddleware (usa request.user na sessão)
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        modo = modo_pedido(request)
+        if modo is None:
+            return self.get_response(request)
+
+        perfil = cProfile.Profile()
+        try:
+            perfil.enable()
+        except ValueError:
+            # Outro profiler já está ativo neste processo: segue sem perfilar
+            return self.get_response(request)
+
+        consultas = ContadorQueries()
+        inicio = time.perf_counter()
+        try:
+            with connection.execute_wrapper(consultas):
+                response = self.get_response(request)
+        finally:
+            perfil.disable()
+        duracao_ms = (time.perf_counter() - inicio) * 1000
+
+        registro = salvar_perfil(request, response, perfil, consultas, duracao_ms)
+        if modo == 'texto':
+            return HttpResponse(formatar(registro), content_type='text/plain; charset=utf-8')
+        response['X-Perfil-Id'] = str(registro.pk)
+        return response
+
+
+def salvar_perfil(request, response, perfil, consultas, duracao_ms):
+    saida = io.StringIO()
+    estatisticas = pstats.Stats(perfil, stream=saida)
+    estatisticas.sort_stats(pstats.SortKey.CUMULATIVE).print_stats(getattr(settings, 'PERFILADOR_LINHAS', 60))
+
+    match = getattr(request, 'resolver_match', None)
+    registro = PerfilExecucao.objects.create(
+        metodo=request.method,
+        caminho=request.get_full_path()[:500],
+        view=(match.view_name or match._func_path)[:200] if match else '',
+        status=response.status_code,
+        duracao_ms=round(duracao_ms, 1),
+        queries=consultas.total,
+        sql_ms=round(consultas.segundos * 1000, 1),
+        por_area=tempo_por_area(estatisticas),
+        relatorio=saida.getvalue(),
+        usuario=request.user,
+    )
+    descartar_antigos()
+    return registro
+
+
+def descartar_antigos():
+    """Mantém só os PERFILADOR_MAX perfis mais recentes."""
+    maximo = getattr(settings, 'PERFILADOR_MAX', 100)
+    corte = PerfilExecucao.objects.order_by('-pk').values_list('pk', flat=True)[maximo:maximo + 1].first()
+    if corte is not None:
+        PerfilExecucao.objects.filter(pk__lte=corte).delete()
+
+
+def formatar(registro):
+    areas = ', '.join(f'{area} {ms:.1f}ms' for area, ms in registro.por_area.items())
+    return (
+        f'{registro.metodo} {registro.caminho} -> {registro.status} em {registro.duracao_ms:.1f}ms\n'
+        f'{registro.queries} queries ({registro.sql_ms:.1f}ms em SQL)\n'
+        f'Tempo próprio por área: {areas}\n\n'
+        f'{registro.relatorio}'
+    )
@@ -0,0 +1,34 @@
+# ---------------------------------------------------------
+# Quem pode acessar as áreas de organização (relatórios, métricas, perfis)
+# ---------------------------------------------------------
+# Fica fora de views.py para que middlewares (perfilador.py) possam usar
+# a mesma regra sem importar as views.
+
+from rest_framework.permissions import BasePermission
+
+
+def is_staff_check(user):
+    # 1. Se não estiver logado, barra direto
+    if not user.is_authenticated:
+        return False
+        
+    # 2. Se for Superusuário (admin geral), LIBERA GERAL
+    if user.is_superuser:
+        return True
+
+    # 3. Se for usuário comum, verifica se tem perfil e se é do tipo Staff ('O')
+    if hasattr(user, 'perfil') and user.perfil.is_grupo_staff:
+        return True
+        
+    return False
+
+
+class IsStaff(BasePermission):
+    """A regra do is_staff_check nas rotas da API (no lugar do IsAdminUser, que só olha user.is_staff)."""
+
+    def has_permission(self, request, view):
+        return is_staff_check(request.user)
+
+# Desativei para usar o SuperUser
+'''def is_staff_check(user):
+    return user.is_authenticated and hasattr(user, 'perfil') and user.perfil.is_grupo_staff'''
@@ -0,0 +1,160 @@
+from django.contrib.auth.models import User, Group
+from django.http import FileResponse
+from django.utils.cache import get_conditional_response
+from django.utils.http import http_date
+
+from .models import Evento, Atividade, UserEventos
+from .utils import gerar_pdf_em_blocos
+from . import cache_relatorios, versoes
+
+# ---------------------------------------------------------
+# Definição dos relatórios em PDF
+# ---------------------------------------------------------
+# Cada relatório recebe os parâmetros (ex.: {'ids': [...], 'titulo': '...'})
+# e devolve (template, contexto, chave da lista, queryset). Assim a mesma
+# definição é usada pelas views, pelas actions do admin e pelo worker da fila.
+
+
+def _filtrar_ids(queryset, parametros):
+    ids = parametros.get('ids')
+    if ids is not None:
+        queryset = queryset.filter(pk__in=ids)
+    return queryset
+
+
+def relatorio_eventos(parametros):
+    eventos = Evento.objects.all().order_by('data_inicio', 'id').prefetch_related(
+        'atividades__responsavel',
+        'usereventos_set__user'
+    )
+    context = {'titulo': parametros.get('titulo', 'Relatório Geral de Eventos')}
+    return 'relatorios/relatorio_eventos.html', context, 'eventos', _filtrar_ids(eventos, parametros)
+
+
+def relatorio_atividades(parametros):
+    # Já traz os dados relacionados para ser rápido
+    atividades = Atividade.objects.all().select_related('evento', 'responsavel').order_by('horario_inicio', 'id')
+    context = {'titulo': parametros.get('titulo', 'Relatório Geral de Atividades')}
+    return 'relatorios/relatorio_atividades.html', context, 'atividades', _filtrar_ids(atividades, parametros)
+
+
+def relatorio_participantes(parametros):
+    # Sem ids: usuários do tipo Participante (P). Com ids: exatamente os usuários escolhidos.
+    usuarios = User.objects.all() if 'ids' in parametros else User.objects.filter(perfil__tipo='P')
+    usuarios = usuarios.order_by('first_name', 'id').select_related('perfil').prefetch_related(
+        'usereventos_set__evento',
+        'atividades_responsavel__evento'
+    )
+    context = {'titulo': parametros.get('titulo', 'Relatório de Participantes')}
+    return 'relatorios/relatorio_participantes.html', context, 'participantes', _filtrar_ids(usuarios, parametros)
+
+
+def relatorio_inscricoes(parametros):
+    inscricoes = UserEventos.objects.all().select_related('user', 'evento').order_by('-data_inscricao', '-id')
+    context = {'titulo': parametros.get('titulo', 'Relatório Geral de Inscrições')}
+    return 'relatorios/relatorio_inscricoes.html', context, 'inscricoes', _filtrar_ids(inscricoes, parametros)
+
+
+def relatorio_grupos(parametros):
+    grupos = Group.objects.all().order_by('name').prefetch_related(
+        'user_set',
+        'user_set__usereventos_set__evento',
+        'user_set__atividades_responsavel'
+    )
+    context = {'titulo': parametros.get('titulo', 'Relatório Geral de Grupos')}
+    return 'relatorios/relatorio_grupos.html', context, 'grupos', _filtrar_ids(grupos, parametros)
+
+
+def certificados(parametros):
+    # Apenas inscrições confirmadas geram certificado
+    inscricoes = UserEventos.objects.filter(status='C').select_related('user', 'evento').order_by('id')
+    context = {'titulo': parametros.get('titulo', 'Certificado de Participação')}
+    return 'relatorios/certificado.html', context, 'inscricoes', _filtrar_ids(inscricoes, parametros)
+
+
+RELATORIOS = {
+    'eventos': relatorio_eventos,
+    'atividades': relatorio_atividades,
+    'participantes': relatorio_participantes,
+    'inscricoes': relatorio_inscricoes,
+    'grupos': relatorio_grupos,
+    'certificados': certificados,
+}
+
+
+# Tabelas cujos dados aparecem em cada relatório (definem a versão do PDF em cache)
+TABELAS_POR_RELATORIO = {
+    'eventos': (versoes.EVENTO, versoes.ATIVIDADE, versoes.INSCRICAO, versoes.USUARIO),
+    'atividades': (versoes.ATIVIDADE, versoes.EVENTO, versoes.USUARIO),
+    'participantes': (versoes.USUARIO, versoes.PERFIL, versoes.INSCRICAO, versoes.EVENTO, versoes.ATIVIDADE),
+    'inscricoes': (versoes.INSCRICAO, versoes.USUARIO, versoes.EVENTO),
+    'grupos': (versoes.GRUPO, versoes.USUARIO, versoes.PERFIL, versoes.INSCRICAO, versoes.EVENTO, versoes.ATIVIDADE),
+    'certificados': (versoes.INSCRICAO, versoes.USUARIO, versoes.EVENTO, versoes.ATIVIDADE),
+}
+
+
+def montar_relatorio(tipo, parametros=None):
+    """Devolve (template, contexto, chave, queryset) do relatório `tipo`."""
+    if tipo not in RELATORIOS:
+        raise ValueError(f'Tipo de relatório desconhecido: {tipo}')
+    return RELATORIOS[tipo](parametros or {})
+
+
+def versao_relatorio(tipo, parametros=None):
+    """Chave do PDF para os dados atuais e data da última alteração nesses dados."""
+    if tipo not in RELATORIOS:
+        raise ValueError(f'Tipo de relatório desconhecido: {tipo}')
+    versoes_atuais, ultima_alteracao = versoes.obter(*TABELAS_POR_RELATORIO[tipo])
+    return cache_relatorios.calcular_chave(tipo, parametros, versoes_atuais), ultima_alteracao
+
+
+def _abrir_pdf(tipo, parametros, chave):
+    """Abre o PDF da chave no cache; se não estiver lá, gera e guarda."""
+    if not cache_relatorios.ativo():
+        return gerar_pdf_em_blocos(*montar_relatorio(tipo, parametros))
+
+    caminho = cache_relatorios.buscar(chave)
+    if caminho is None:
+        arquivo = gerar_pdf_em_blocos(*montar_relatorio(tipo, parametros))
+        if arquivo is None:
+            return None
+        with arquivo:
+            caminho = cache_relatorios.guardar(chave, arquivo)
+    try:
+        return open(caminho, 'rb')
+    except FileNotFoundError:
+        # Saiu do cache por LRU entre a busca e a leitura: gera de novo sem cache
+        return gerar_pdf_em_blocos(*montar_relatorio(tipo, parametros))
+
+
+def gerar_relatorio(tipo, parametros=None):
+    """PDF do relatório como arquivo aberto (usado pelo worker da fila)."""
+    chave, _ = versao_relatorio(tipo, parametros)
+    return _abrir_pdf(tipo, parametros, chave)
+
+
+def render_relatorio(tipo, parametros=None, request=None):
+    """
+    PDF do relatório como resposta HTTP, com ETag/Last-Modified. Se o navegador
+    já tem essa versão (If-None-Match/If-Modified-Since), responde 304 sem gerar nada.
+    """
+    chave, ultima_alteracao = versao_relatorio(tipo, parametros)
+    etag = f'"{chave}"'
+    last_modified = int(ultima_alteracao.timestamp()) if ultima_alteracao else None
+
+    if request is not None:
+        resposta = get_conditional_response(request, etag=etag, last_modified=last_modified)
+        if resposta is not None:
+            return resposta
+
+    arquivo = _abrir_pdf(tipo, parametros, chave)
+    if arquivo is None:
+        return None
+
+    resposta = FileResponse(arquivo, content_type='application/pdf')
+    resposta['ETag'] = etag
+    if last_modified:
+        resposta['Last-Modified'] = http_date(last_modified)
+    # Dados internos: só o navegador do próprio usuário guarda, sempre revalidando
+    resposta['Cache-Control'] = 'private, no-cache'
+    return resposta
@@ -1,7 +1,31 @@
 from rest_framework import serializers
+from django.conf import settings
 from django.contrib.auth.models import User
 from .models import Perfil, Evento, Atividade, UserEventos
 
+# ---------------------------------------------------------
+# 0. Campos dinâmicos (?fields= / ?expand=)
+# ---------------------------------------------------------
+
+class CamposDinamicosSerializerMixin:
+    """
+    Emite apenas os campos listados em context['campos'] (montado pela ViewSet).
+    Atua só no serializer raiz, para não cortar os campos dos aninhados.
+    Os campos de Meta.campos_detalhe ficam fora da listagem por padrão.
+    """
+
+    def _is_raiz(self):
+        if self.parent is None:
+            return True
+        return isinstance(self.parent, serializers.ListSerializer) and self.parent.parent is None
+
+    def get_fields(self):
+        fields = super().get_fields()
+        campos = self.context.get('campos')
+        if campos is None or not self._is_raiz():
+            return fields
+        return {nome: campo for nome, campo in fields.items() if nome in campos}
+
 # ---------------------------------------------------------
 # 1. Serializer de Inscrição (UserEventos)
 # ---------------------------------------------------------
@@ -18,7 +42,7 @@ class UserEventosSerializer(serializers.ModelSerializer):
 # 3. Serializer de Atividade
 # ---------------------------------------------------------
 
-class AtividadeSerializer(serializers.ModelSerializer):
+class AtividadeSerializer(CamposDinamicosSerializerMixin, serializers.ModelSerializer):
     # Campos de leitura para mostrar nomes em vez de apenas IDs
     responsavel_nome = serializers.ReadOnlyField(source='responsavel.username')
     evento_titulo = serializers.ReadOnlyField(source='evento.nome')
@@ -29,22 +53,27 @@ class AtividadeSerializer(serializers.ModelSerializer):
             'id', 'titulo', 'descricao', 'horario_inicio', 'horario_fim', 
             'tipo', 'evento', 'evento_titulo', 'responsavel', 'responsavel_nome'
         ]
+        campos_detalhe = ('descricao',)
 
 # ---------------------------------------------------------
 # 4. Serializer de Evento
 # ---------------------------------------------------------
 
-class EventoSerializer(serializers.ModelSerializer):
+class EventoSerializer(CamposDinamicosSerializerMixin, serializers.ModelSerializer):
     # Mostra as atividades aninhadas dentro do evento (útil para detalhes)
     # read_only=True garante que não precisamos enviar atividades ao criar um evento
     atividades = AtividadeSerializer(many=True, read_only=True)
+    # Horas, a partir do campo mantido pelas atividades (sem query extra)
+    carga_horaria_total = serializers.IntegerField(read_only=True)
     
     class Meta:
         model = Evento
         fields = [
             'id', 'nome', 'descricao', 'data_inicio', 'data_fim', 
-            'local', 'atividades'
+            'local', 'capacidade', 'carga_horaria_total', 'atividades'
         ]
+        # Na listagem as atividades só vêm com ?expand=atividades
+        campos_detalhe = ('atividades',)
 
 # ---------------------------------------------------------
 # 2. Serializers de Usuário e Perfil (Participante)
@@ -55,7 +84,7 @@ class PerfilSerializer(serializers.ModelSerializer):
         model = Perfil
         fields = ['celular', 'tipo']
 
-class UserSerializer(serializers.ModelSerializer):
+class UserSerializer(CamposDinamicosSerializerMixin, serializers.ModelSerializer):
     # Aninhamos o perfil para que, ao chamar o User, venha os dados do Perfil junto
     perfil = PerfilSerializer()
 
@@ -69,6 +98,8 @@ class UserSerializer(serializers.ModelSerializer):
         model = User
         fields = ['id', 'username', 'email', 'first_name', 'last_name', 'perfil', 'inscricoes', 'atividades_lideradas']
         # Adicionado 'inscricoes' e 'atividades_lideradas' na lista acima
+        # Na listagem só vêm com ?expand=inscricoes,atividades_lideradas
+        campos_detalhe = ('inscricoes', 'atividades_lideradas')
 
     # Método create sobrescrito para salvar User e Perfil ao mesmo tempo
     def create(self, validated_data):
@@ -112,4 +143,45 @@ class EventoDashboardSerializer(serializers.ModelSerializer):
         fields = [
             'id', 'nome', 'data_inicio', 'local', 
             'atividades', 'inscricoes'
-        ]
\ No newline at end of file
+        ]
+
+class EventoResumoSerializer(serializers.ModelSerializer):
+    """
+    Dashboard resumido para vários eventos de uma vez (/api/eventos/dashboard/).
+    Os totais vêm anotados pelo banco (Evento.objects.com_totais()).
+    """
+    carga_horaria_total = serializers.IntegerField(read_only=True)
+    total_inscricoes = serializers.IntegerField(read_only=True)
+    total_confirmadas = serializers.IntegerField(read_only=True)
+    total_pendentes = serializers.IntegerField(read_only=True)
+    total_atividades = serializers.IntegerField(read_only=True)
+
+    class Meta:
+        model = Evento
+        fields = [
+            'id', 'nome', 'data_inicio', 'local', 'capacidade', 'carga_horaria_total',
+            'total_inscricoes', 'total_confirmadas', 'total_pendentes', 'total_atividades',
+        ]
+
+class InscricaoLoteSerializer(serializers.Serializer):
+    """Entrada da inscrição em lote: usuários por id e/ou username."""
+    ids = serializers.ListField(child=serializers.IntegerField(), required=False, default=list)
+    usernames = serializers.ListField(child=serializers.CharField(), required=False, default=list)
+    status = serializers.ChoiceField(choices=UserEventos.status_inscrito, default='C')
+
+    def validate(self, data):
+        total = len(data['ids']) + len(data['usernames'])
+        if not total:
+            raise serializers.ValidationError('Informe ao menos um usuário em "ids" ou "usernames".')
+        limite = getattr(settings, 'INSCRICOES_LOTE_MAX', 5000)
+        if total > limite:
+            raise serializers.ValidationError(f'No máximo {limite} usuários por requisição.')
+        return data
+
+
+class MudancaStatusSerializer(serializers.Serializer):
+    """Entrada da mudança de status em massa das inscrições de um evento."""
+    para = serializers.ChoiceField(choices=UserEventos.status_inscrito)
+    de = serializers.ChoiceField(choices=UserEventos.status_inscrito, required=False)
+    # Restringe a alguns usuários (vazio = todas as inscrições do evento)
+    ids = serializers.ListField(child=serializers.IntegerField(), required=False)
@@ -0,0 +1,180 @@
+from django.contrib.auth.models import User, Group
+from django.db.models import Case, F, IntegerField, QuerySet, Value, When
+from django.db.models.signals import post_save, post_delete, m2m_changed
+from django.dispatch import Signal, receiver
+
+from .models import Evento, Atividade, UserEventos, Perfil, EstatisticaEvento
+from . import busca, estatisticas, versoes
+
+# Enviado uma vez por inscricoes.alterar_status() (UPDATE em massa, sem post_save por linha).
+# Argumentos: para, total, confirmadas_por_evento ({evento_id: variação de confirmadas})
+status_inscricoes_alterado = Signal()
+
+# ---------------------------------------------------------
+# Signals: mantêm as versões das tabelas (versoes.py) em dia
+# ---------------------------------------------------------
+
+TABELAS_MONITORADAS = {
+    Evento: versoes.EVENTO,
+    Atividade: versoes.ATIVIDADE,
+    UserEventos: versoes.INSCRICAO,
+    Perfil: versoes.PERFIL,
+    Group: versoes.GRUPO,
+}
+
+
+def invalidar_versao(sender, **kwargs):
+    versoes.invalidar_no_commit(TABELAS_MONITORADAS[sender])
+
+
+# Conectado só nos models monitorados: um receiver sem sender valeria para todos
+# os models e desligaria o "fast delete" do Django (DELETE direto, sem carregar as linhas)
+for modelo in TABELAS_MONITORADAS:
+    post_save.connect(invalidar_versao, sender=modelo, dispatch_uid=f'invalidar_versao_{modelo._meta.label}')
+    post_delete.connect(invalidar_versao, sender=modelo, dispatch_uid=f'invalidar_versao_{modelo._meta.label}')
+
+
+def apagado_com_o_evento(origin):
+    """A linha está sendo apagada em cascata junto com um Evento (post_delete, kwarg `origin`)."""
+    modelo = origin.model if isinstance(origin, QuerySet) else type(origin)
+    return modelo is Evento
+
+
+@receiver(post_save, sender=User)
+@receiver(post_delete, sender=User)
+def invalidar_versao_usuario(sender, update_fields=None, **kwargs):
+    # O login salva só o last_login: isso não muda nenhum relatório
+    if update_fields and set(update_fields) <= {'last_login'}:
+        return
+    versoes.invalidar_no_commit(versoes.USUARIO)
+
+
+@receiver(post_save, sender=Group)
+@receiver(post_delete, sender=Group)
+def limpar_ids_grupos(sender, **kwargs):
+    # Grupo renomeado/apagado: os ids em cache (Perfil.objects.ids_grupos) podem estar errados
+    Perfil.objects.limpar_ids_grupos()
+
+
+@receiver(m2m_changed, sender=User.groups.through)
+def invalidar_versao_grupos(sender, action, **kwargs):
+    if action in ('post_add', 'post_remove', 'post_clear'):
+        versoes.invalidar_no_commit(versoes.GRUPO)
+
+
+# ---------------------------------------------------------
+# Signals: contadores do dashboard (estatisticas.py)
+# ---------------------------------------------------------
+
+@receiver(post_save, sender=Evento)
+def contar_evento(sender, instance, created, **kwargs):
+    if created:
+        estatisticas.criar_evento(instance.pk)
+    else:
+        # Nome/data aparecem no dashboard
+        estatisticas.limpar_cache()
+
+
+@receiver(post_delete, sender=Evento)
+def descontar_evento(sender, instance, **kwargs):
+    estatisticas.somar(estatisticas.EVENTOS, -1)
+
+
+@receiver(post_save, sender=User)
+def contar_usuario(sender, instance, created, **kwargs):
+    if created:
+        estatisticas.somar(estatisticas.USUARIOS, 1)
+
+
+@receiver(post_delete, sender=User)
+def descontar_usuario(sender, instance, **kwargs):
+    estatisticas.somar(estatisticas.USUARIOS, -1)
+
+
+@receiver(post_save, sender=UserEventos)
+def contar_inscricao(sender, instance, created, **kwargs):
+    confirmada = int(instance.status == 'C')
+
+    if created and getattr(instance, '_vaga_reservada', False):
+        # inscricoes.inscrever() já contou a vaga no evento
+        estatisticas.limpar_cache()
+    elif created:
+        estatisticas.somar_inscricao(instance.evento_id, 1, confirmada)
+    else:
+        # Compara com o que foi carregado do banco (UserEventos.from_db)
+        status_salvo = getattr(instance, '_status_salvo', instance.status)
+        evento_salvo = getattr(instance, '_evento_salvo', instance.evento_id)
+        era_confirmada = int(status_salvo == 'C')
+
+        if evento_salvo != instance.evento_id:
+            estatisticas.somar_inscricao(evento_salvo, -1, -era_confirmada)
+            estatisticas.somar_inscricao(instance.evento_id, 1, confirmada)
+        elif confirmada != era_confirmada:
+            estatisticas.somar_inscricao(instance.evento_id, 0, confirmada - era_confirmada)
+
+    instance._status_salvo = instance.status
+    instance._evento_salvo = instance.evento_id
+
+
+@receiver(post_delete, sender=UserEventos)
+def descontar_inscricao(sender, instance, origin=None, **kwargs):
+    # Evento apagado: a linha de EstatisticaEvento vai junto, não há o que descontar
+    if apagado_com_o_evento(origin):
+        return
+    status_salvo = getattr(instance, '_status_salvo', instance.status)
+    estatisticas.somar_inscricao(instance.evento_id, -1, -int(status_salvo == 'C'))
+
+
+# ---------------------------------------------------------
+# Signals: carga horária do evento (Evento.carga_horaria)
+# ---------------------------------------------------------
+
+@receiver(post_save, sender=Atividade)
+@receiver(post_delete, sender=Atividade)
+def atualizar_carga_horaria(sender, instance, origin=None, **kwargs):
+    if apagado_com_o_evento(origin):
+        return
+    # Se a atividade trocou de evento, o evento antigo também muda (Atividade.from_db)
+    eventos = {instance.evento_id, getattr(instance, '_evento_salvo', instance.evento_id)}
+    Evento.objects.filter(pk__in=eventos).atualizar_carga_horaria()
+    instance._evento_salvo = instance.evento_id
+
+
+# ---------------------------------------------------------
+# Signals: índices da busca textual (busca.py)
+# ---------------------------------------------------------
+
+@receiver(post_save, sender=Evento)
+@receiver(post_save, sender=Atividade)
+def indexar_busca(sender, instance, update_fields=None, **kwargs):
+    # save(update_fields=...) sem nenhum campo indexado não muda o índice
+    if update_fields and not set(update_fields) & set(busca.INDICES[sender].campos):
+        return
+    busca.backend().indexar(sender, [instance])
+
+
+@receiver(post_delete, sender=Evento)
+@receiver(post_delete, sender=Atividade)
+def remover_busca(sender, instance, **kwargs):
+    busca.backend().remover(sender, [instance.pk])
+
+
+# ---------------------------------------------------------
+# Signal agregado: mudança de status em massa
+# ---------------------------------------------------------
+
+@receiver(status_inscricoes_alterado)
+def contabilizar_mudanca_status(sender, total, confirmadas_por_evento, **kwargs):
+    if not total:
+        return
+    variacoes = {evento_id: delta for evento_id, delta in confirmadas_por_evento.items() if delta}
+    if variacoes:
+        # Um único UPDATE para todos os eventos do lote
+        EstatisticaEvento.objects.filter(evento_id__in=variacoes).update(
+            total_confirmadas=F('total_confirmadas') + Case(
+                *[When(evento_id=evento_id, then=Value(delta)) for evento_id, delta in variacoes.items()],
+                default=Value(0), output_field=IntegerField(),
+            )
+        )
+    versoes.invalidar(versoes.INSCRICAO)
+    estatisticas.limpar_cache()
@@ -0,0 +1,271 @@
+import random
+import time
+from contextlib import contextmanager
+from datetime import datetime, timedelta, timezone as dt_timezone
+
+from django.contrib.auth.hashers import make_password
+from django.contrib.auth.models import User
+
+from .models import Evento, Atividade, Perfil, UserEventos
+from . import busca, estatisticas, versoes
+
+# ---------------------------------------------------------
+# Dados sintéticos para testes de escala
+# ---------------------------------------------------------
+# Gera usuários (com Perfil e grupos), eventos, atividades e inscrições em
+# lotes de bulk_create, a partir de uma semente e de uma data de referência,
+# o "hoje" dos dados (mesma semente, referência e volumes = mesmos dados, em
+# qualquer dia). A distribuição imita a produção:
+#
+# - popularidade dos eventos segue uma lei de potência (Zipf): poucos eventos
+#   concentram boa parte das inscrições e a maioria tem poucas;
+# - eventos espalhados em dois anos (um para trás, um para frente), em dias
+#   úteis e horário comercial;
+# - inscrições concentradas nas semanas anteriores ao início do evento;
+# - eventos passados têm mais inscrições confirmadas que os futuros;
+# - metade dos eventos tem capacidade, um pouco acima das inscrições geradas.
+#
+# bulk_create não dispara signals: no final as versões das tabelas, os
+# contadores do dashboard e a carga horária dos eventos são atualizados.
+
+NOMES = (
+    'Ana', 'Bruno', 'Carla', 'Daniel', 'Eduarda', 'Felipe', 'Gabriela', 'Heitor', 'Isabela', 'João',
+    'Karina', 'Lucas', 'Mariana', 'Nicolas', 'Otávio', 'Paula', 'Rafael', 'Sofia', 'Thiago', 'Vitória',
+)
+TEMAS = (
+    'Python', 'Dados', 'Segurança', 'Nuvem', 'Design', 'Robótica', 'Empreendedorismo', 'IA',
+    'Redes', 'Games', 'Educação', 'Saúde Digital',
+)
+LOCAIS = ('Auditório', 'Sala 101', 'Sala 202', 'Laboratório', 'Ginásio', 'Online')
+
+# Data de referência padrão: fixa, para a mesma semente gerar os mesmos dados em qualquer dia
+REFERENCIA = datetime(2026, 1, 1, tzinfo=dt_timezone.utc)
+
+
+def _roleta(opcoes):
+    """((valor, porcentagem), ...) -> tupla de 100 posições para sortear com random.choice (rápido)."""
+    return tuple(valor for valor, porcentagem in opcoes for _ in range(porcentagem))
+
+
+# Tipos de perfil e de atividade e status das inscrições, em porcentagem
+TIPOS_PERFIL = _roleta((('P', 90), ('C', 5), ('X', 3), ('O', 2)))
+TIPOS_ATIVIDADE = _roleta((('P', 50), ('W', 20), ('O', 20), ('X', 10)))
+STATUS_PASSADO = _roleta((('C', 90), ('P', 5), ('X', 5)))
+STATUS_FUTURO = _roleta((('C', 70), ('P', 25), ('X', 5)))
+
+
+@contextmanager
+def _sem_auto_now_add(modelo, campo):
+    """Permite gravar datas escolhidas em um campo auto_now_add durante o bulk_create."""
+    field = modelo._meta.get_field(campo)
+    field.auto_now_add = False
+    try:
+        yield
+    finally:
+        field.auto_now_add = True
+
+
+def distribuir(total, pesos, limite):
+    """
+    Reparte `total` entre os itens proporcionalmente aos `pesos`, sem passar
+    de `limite` por item. O que sobra de um item cheio vai para os seguintes
+    e, se ainda faltar no fim, para os primeiros que tiverem espaço.
+    """
+    restante, peso_restante = total, sum(pesos)
+    quantidades = []
+    for peso in pesos:
+        quantidade = min(limite, restante, round(restante * peso / peso_restante)) if peso_restante > 0 else 0
+        quantidades.append(quantidade)
+        restante -= quantidade
+        peso_restante -= peso
+    for posicao, quantidade in enumerate(quantidades):
+        if restante <= 0:
+            break
+        extra = min(limite - quantidade, restante)
+        quantidades[posicao] += extra
+        restante -= extra
+    return quantidades
+
+
+class GeradorSintetico:
+    """
+    Uso:
+        gerador = GeradorSintetico(semente=42, prefixo='sint42')
+        gerador.gerar(usuarios=100_000, eventos=10_000, atividades=200_000, inscricoes=5_000_000)
+    """
+
+    def __init__(self, semente=42, prefixo='sint', tamanho_lote=20_000, concentracao=1.1, log=None, referencia=None):
+        self.aleatorio = random.Random(semente)
+        self.prefixo = prefixo
+        self.tamanho_lote = tamanho_lote
+        # Expoente da lei de potência da popularidade (0 = todos os eventos iguais)
+        self.concentracao = concentracao
+        self.log = log or (lambda mensagem: None)
+        # "Agora" dos dados gerados: eventos antes dela são passados, inscrições nunca depois dela
+        self.agora = (referencia or REFERENCIA).replace(minute=0, second=0, microsecond=0)
+
+    def existe(self):
+        return User.objects.filter(username__startswith=f'{self.prefixo}_').exists()
+
+    def gerar(self, usuarios, eventos, atividades, inscricoes, senha='senha123'):
+        """Gera os volumes pedidos e devolve {tabela: linhas criadas}."""
+        ids_usuarios = self.gerar_usuarios(usuarios, senha)
+        datas_eventos = self.gerar_eventos(eventos)
+        criadas = {
+            'usuarios': len(ids_usuarios),
+            'eventos': len(datas_eventos),
+            'atividades': self.gerar_atividades(atividades, datas_eventos, ids_usuarios),
+            'inscricoes': self.gerar_inscricoes(inscricoes, datas_eventos, ids_usuarios),
+        }
+        self.finalizar()
+        return criadas
+
+    def _etapa(self, nome, inicio, quantidade):
+        self.log(f'{nome}: {quantidade} em {time.perf_counter() - inicio:.1f}s')
+
+    # -----------------------------------------------------------
+    # 1. Usuários (+ Perfil e grupos)
+    # -----------------------------------------------------------
+    def gerar_usuarios(self, quantidade, senha):
+        inicio = time.perf_counter()
+        # Um único hash para todos: o PBKDF2 por usuário levaria horas
+        senha = make_password(senha)
+        ids = []
+        for comeco in range(0, quantidade, self.tamanho_lote):
+            lote = []
+            for i in range(comeco, min(quantidade, comeco + self.tamanho_lote)):
+                username = f'{self.prefixo}_{i}'
+                lote.append(User(
+                    username=username, email=f'{username}@exemplo.com', password=senha,
+                    first_name=self.aleatorio.choice(NOMES),
+                    date_joined=self.agora - timedelta(days=self.aleatorio.randrange(730)),
+                ))
+            User.objects.bulk_create(lote, batch_size=self.tamanho_lote)
+            if any(user.pk is None for user in lote):
+                # Bancos sem RETURNING (ex.: MySQL) não preenchem o id no bulk_create
+                lote = User.objects.filter(username__in=[user.username for user in lote]).order_by('id')
+            ids_lote = [user.pk for user in lote]
+
+            tipos = {user_id: self.aleatorio.choice(TIPOS_PERFIL) for user_id in ids_lote}
+            Perfil.objects.bulk_create(
+                [Perfil(user_id=user_id, tipo=tipo, celular=f'(11) 9{user_id % 10**8:08d}') for user_id, tipo in tipos.items()],
+                batch_size=self.tamanho_lote,
+            )
+            Perfil.objects.atribuir_grupos(tipos, invalidar=False)
+            ids.extend(ids_lote)
+        self._etapa('Usuários', inicio, len(ids))
+        return ids
+
+    # -----------------------------------------------------------
+    # 2. Eventos
+    # -----------------------------------------------------------
+    def gerar_eventos(self, quantidade):
+        """Devolve [(id, data_inicio)] na ordem de popularidade (o primeiro é o mais procurado)."""
+        inicio = time.perf_counter()
+        eventos = []
+        for i in range(quantidade):
+            dia = self.agora - timedelta(days=365) + timedelta(days=self.aleatorio.randrange(730))
+            if dia.weekday() >= 5:
+                dia += timedelta(days=7 - dia.weekday())  # sábado/domingo -> segunda
+            data_inicio = dia.replace(hour=self.aleatorio.choice((8, 9, 13, 14, 19)))
+            eventos.append(Evento(
+                nome=f'{self.prefixo} {self.aleatorio.choice(TEMAS)} {i}',
+                descricao='Evento gerado para testes de escala.',
+                local=self.aleatorio.choice(LOCAIS),
+                data_inicio=data_inicio,
+                data_fim=data_inicio + timedelta(days=self.aleatorio.choice((0, 0, 0, 1, 2)), hours=4),
+            ))
+        Evento.objects.bulk_create(eventos, batch_size=self.tamanho_lote)
+        if any(evento.pk is None for evento in eventos):
+            eventos = Evento.objects.filter(nome__startswith=f'{self.prefixo} ').order_by('id')
+        self._etapa('Eventos', inicio, len(eventos))
+        return [(evento.pk, evento.data_inicio) for evento in eventos]
+
+    # -----------------------------------------------------------
+    # 3. Atividades
+    # -----------------------------------------------------------
+    def gerar_atividades(self, quantidade, eventos, ids_usuarios):
+        inicio = time.perf_counter()
+        if not eventos or not ids_usuarios:
+            return 0
+        # Eventos mais populares têm um pouco mais de atividades
+        pesos = [1 + 1 / (posicao + 1) for posicao in range(len(eventos))]
+        por_evento = distribuir(quantidade, pesos, quantidade)
+        criadas = 0
+        lote = []
+        for (evento_id, data_inicio), total in zip(eventos, por_evento):
+            for j in range(total):
+                comeco = data_inicio + timedelta(hours=j % 8, days=j // 8)
+                lote.append(Atividade(
+                    titulo=f'{self.prefixo} atividade {evento_id}-{j}',
+                    descricao='Atividade gerada para testes de escala.',
+                    tipo=self.aleatorio.choice(TIPOS_ATIVIDADE),
+                    horario_inicio=comeco,
+                    horario_fim=comeco + timedelta(minutes=self.aleatorio.choice((30, 60, 60, 90, 120))),
+                    evento_id=evento_id,
+                    responsavel_id=self.aleatorio.choice(ids_usuarios),
+                ))
+            if len(lote) >= self.tamanho_lote:
+                Atividade.objects.bulk_create(lote, batch_size=self.tamanho_lote)
+                criadas += len(lote)
+                lote = []
+        Atividade.objects.bulk_create(lote, batch_size=self.tamanho_lote)
+        criadas += len(lote)
+        self._etapa('Atividades', inicio, criadas)
+        return criadas
+
+    # -----------------------------------------------------------
+    # 4. Inscrições
+    # -----------------------------------------------------------
+    def gerar_inscricoes(self, quantidade, eventos, ids_usuarios):
+        inicio = time.perf_counter()
+        if not eventos or not ids_usuarios:
+            return 0
+        pesos = [1 / (posicao + 1) ** self.concentracao for posicao in range(len(eventos))]
+        # Cada usuário no máximo uma vez por evento (unique_together)
+        por_evento = distribuir(quantidade, pesos, len(ids_usuarios))
+
+        criadas = 0
+        lote = []
+        with _sem_auto_now_add(UserEventos, 'data_inscricao'):
+            for (evento_id, data_inicio), total in zip(eventos, por_evento):
+                status = STATUS_PASSADO if data_inicio < self.agora else STATUS_FUTURO
+                for user_id in self.aleatorio.sample(ids_usuarios, total):
+                    lote.append(UserEventos(
+                        user_id=user_id, evento_id=evento_id, status=self.aleatorio.choice(status),
+                        data_inscricao=self._data_inscricao(data_inicio),
+                    ))
+                    if len(lote) >= self.tamanho_lote:
+                        UserEventos.objects.bulk_create(lote, batch_size=self.tamanho_lote)
+                        criadas += len(lote)
+                        lote = []
+                        if criadas % (self.tamanho_lote * 100) == 0:
+                            self._etapa('Inscrições (parcial)', inicio, criadas)
+            UserEventos.objects.bulk_create(lote, batch_size=self.tamanho_lote)
+        criadas += len(lote)
+
+        # Capacidade coerente com as inscrições (nunca abaixo delas), arredondada para dezenas
+        Evento.objects.bulk_update(
+            [Evento(pk=evento_id, capacidade=max(10, -(-total * 5 // 4) // 10 * 10 + 10))
+             for (evento_id, _), total in zip(eventos, por_evento) if self.aleatorio.random() < 0.5],
+            ['capacidade'], batch_size=1000,
+        )
+        self._etapa('Inscrições', inicio, criadas)
+        return criadas
+
+    def _data_inscricao(self, data_inicio):
+        # Maioria nas duas semanas antes do evento, com cauda de alguns meses
+        minutos = min(int(self.aleatorio.expovariate(1 / 14) * 24 * 60) + 60, 180 * 24 * 60)
+        data = data_inicio - timedelta(minutes=minutos)
+        if data > self.agora:
+            # Evento futuro: a inscrição já aconteceu, em algum momento das últimas semanas
+            data = self.agora - timedelta(minutes=min(minutos, 60 * 24 * 60))
+        return data
+
+    def finalizar(self):
+        inicio = time.perf_counter()
+        versoes.invalidar(versoes.EVENTO, versoes.ATIVIDADE, versoes.INSCRICAO, versoes.USUARIO, versoes.PERFIL, versoes.GRUPO)
+        estatisticas.recalcular()
+        Evento.objects.filter(nome__startswith=f'{self.prefixo} ').atualizar_carga_horaria()
+        busca.reconstruir()
+        self._etapa('Contadores, carga horária e busca', inicio, 'atualizados')
@@ -0,0 +1,123 @@
+from django.core.files import File
+from django.db import connections
+from django.urls import reverse
+from django.utils import timezone
+
+from .certificados import gerar_certificados
+from .models import TarefaRelatorio, UserEventos
+from . import relatorios
+
+# ---------------------------------------------------------
+# Fila de relatórios em PDF (sem broker externo)
+# ---------------------------------------------------------
+# A fila é a própria tabela TarefaRelatorio. As views criam a tarefa como
+# Pendente e o comando `processar_relatorios` reserva e executa as tarefas
+# em um pool de processos, salvando o PDF em MEDIA_ROOT/relatorios/.
+#
+# Além dos relatórios de relatorios.py, a fila gera os arquivos de
+# GERADORES (ex.: o ZIP de certificados individuais).
+
+
+def _certificados_zip(parametros):
+    inscricoes = UserEventos.objects.filter(pk__in=parametros.get('ids', []))
+    # A tarefa já roda em um processo do pool da fila: renderiza aqui mesmo, sem outro pool
+    arquivo, _ = gerar_certificados(inscricoes, formato='zip', workers=0)
+    return arquivo
+
+
+# Tipo -> (função que recebe os parâmetros e devolve o arquivo aberto, extensão)
+GERADORES = {
+    'certificados_zip': (_certificados_zip, 'zip'),
+}
+
+
+def enfileirar(tipo, parametros=None, solicitante=None):
+    """Cria uma tarefa pendente para o relatório (ou gerador) `tipo`."""
+    if tipo not in GERADORES:
+        relatorios.montar_relatorio(tipo, parametros)  # valida o tipo antes de aceitar
+    return TarefaRelatorio.objects.create(
+        tipo=tipo,
+        parametros=parametros or {},
+        solicitante=solicitante if solicitante and solicitante.is_authenticated else None,
+    )
+
+
+def reservar_pendentes(limite):
+    """
+    Marca até `limite` tarefas pendentes como Em execução e devolve seus ids.
+    O UPDATE condicional garante que dois workers nunca pegam a mesma tarefa.
+    """
+    if limite <= 0:
+        return []
+    reservadas = []
+    pendentes = TarefaRelatorio.objects.filter(status='P').order_by('criado_em', 'id')
+    for tarefa_id in pendentes.values_list('id', flat=True)[:limite]:
+        if TarefaRelatorio.objects.filter(id=tarefa_id, status='P').update(status='E', iniciado_em=timezone.now()):
+            reservadas.append(tarefa_id)
+    return reservadas
+
+
+def recuperar_interrompidas():
+    """Devolve para a fila as tarefas que ficaram Em execução (worker caiu no meio)."""
+    return TarefaRelatorio.objects.filter(status='E').update(status='P', iniciado_em=None)
+
+
+def executar_tarefa(tarefa_id):
+    """Gera o arquivo de uma tarefa já reservada e registra o resultado."""
+    tarefa = TarefaRelatorio.objects.get(pk=tarefa_id)
+    try:
+        if tarefa.tipo in GERADORES:
+            gerar, extensao = GERADORES[tarefa.tipo]
+            arquivo = gerar(tarefa.parametros)
+        else:
+            arquivo, extensao = relatorios.gerar_relatorio(tarefa.tipo, tarefa.parametros), 'pdf'
+        if arquivo is None:
+            raise RuntimeError('O xhtml2pdf não conseguiu gerar o PDF.')
+        with arquivo:
+            tarefa.arquivo.save(f'{tarefa.tipo}_{tarefa.pk}.{extensao}', File(arquivo), save=False)
+        tarefa.status = 'C'
+        tarefa.erro = ''
+    except Exception as e:
+        tarefa.status = 'F'
+        tarefa.erro = str(e)
+
+    tarefa.concluido_em = timezone.now()
+    tarefa.save(update_fields=['arquivo', 'status', 'erro', 'concluido_em'])
+    return tarefa.status
+
+
+def marcar_falha(tarefa_id, erro):
+    """Registra a falha de uma tarefa cujo processo morreu antes de salvar o resultado."""
+    TarefaRelatorio.objects.filter(id=tarefa_id, status='E').update(
+        status='F', erro=erro, concluido_em=timezone.now()
+    )
+
+
+def inicializar_worker():
+    """Roda em cada processo do pool: não reaproveita a conexão herdada do processo pai."""
+    # Só esquece a conexão: close() no processo filho encerraria também a sessão do pai,
+    # que compartilha o mesmo socket/arquivo desde o fork. A primeira query abre outra
+    for conexao in connections.all(initialized_only=True):
+        conexao.connection = None
+
+
+def status_tarefa(tarefa, request=None):
+    """Representação JSON da tarefa, usada pelas rotas de acompanhamento."""
+    dados = {
+        'id': tarefa.pk,
+        'tipo': tarefa.tipo,
+        'status': tarefa.status,
+        'status_display': tarefa.get_status_display(),
+        'criado_em': tarefa.criado_em,
+        'concluido_em': tarefa.concluido_em,
+        'erro': tarefa.erro,
+        'status_url': reverse('relatorio_tarefa_status', args=[tarefa.pk]),
+        'download_url': None,
+    }
+    if tarefa.status == 'C':
+        dados['download_url'] = reverse('relatorio_tarefa_download', args=[tarefa.pk])
+    if request is not None:
+        for chave in ('status_url', 'download_url'):
+            if dados[chave]:
+                dados[chave] = request.build_absolute_uri(dados[chave])
+    return dados
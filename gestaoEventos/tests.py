@@ -1,3 +1,1536 @@
-from django.test import TestCase
+import csv
+import gzip
+import json
+import os
+import shutil
+import tempfile
+import tracemalloc
+import zipfile
+from concurrent.futures import ProcessPoolExecutor
+from datetime import timedelta
+from io import BytesIO, StringIO
+from unittest import mock
 
-# Create your tests here.
+from django.conf import settings
+from django.core.cache import cache, caches
+from django.contrib.auth.hashers import PBKDF2PasswordHasher
+from django.contrib.auth.models import User, Group
+from django.core.management import CommandError, call_command
+from django.db import IntegrityError, connection, connections
+from django.db.models import F, Sum
+from django.http import HttpResponse
+from django.test import RequestFactory, TestCase, TransactionTestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from django.utils import timezone
+from pypdf import PdfReader
+from rest_framework.authtoken.models import Token
+from rest_framework.test import APIClient
+
+from .models import Evento, Atividade, UserEventos, Perfil, Contador, EstatisticaEvento, PerfilExecucao, TarefaRelatorio
+from .certificados import carregar_dados, gerar_certificados
+from .importacao import ImportadorEmMassa, gerar_hashes
+from .signals import status_inscricoes_alterado
+from .utils import render_to_pdf_em_blocos
+from . import busca, cache_relatorios, certificados, estatisticas, inscricoes, metricas, tarefas, versoes
+
+
+# ---------------------------------------------------------
+# Dados de apoio para os testes
+# ---------------------------------------------------------
+
+def criar_dados(qtd_eventos, qtd_atividades=3, qtd_usuarios=3, prefixo='ev'):
+    """Cria eventos com atividades e inscrições para medir as queries."""
+    agora = timezone.now()
+    usuarios = []
+    for i in range(qtd_usuarios):
+        user = User.objects.create(username=f'{prefixo}_user_{i}', first_name=f'Nome{i}')
+        Perfil.objects.create(user=user, tipo='P')
+        usuarios.append(user)
+
+    eventos = []
+    for i in range(qtd_eventos):
+        evento = Evento.objects.create(
+            nome=f'{prefixo} evento {i}', descricao='Descrição', local='Auditório',
+            data_inicio=agora + timedelta(days=i), data_fim=agora + timedelta(days=i, hours=8),
+        )
+        for j in range(qtd_atividades):
+            Atividade.objects.create(
+                titulo=f'{prefixo} atividade {i}-{j}', descricao='Descrição', tipo='P',
+                horario_inicio=agora + timedelta(days=i, hours=j),
+                horario_fim=agora + timedelta(days=i, hours=j + 1),
+                evento=evento, responsavel=usuarios[j % len(usuarios)],
+            )
+        for user in usuarios:
+            UserEventos.objects.create(user=user, evento=evento)
+        eventos.append(evento)
+    return eventos, usuarios
+
+
+def criar_organizador(username='org'):
+    """Organizador pelo Perfil (tipo 'O'), a regra de permissoes.is_staff_check."""
+    user = User.objects.create(username=username)
+    Perfil.objects.create(user=user, tipo='O')
+    return user
+
+
+class DiretoriosTemporariosMixin:
+    """Aponta MEDIA_ROOT e o cache de PDFs para diretórios temporários."""
+
+    def setUp(self):
+        super().setUp()
+        self.media = tempfile.TemporaryDirectory()
+        self.addCleanup(self.media.cleanup)
+        override = override_settings(
+            MEDIA_ROOT=self.media.name,
+            RELATORIOS_CACHE_DIR=os.path.join(self.media.name, 'cache'),
+        )
+        override.enable()
+        self.addCleanup(override.disable)
+
+
+# ---------------------------------------------------------
+# 1. Orçamento de queries das rotas do router
+# ---------------------------------------------------------
+
+class OrcamentoQueriesTest(TestCase):
+    """
+    Garante que as rotas da API rodam em um número fixo de queries,
+    independente da quantidade de registros retornados.
+    """
+
+    # Número máximo de queries aceito por rota (com {evento} e {atividade} e {user} substituídos).
+    # Rotas com ETag (cache_api.py) têm +1: a leitura das versões das tabelas
+    ORCAMENTO = {
+        '/api/eventos/': 3,
+        '/api/eventos/{evento}/': 3,
+        '/api/eventos/{evento}/atividades/': 2,
+        '/api/eventos/{evento}/participantes/': 2,
+        '/api/eventos/{evento}/dashboard/': 4,
+        '/api/atividades/': 2,
+        '/api/atividades/{atividade}/': 2,
+        '/api/participantes/': 3,
+        '/api/participantes/{user}/': 3,
+    }
+
+    def setUp(self):
+        self.client = APIClient()
+        # As versões só sobem no commit (que o TestCase não faz): começa sem respostas em cache
+        caches['api'].clear()
+
+    def contar_queries(self, url):
+        with CaptureQueriesContext(connection) as contexto:
+            resposta = self.client.get(url)
+        self.assertEqual(resposta.status_code, 200, url)
+        return len(contexto.captured_queries)
+
+    def medir_rotas(self, evento, atividade, user):
+        return {
+            rota: self.contar_queries(rota.format(evento=evento.pk, atividade=atividade.pk, user=user.pk))
+            for rota in self.ORCAMENTO
+        }
+
+    def test_rotas_respeitam_orcamento(self):
+        eventos, usuarios = criar_dados(3)
+        medicoes = self.medir_rotas(eventos[0], eventos[0].atividades.first(), usuarios[0])
+
+        for rota, limite in self.ORCAMENTO.items():
+            self.assertLessEqual(medicoes[rota], limite, f'{rota} excedeu o orçamento de queries')
+
+    def test_queries_nao_crescem_com_volume(self):
+        eventos, usuarios = criar_dados(2, qtd_atividades=1, qtd_usuarios=1, prefixo='pequeno')
+        pequeno = self.medir_rotas(eventos[0], eventos[0].atividades.first(), usuarios[0])
+
+        eventos, usuarios = criar_dados(10, qtd_atividades=5, qtd_usuarios=6, prefixo='grande')
+        caches['api'].clear()
+        grande = self.medir_rotas(eventos[0], eventos[0].atividades.first(), usuarios[0])
+
+        self.assertEqual(pequeno, grande)
+
+
+# ---------------------------------------------------------
+# 2. Paginação por cursor
+# ---------------------------------------------------------
+
+class PaginacaoCursorTest(TestCase):
+
+    def setUp(self):
+        self.client = APIClient()
+        self.eventos, self.usuarios = criar_dados(7, qtd_atividades=2, qtd_usuarios=2)
+
+    def percorrer(self, url):
+        """Segue os links 'next' e devolve os ids de todas as páginas."""
+        ids = []
+        while url:
+            resposta = self.client.get(url)
+            self.assertEqual(resposta.status_code, 200)
+            ids.extend(item['id'] for item in resposta.data['results'])
+            url = resposta.data['next']
+        return ids
+
+    def test_eventos_paginados_em_ordem_estavel(self):
+        ids = self.percorrer('/api/eventos/?page_size=3')
+        esperado = list(Evento.objects.order_by('data_inicio', 'id').values_list('id', flat=True))
+        self.assertEqual(ids, esperado)
+
+    def test_rotas_aninhadas_paginadas(self):
+        evento = self.eventos[0]
+        self.assertEqual(len(self.percorrer(f'/api/eventos/{evento.pk}/atividades/?page_size=1')), 2)
+        self.assertEqual(len(self.percorrer(f'/api/eventos/{evento.pk}/participantes/?page_size=1')), 2)
+
+    def test_page_size_maior_que_o_total(self):
+        resposta = self.client.get('/api/atividades/?page_size=100000')
+        self.assertEqual(len(resposta.data['results']), Atividade.objects.count())
+        self.assertIsNone(resposta.data['next'])
+
+
+# ---------------------------------------------------------
+# 3. Campos dinâmicos (?fields= / ?expand=)
+# ---------------------------------------------------------
+
+class CamposDinamicosTest(TestCase):
+
+    def setUp(self):
+        self.client = APIClient()
+        self.eventos, self.usuarios = criar_dados(3, qtd_atividades=2, qtd_usuarios=2)
+
+    def primeiro(self, url):
+        return self.client.get(url).data['results'][0]
+
+    def test_listagem_enxuta_por_padrao(self):
+        self.assertNotIn('atividades', self.primeiro('/api/eventos/'))
+        self.assertNotIn('descricao', self.primeiro('/api/atividades/'))
+        usuario = self.primeiro('/api/participantes/')
+        self.assertNotIn('inscricoes', usuario)
+        self.assertIn('perfil', usuario)
+
+    def test_detalhe_continua_completo(self):
+        evento = self.client.get(f'/api/eventos/{self.eventos[0].pk}/').data
+        self.assertEqual(len(evento['atividades']), 2)
+
+    def test_expand_inclui_aninhados(self):
+        evento = self.primeiro('/api/eventos/?expand=atividades')
+        self.assertEqual(len(evento['atividades']), 2)
+        usuario = self.primeiro('/api/participantes/?expand=inscricoes,atividades_lideradas')
+        self.assertEqual(len(usuario['inscricoes']), 3)
+
+    def test_fields_limita_campos_e_colunas(self):
+        with CaptureQueriesContext(connection) as contexto:
+            atividade = self.primeiro('/api/atividades/?fields=id,titulo,evento_titulo')
+        self.assertEqual(set(atividade), {'id', 'titulo', 'evento_titulo'})
+        # Versões das tabelas (ETag) + a listagem
+        self.assertEqual(len(contexto.captured_queries), 2)
+        self.assertNotIn('"descricao"', contexto.captured_queries[-1]['sql'])
+
+    def test_fields_sem_perfil_nos_participantes(self):
+        usuario = self.primeiro('/api/participantes/?fields=id,username')
+        self.assertEqual(set(usuario), {'id', 'username'})
+        resposta = self.client.get(f'/api/participantes/{self.usuarios[0].pk}/?fields=id')
+        self.assertEqual(resposta.status_code, 200)
+        self.assertEqual(resposta.data, {'id': self.usuarios[0].pk})
+        # Com o perfil pedido, ele vem no mesmo SELECT (join)
+        with CaptureQueriesContext(connection) as contexto:
+            usuario = self.primeiro('/api/participantes/?fields=id,perfil')
+        self.assertEqual(usuario['perfil']['tipo'], 'P')
+        self.assertEqual(len(contexto.captured_queries), 1)
+
+    def test_expand_sem_custo_quando_nao_pedido(self):
+        with CaptureQueriesContext(connection) as contexto:
+            self.client.get('/api/participantes/')
+        self.assertEqual(len(contexto.captured_queries), 1)
+
+
+# ---------------------------------------------------------
+# 4. Relatórios em PDF renderizados em blocos
+# ---------------------------------------------------------
+
+class RelatoriosPdfTest(DiretoriosTemporariosMixin, TestCase):
+
+    def setUp(self):
+        super().setUp()
+        criar_dados(3, qtd_atividades=2, qtd_usuarios=2)
+        self.admin = User.objects.create_superuser('admin_pdf', 'admin@teste.com', 'senha')
+        self.client.force_login(self.admin)
+
+    def ler_pdf(self, resposta):
+        return PdfReader(BytesIO(b''.join(resposta.streaming_content)))
+
+    def test_relatorios_retornam_pdf(self):
+        for nome in ('relatorio_eventos', 'relatorio_atividades', 'relatorio_participantes',
+                     'relatorio_inscricoes', 'relatorio_grupos_geral'):
+            resposta = self.client.get(reverse(nome))
+            self.assertEqual(resposta.status_code, 200, nome)
+            self.assertEqual(resposta['Content-Type'], 'application/pdf')
+            self.assertGreater(len(self.ler_pdf(resposta).pages), 0)
+
+    def test_blocos_mantem_cabecalho_e_resumo_unicos(self):
+        inscricoes = UserEventos.objects.select_related('user', 'evento').order_by('id')
+        resposta = render_to_pdf_em_blocos(
+            'relatorios/relatorio_inscricoes.html', {'titulo': 'Teste Blocos'},
+            'inscricoes', inscricoes, tamanho_bloco=2,
+        )
+        leitor = self.ler_pdf(resposta)
+        texto = ''.join(pagina.extract_text() for pagina in leitor.pages)
+
+        # 6 inscrições em blocos de 2 -> 3 PDFs juntados
+        self.assertGreaterEqual(len(leitor.pages), 3)
+        self.assertEqual(texto.count('Teste Blocos'), 1)
+        self.assertEqual(texto.count('Resumo'), 1)
+        self.assertIn('6 inscrições listadas', texto)
+
+    def test_total_zero_aparece_no_relatorio(self):
+        resposta = render_to_pdf_em_blocos(
+            'relatorios/relatorio_inscricoes.html', {'titulo': 'Vazio'},
+            'inscricoes', UserEventos.objects.none(), tamanho_bloco=2,
+        )
+        texto = ''.join(pagina.extract_text() for pagina in self.ler_pdf(resposta).pages)
+        self.assertIn('0 inscrições listadas', texto)
+
+    def test_memoria_nao_cresce_com_o_relatorio(self):
+        # Cada bloco vai direto para o arquivo de saída: 4x mais blocos, mesmo pico de memória
+        criar_dados(12, qtd_atividades=0, qtd_usuarios=3, prefixo='mem')
+        inscricoes = UserEventos.objects.select_related('user', 'evento').order_by('id')
+
+        def pico(queryset):
+            # O PDF de saída vai para o disco desde o primeiro byte: mede só a geração
+            tracemalloc.start()
+            try:
+                render_to_pdf_em_blocos('relatorios/relatorio_inscricoes.html', {'titulo': 'Memória'},
+                                        'inscricoes', queryset, tamanho_bloco=3).close()
+                return tracemalloc.get_traced_memory()[1]
+            finally:
+                tracemalloc.stop()
+
+        primeiras = inscricoes.filter(pk__in=list(inscricoes.values_list('pk', flat=True)[:9]))
+        with mock.patch('gestaoEventos.utils.PDF_MEMORIA_MAX', 1):
+            pico(primeiras)  # aquece templates, fontes e imports do pisa
+            pequeno = pico(primeiras)
+            grande = pico(inscricoes)
+        self.assertLess(grande, pequeno * 1.15)
+
+
+# ---------------------------------------------------------
+# 5. Fila de relatórios em segundo plano
+# ---------------------------------------------------------
+
+class FilaRelatoriosTest(DiretoriosTemporariosMixin, TestCase):
+
+    def setUp(self):
+        super().setUp()
+        criar_dados(2, qtd_atividades=1, qtd_usuarios=2)
+        self.admin = User.objects.create_superuser('admin_fila', 'admin@teste.com', 'senha')
+        self.client.force_login(self.admin)
+
+    def test_enfileirar_processar_e_baixar(self):
+        resposta = self.client.get(reverse('relatorio_inscricoes') + '?assincrono=1')
+        self.assertEqual(resposta.status_code, 202)
+        tarefa_id = resposta.json()['id']
+
+        status = self.client.get(reverse('relatorio_tarefa_status', args=[tarefa_id])).json()
+        self.assertEqual(status['status'], 'P')
+        self.assertIsNone(status['download_url'])
+        self.assertEqual(self.client.get(reverse('relatorio_tarefa_download', args=[tarefa_id])).status_code, 409)
+
+        call_command('processar_relatorios', workers=0, uma_vez=True, stdout=StringIO())
+
+        status = self.client.get(reverse('relatorio_tarefa_status', args=[tarefa_id])).json()
+        self.assertEqual(status['status'], 'C')
+        download = self.client.get(status['download_url'])
+        self.assertEqual(download['Content-Type'], 'application/pdf')
+        self.assertGreater(len(PdfReader(BytesIO(b''.join(download.streaming_content))).pages), 0)
+
+    @override_settings(RELATORIOS_LIMITE_SINCRONO=2)
+    def test_zip_de_certificados_grande_vai_para_a_fila(self):
+        selecionadas = [str(pk) for pk in UserEventos.objects.values_list('pk', flat=True)]
+        with mock.patch('gestaoEventos.admin.gerar_certificados') as gerar:
+            resposta = self.client.post('/admin/gestaoEventos/usereventos/', {
+                'action': 'gerar_certificados_zip', '_selected_action': selecionadas,
+            }, follow=True)
+        gerar.assert_not_called()
+        tarefa = TarefaRelatorio.objects.get()
+        self.assertEqual((tarefa.tipo, len(tarefa.parametros['ids'])), ('certificados_zip', 4))
+        self.assertContains(resposta, reverse('admin:gestaoEventos_tarefarelatorio_change', args=[tarefa.pk]))
+
+        call_command('processar_relatorios', workers=0, uma_vez=True, stdout=StringIO())
+        download = self.client.get(reverse('relatorio_tarefa_download', args=[tarefa.pk]))
+        self.assertEqual(download['Content-Type'], 'application/zip')
+        with zipfile.ZipFile(BytesIO(b''.join(download.streaming_content))) as pacote:
+            self.assertEqual(len(pacote.namelist()), 4)
+
+    def test_tarefa_reservada_uma_unica_vez(self):
+        tarefa = tarefas.enfileirar('eventos', {}, self.admin)
+        self.assertEqual(tarefas.reservar_pendentes(5), [tarefa.pk])
+        self.assertEqual(tarefas.reservar_pendentes(5), [])
+
+    def test_tipo_invalido_recusado(self):
+        with self.assertRaises(ValueError):
+            tarefas.enfileirar('inexistente')
+
+    def test_tarefa_de_outro_usuario_escondida(self):
+        tarefa = tarefas.enfileirar('eventos', {}, self.admin)
+        outro = User.objects.create(username='organizador')
+        Perfil.objects.create(user=outro, tipo='O')
+        self.client.force_login(outro)
+        self.assertEqual(self.client.get(reverse('relatorio_tarefa_status', args=[tarefa.pk])).status_code, 404)
+
+
+# ---------------------------------------------------------
+# 6. Cache dos PDFs de relatório
+# ---------------------------------------------------------
+
+class CacheRelatoriosTest(DiretoriosTemporariosMixin, TestCase):
+
+    def setUp(self):
+        super().setUp()
+        self.eventos, _ = criar_dados(2, qtd_atividades=1, qtd_usuarios=1)
+        self.client.force_login(User.objects.create_superuser('admin_cache', 'admin@teste.com', 'senha'))
+        self.url = reverse('relatorio_eventos')
+
+    def pdfs_em_cache(self):
+        return [nome for nome in os.listdir(settings.RELATORIOS_CACHE_DIR) if nome.endswith('.pdf')]
+
+    def test_segunda_requisicao_usa_cache_e_etag(self):
+        primeira = self.client.get(self.url)
+        etag = primeira['ETag']
+        self.assertEqual(len(self.pdfs_em_cache()), 1)
+
+        with mock.patch('gestaoEventos.relatorios.gerar_pdf_em_blocos') as gerar:
+            segunda = self.client.get(self.url)
+            gerar.assert_not_called()
+        self.assertEqual(segunda['ETag'], etag)
+        self.assertEqual(b''.join(segunda.streaming_content), b''.join(primeira.streaming_content))
+
+        condicional = self.client.get(self.url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(condicional.status_code, 304)
+
+    def test_alteracao_nos_dados_muda_a_versao(self):
+        etag = self.client.get(self.url)['ETag']
+        evento = self.eventos[0]
+        evento.nome = 'Nome alterado'
+        with self.captureOnCommitCallbacks(execute=True):
+            evento.save()
+
+        resposta = self.client.get(self.url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(resposta.status_code, 200)
+        self.assertNotEqual(resposta['ETag'], etag)
+
+    def test_delete_em_cascata_sobe_cada_versao_uma_vez(self):
+        antes, _ = versoes.obter(versoes.EVENTO, versoes.INSCRICAO, versoes.ATIVIDADE)
+        with self.captureOnCommitCallbacks(execute=True) as callbacks:
+            with CaptureQueriesContext(connection) as queries:
+                self.eventos[0].delete()
+            # Nenhum UPDATE de versão dentro da transação do delete
+            self.assertFalse([q for q in queries.captured_queries if 'versaotabela' in q['sql'].lower()])
+        self.assertTrue(callbacks)
+
+        depois, _ = versoes.obter(versoes.EVENTO, versoes.INSCRICAO, versoes.ATIVIDADE)
+        self.assertEqual({tabela: depois[tabela] - antes[tabela] for tabela in antes},
+                         {versoes.EVENTO: 1, versoes.INSCRICAO: 1, versoes.ATIVIDADE: 1})
+
+    def test_login_nao_invalida_relatorios(self):
+        etag = self.client.get(self.url)['ETag']
+        # O login só grava o last_login do usuário
+        self.client.login(username='admin_cache', password='senha')
+        self.assertEqual(self.client.get(self.url, HTTP_IF_NONE_MATCH=etag).status_code, 304)
+
+    def test_lru_respeita_limite_de_tamanho(self):
+        os.makedirs(settings.RELATORIOS_CACHE_DIR, exist_ok=True)
+        for i in range(3):
+            with open(os.path.join(settings.RELATORIOS_CACHE_DIR, f'{i}.pdf'), 'wb') as arquivo:
+                arquivo.write(b'x' * 100)
+            os.utime(arquivo.name, (i, i))
+
+        cache_relatorios.despejar(limite=250)
+        self.assertEqual(sorted(self.pdfs_em_cache()), ['1.pdf', '2.pdf'])
+
+
+# ---------------------------------------------------------
+# 7. Certificados em massa
+# ---------------------------------------------------------
+
+class CertificadosEmMassaTest(TestCase):
+
+    def setUp(self):
+        criar_dados(2, qtd_atividades=2, qtd_usuarios=2)
+        UserEventos.objects.filter(pk=UserEventos.objects.first().pk).update(status='P')
+
+    def test_zip_com_um_pdf_por_confirmado(self):
+        arquivo, estatisticas = gerar_certificados(formato='zip', workers=0)
+        with arquivo, zipfile.ZipFile(arquivo) as pacote:
+            nomes = pacote.namelist()
+            self.assertEqual(len(PdfReader(BytesIO(pacote.read(nomes[0]))).pages), 1)
+        self.assertEqual(len(nomes), 3)
+        self.assertEqual(estatisticas['total'], 3)
+
+    def test_pool_gera_pdf_unico_em_ordem(self):
+        arquivo, estatisticas = gerar_certificados(formato='pdf', workers=2)
+        with arquivo:
+            leitor = PdfReader(arquivo)
+            self.assertEqual(len(leitor.pages), 3)
+            self.assertIn('2 horas', leitor.pages[0].extract_text())
+        self.assertGreater(estatisticas['por_segundo'], 0)
+
+    def test_workers_esquecem_a_conexao_sem_fechar(self):
+        # Depois do fork, close() no filho encerraria a sessão do processo principal
+        for inicializar in (certificados._inicializar_worker, tarefas.inicializar_worker):
+            with self.subTest(inicializar=inicializar.__module__):
+                conexao = connection.connection
+                try:
+                    with mock.patch.object(type(connections['default']), 'close') as fechar:
+                        inicializar()
+                    fechar.assert_not_called()
+                    self.assertIsNone(connection.connection)
+                finally:
+                    connection.connection = conexao
+
+    def test_carga_horaria_sem_query_por_participante(self):
+        with CaptureQueriesContext(connection) as contexto:
+            dados = carregar_dados(UserEventos.objects.all())
+        self.assertEqual(len(contexto.captured_queries), 1)
+        self.assertEqual(dados[0]['evento']['carga_horaria_total'], 2)
+
+
+# ---------------------------------------------------------
+# 8. Estatísticas do dashboard
+# ---------------------------------------------------------
+
+class EstatisticasDashboardTest(TestCase):
+
+    def setUp(self):
+        cache.delete(estatisticas.CHAVE_CACHE)
+        self.eventos, self.usuarios = criar_dados(2, qtd_atividades=1, qtd_usuarios=2)
+
+    def contadores(self):
+        dados = estatisticas.obter_dashboard()
+        return dados['total_eventos'], dados['total_inscricoes'], dados['total_usuarios']
+
+    def test_contadores_acompanham_inscricoes(self):
+        self.assertEqual(self.contadores(), (2, 4, 2))
+
+        with self.captureOnCommitCallbacks(execute=True):
+            inscricao = UserEventos.objects.get(user=self.usuarios[0], evento=self.eventos[0])
+            inscricao.status = 'P'
+            inscricao.save()
+        self.assertEqual(self.contadores(), (2, 3, 2))
+
+        with self.captureOnCommitCallbacks(execute=True):
+            novo = Evento.objects.create(
+                nome='Novo', descricao='Descrição', local='Sala',
+                data_inicio=timezone.now(), data_fim=timezone.now() + timedelta(hours=1),
+            )
+            inscricao.evento = novo
+            inscricao.save()
+        self.assertEqual(EstatisticaEvento.objects.get(evento=self.eventos[0]).total_inscricoes, 1)
+        self.assertEqual(EstatisticaEvento.objects.get(evento=novo).total_inscricoes, 1)
+        self.assertEqual(self.contadores(), (3, 3, 2))
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.eventos[1].delete()
+        self.assertEqual(self.contadores(), (2, 1, 2))
+
+    def test_consultas_constantes_e_cache(self):
+        criar_dados(5, qtd_atividades=1, qtd_usuarios=3, prefixo='outro')
+        with self.assertNumQueries(4):
+            dados = estatisticas.obter_dashboard()
+        self.assertEqual(dados['chart_data'][0], 3)
+
+        with self.assertNumQueries(0):
+            estatisticas.obter_dashboard()
+
+    def test_inscricao_nao_atualiza_contador_geral(self):
+        evento = Evento.objects.create(
+            nome='Outro', descricao='Descrição', local='Sala',
+            data_inicio=timezone.now(), data_fim=timezone.now() + timedelta(hours=1),
+        )
+        # Só a linha do evento muda: nenhuma linha única disputada por todas as inscrições
+        with CaptureQueriesContext(connection) as contexto:
+            inscricoes.inscrever(self.usuarios[0], evento)
+        self.assertFalse([q for q in contexto.captured_queries if 'gestaoEventos_contador' in q['sql']])
+        self.assertEqual(self.contadores(), (3, 5, 2))
+
+    def test_apagar_evento_nao_ajusta_contadores_por_linha(self):
+        evento = self.eventos[0]
+        UserEventos.objects.bulk_create(
+            UserEventos(user=User.objects.create(username=f'cascata_{i}'), evento=evento) for i in range(200)
+        )
+        # As inscrições e atividades caem em cascata: nada de UPDATE por linha apagada
+        with self.captureOnCommitCallbacks(execute=True):
+            with CaptureQueriesContext(connection) as contexto:
+                evento.delete()
+        self.assertLess(len(contexto.captured_queries), 25)
+        self.assertEqual(self.contadores(), (1, 2, 202))
+
+    def test_contador_do_evento_criado_quando_falta(self):
+        evento = self.eventos[0]
+        EstatisticaEvento.objects.filter(evento=evento).delete()
+        UserEventos.objects.create(user=User.objects.create(username='sem_contador'), evento=evento)
+        contador = EstatisticaEvento.objects.get(evento=evento)
+        self.assertEqual((contador.total_inscricoes, contador.total_confirmadas), (3, 3))
+
+    def test_total_confirmadas_nao_le_as_inscricoes(self):
+        criar_dados(20, qtd_atividades=0, qtd_usuarios=5, prefixo='soma')
+        with CaptureQueriesContext(connection) as contexto:
+            self.assertEqual(estatisticas.total_confirmadas(), 104)
+        self.assertEqual(len(contexto.captured_queries), 1)
+        self.assertNotIn('usereventos', contexto.captured_queries[0]['sql'].lower())
+
+    def test_recalcular_confere_com_contadores(self):
+        UserEventos.objects.filter(evento=self.eventos[0]).update(status='P')  # sem signals
+        antes, _ = versoes.obter(versoes.INSCRICAO, versoes.EVENTO)
+        valores = estatisticas.recalcular()
+        self.assertEqual(valores[estatisticas.INSCRICOES_CONFIRMADAS], 2)
+        self.assertEqual(EstatisticaEvento.objects.get(evento=self.eventos[0]).total_confirmadas, 0)
+        depois, _ = versoes.obter(versoes.INSCRICAO, versoes.EVENTO)
+        self.assertTrue(all(depois[tabela] > antes[tabela] for tabela in antes))
+
+
+# ---------------------------------------------------------
+# 9. Importação em massa
+# ---------------------------------------------------------
+
+def escrever_csvs(diretorio, qtd_usuarios, qtd_eventos):
+    """CSVs no formato de data/ com usuários, eventos, uma atividade por evento e inscrições."""
+    os.makedirs(diretorio, exist_ok=True)
+    arquivos = {
+        'usuarios.csv': [
+            [f'user{i}', 'senha123', f'user{i}@email.com', f'Nome{i} Sobrenome', 'O' if i == 0 else 'P', '6199999']
+            for i in range(qtd_usuarios)
+        ],
+        'eventos.csv': [
+            [f'Evento {i}', 'Descrição', '2030-01-01 09:00', '2030-01-01 18:00', 'Auditório']
+            for i in range(qtd_eventos)
+        ],
+        'atividades.csv': [
+            [f'Atividade {i}', 'Descrição', '2030-01-01 09:00', '2030-01-01 11:00', 'P', f'Evento {i}', 'user0']
+            for i in range(qtd_eventos)
+        ] + [['Sem evento', 'Descrição', '2030-01-01 09:00', '2030-01-01 11:00', 'P', 'Inexistente', 'user0']],
+        'inscricoes.csv': [
+            [f'user{i}', f'Evento {j}', 'C'] for i in range(qtd_usuarios) for j in range(qtd_eventos)
+        ],
+    }
+    for nome, linhas in arquivos.items():
+        with open(os.path.join(diretorio, nome), 'w', encoding='utf-8', newline='') as arquivo:
+            csv.writer(arquivo).writerows(linhas)
+
+
+@override_settings(PASSWORD_HASHERS=['django.contrib.auth.hashers.MD5PasswordHasher'])
+class ImportacaoEmMassaTest(TestCase):
+
+    def setUp(self):
+        self.base = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.base, ignore_errors=True)
+
+    def importar(self, qtd_usuarios, qtd_eventos, *args):
+        escrever_csvs(self.base, qtd_usuarios, qtd_eventos)
+        saida = StringIO()
+        call_command('importar_dados', '--em-massa', '--path', self.base, *args, stdout=saida)
+        return saida.getvalue()
+
+    def test_importa_com_as_regras_do_modo_linha_a_linha(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            self.importar(4, 3)
+
+        self.assertEqual(User.objects.count(), 4)
+        self.assertEqual(Atividade.objects.count(), 3)
+        self.assertEqual(UserEventos.objects.count(), 12)
+        organizador = User.objects.get(username='user0')
+        self.assertTrue(organizador.is_staff)
+        self.assertTrue(organizador.check_password('senha123'))
+        self.assertEqual(organizador.first_name, 'Nome0')
+        self.assertEqual(list(organizador.groups.values_list('name', flat=True)), ['Staff'])
+        self.assertEqual(User.objects.filter(groups__name='Participantes').count(), 3)
+        self.assertEqual(estatisticas.obter_dashboard()['total_inscricoes'], 12)
+
+        # Rodar de novo não duplica nada
+        self.importar(4, 3)
+        self.assertEqual(UserEventos.objects.count(), 12)
+
+    def test_data_invalida_perde_so_a_linha(self):
+        escrever_csvs(self.base, 2, 2)
+        with open(os.path.join(self.base, 'eventos.csv'), 'a', encoding='utf-8', newline='') as arquivo:
+            csv.writer(arquivo).writerow(['Evento ruim', 'Descrição', '31/02/2030', '2030-01-01 18:00', 'Sala'])
+        with open(os.path.join(self.base, 'atividades.csv'), 'a', encoding='utf-8', newline='') as arquivo:
+            csv.writer(arquivo).writerow(['Atividade ruim', '-', '2030-13-01 09:00', '2030-01-01 11:00', 'P',
+                                          'Evento 0', 'user0'])
+        saida = StringIO()
+        call_command('importar_dados', '--em-massa', '--path', self.base, stdout=saida)
+
+        self.assertEqual(sorted(Evento.objects.values_list('nome', flat=True)), ['Evento 0', 'Evento 1'])
+        self.assertEqual(Atividade.objects.count(), 2)
+        self.assertIn('Erro no evento Evento ruim: Data inválida: 31/02/2030', saida.getvalue())
+        self.assertIn('Erro na atividade Atividade ruim:', saida.getvalue())
+
+    def test_queries_nao_crescem_com_as_linhas(self):
+        Group.objects.create(name='Participantes')
+        Group.objects.create(name='Staff')
+        with CaptureQueriesContext(connection) as pequeno:
+            self.importar(3, 2)
+        UserEventos.objects.all().delete()
+        Atividade.objects.all().delete()
+        Evento.objects.all().delete()
+        User.objects.all().delete()
+        with CaptureQueriesContext(connection) as grande:
+            self.importar(30, 20)
+        # 10x mais linhas: só alguns INSERTs a mais (o SQLite divide lotes com muitos parâmetros)
+        self.assertLess(len(grande.captured_queries), len(pequeno.captured_queries) + 5)
+
+    def test_hash_de_senhas_no_pool(self):
+        senhas = [f'senha{i}' for i in range(6)]
+        with ProcessPoolExecutor(max_workers=2) as pool:
+            hashes = gerar_hashes(senhas, pool, workers=2, rapida=True)
+        # Mesma ordem da entrada
+        for senha, hash_senha in zip(senhas, hashes):
+            self.assertTrue(PBKDF2PasswordHasher().verify(senha, hash_senha))
+        self.assertTrue(hashes[0].startswith('pbkdf2_sha256$1000$'))
+
+    def test_gzip_e_retomada_depois_de_falha(self):
+        escrever_csvs(self.base, 4, 3)
+        caminho = os.path.join(self.base, 'inscricoes.csv')
+        with open(caminho, 'rb') as origem, gzip.open(caminho + '.gz', 'wb') as destino:
+            shutil.copyfileobj(origem, destino)
+        os.remove(caminho)
+
+        original = ImportadorEmMassa.importar_inscricoes
+        chamadas = []
+
+        def falhar_no_segundo_lote(importador, linhas):
+            chamadas.append(len(linhas))
+            if len(chamadas) == 2:
+                raise RuntimeError('queda simulada')
+            return original(importador, linhas)
+
+        with mock.patch.object(ImportadorEmMassa, 'importar_inscricoes', falhar_no_segundo_lote):
+            with self.assertRaises(RuntimeError):
+                call_command('importar_dados', '--em-massa', '--path', self.base, '--lote', '5', stdout=StringIO())
+        # O primeiro lote ficou gravado junto com o checkpoint
+        self.assertEqual(UserEventos.objects.count(), 5)
+
+        saida = StringIO()
+        call_command('importar_dados', '--em-massa', '--path', self.base, '--lote', '5', '--retomar', stdout=saida)
+        self.assertIn('usuarios.csv: já importado', saida.getvalue())
+        self.assertIn('inscricoes.csv.gz: retomando depois de 5 linha(s)', saida.getvalue())
+        self.assertIn('inscricoes.csv.gz: 7 linha(s), 7 registro(s) novo(s)', saida.getvalue())
+        self.assertEqual(UserEventos.objects.count(), 12)
+
+
+# ---------------------------------------------------------
+# 10. Índices das consultas mais usadas
+# ---------------------------------------------------------
+
+class BenchmarkIndicesTest(TransactionTestCase):
+
+    def indices(self, modelo):
+        with connection.cursor() as cursor:
+            return set(connection.introspection.get_constraints(cursor, modelo._meta.db_table))
+
+    @override_settings(DEBUG=True)
+    def test_compara_e_recria_os_indices(self):
+        antes = self.indices(UserEventos)
+        saida = StringIO()
+        call_command('benchmark_indices', '--inscricoes', '300', '--repeticoes', '1', '--confirmar', stdout=saida)
+
+        self.assertEqual(UserEventos.objects.count(), 300)
+        self.assertIn('inscricoes_recentes', saida.getvalue())
+        self.assertIn('inscricao_data_idx', saida.getvalue())  # aparece no plano "com os índices"
+        self.assertEqual(self.indices(UserEventos), antes)
+
+    def test_recusa_sem_confirmar_ou_fora_do_debug(self):
+        antes = self.indices(UserEventos)
+        with self.assertRaisesMessage(CommandError, 'DEBUG desligado'):
+            call_command('benchmark_indices', '--inscricoes', '10', '--confirmar', stdout=StringIO())
+        with override_settings(DEBUG=True), self.assertRaisesMessage(CommandError, '--confirmar'):
+            call_command('benchmark_indices', '--inscricoes', '10', stdout=StringIO())
+        self.assertEqual(UserEventos.objects.count(), 0)
+        self.assertEqual(self.indices(UserEventos), antes)
+
+    @override_settings(DEBUG=True)
+    def test_falha_na_medicao_recria_os_indices(self):
+        Evento.objects.create(
+            nome='Bench', descricao='Descrição', local='Sala',
+            data_inicio=timezone.now(), data_fim=timezone.now() + timedelta(hours=1),
+        )
+        antes = self.indices(UserEventos)
+        with mock.patch('gestaoEventos.management.commands.benchmark_indices.Command.medir',
+                        side_effect=RuntimeError('falhou')):
+            with self.assertRaises(RuntimeError):
+                call_command('benchmark_indices', '--inscricoes', '0', '--confirmar', stdout=StringIO())
+        self.assertEqual(self.indices(UserEventos), antes)
+
+
+# ---------------------------------------------------------
+# 11. Carga horária gravada no evento
+# ---------------------------------------------------------
+
+class CargaHorariaTest(TestCase):
+
+    def setUp(self):
+        self.eventos, _ = criar_dados(2, qtd_atividades=2, qtd_usuarios=1)
+
+    def carga(self, evento):
+        return Evento.objects.get(pk=evento.pk).carga_horaria
+
+    def test_atividades_mantem_a_carga_horaria(self):
+        self.assertEqual(self.carga(self.eventos[0]), timedelta(hours=2))
+
+        atividade = Atividade.objects.filter(evento=self.eventos[0]).first()
+        atividade.horario_fim += timedelta(hours=2)
+        atividade.save()
+        self.assertEqual(self.carga(self.eventos[0]), timedelta(hours=4))
+
+        # Troca de evento: os dois são recalculados
+        atividade = Atividade.objects.get(pk=atividade.pk)
+        atividade.evento = self.eventos[1]
+        atividade.save()
+        self.assertEqual(self.carga(self.eventos[0]), timedelta(hours=1))
+        self.assertEqual(self.carga(self.eventos[1]), timedelta(hours=5))
+
+        atividade.delete()
+        self.assertEqual(self.carga(self.eventos[1]), timedelta(hours=2))
+
+    def test_anotacao_e_campo_gravado_conferem(self):
+        Atividade.objects.filter(evento=self.eventos[0]).update(horario_fim=F('horario_fim') + timedelta(hours=1))
+        evento = Evento.objects.com_carga_horaria().get(pk=self.eventos[0].pk)
+        self.assertEqual(evento.carga_horaria_calculada, timedelta(hours=4))
+        self.assertEqual(evento.carga_horaria, timedelta(hours=2))  # update() não dispara signals
+
+        Evento.objects.all().atualizar_carga_horaria()
+        self.assertEqual(self.carga(self.eventos[0]), timedelta(hours=4))
+
+    def test_listagem_traz_a_carga_sem_query_extra(self):
+        resposta = APIClient().get('/api/eventos/?fields=id,carga_horaria_total')
+        self.assertEqual(resposta.json()['results'][0], {'id': self.eventos[0].id, 'carga_horaria_total': 2})
+
+
+# ---------------------------------------------------------
+# 12. Inscrição com capacidade
+# ---------------------------------------------------------
+
+class InscricaoCapacidadeTest(TestCase):
+
+    def setUp(self):
+        eventos, self.usuarios = criar_dados(1, qtd_atividades=0, qtd_usuarios=3)
+        self.evento = eventos[0]
+        UserEventos.objects.all().delete()
+        self.novos = [User.objects.create(username=f'novo{i}') for i in range(3)]
+
+    def inscrever(self, user):
+        cliente = APIClient()
+        cliente.force_authenticate(user)
+        return cliente.post(f'/api/eventos/{self.evento.pk}/participantes/')
+
+    def test_duplicidade_vira_400_e_nao_500(self):
+        self.assertEqual(self.inscrever(self.novos[0]).status_code, 201)
+        resposta = self.inscrever(self.novos[0])
+        self.assertEqual(resposta.status_code, 400)
+        self.assertEqual(UserEventos.objects.filter(evento=self.evento).count(), 1)
+
+    def test_outros_erros_de_integridade_nao_viram_ja_inscrito(self):
+        with mock.patch.object(UserEventos, 'save', side_effect=IntegrityError('NOT NULL constraint failed')):
+            with self.assertRaises(IntegrityError):
+                inscricoes.inscrever(self.novos[0], self.evento)
+        inscricoes.inscrever(self.novos[0], self.evento)
+        with self.assertRaises(inscricoes.JaInscrito):
+            inscricoes.inscrever(self.novos[0], self.evento)
+
+    def test_capacidade_e_vaga_liberada(self):
+        self.evento.capacidade = 2
+        self.evento.save()
+        self.assertEqual(self.inscrever(self.novos[0]).status_code, 201)
+        self.assertEqual(self.inscrever(self.novos[1]).status_code, 201)
+        self.assertEqual(self.inscrever(self.novos[2]).status_code, 409)
+        # Evento lotado, mas quem já está inscrito recebe o motivo certo
+        self.assertEqual(self.inscrever(self.novos[0]).status_code, 400)
+
+        estatistica = EstatisticaEvento.objects.get(evento=self.evento)
+        self.assertEqual((estatistica.total_inscricoes, estatistica.total_confirmadas), (2, 2))
+
+        UserEventos.objects.get(user=self.novos[0], evento=self.evento).delete()
+        self.assertEqual(self.inscrever(self.novos[2]).status_code, 201)
+        self.assertEqual(EstatisticaEvento.objects.get(evento=self.evento).total_inscricoes, 2)
+
+    def test_teste_de_carga_nao_altera_contadores(self):
+        antes = dict(Contador.objects.values_list('chave', 'valor'))
+        with mock.patch(
+            'gestaoEventos.management.commands.teste_carga_inscricoes.Command.inscrever', return_value=(409, 1.0),
+        ):
+            call_command('teste_carga_inscricoes', '--usuarios', '5', '--clientes', '1', '--tentativas', '1',
+                         stdout=StringIO())
+        self.assertEqual(dict(Contador.objects.values_list('chave', 'valor')), antes)
+        self.assertEqual(EstatisticaEvento.objects.count(), 1)
+
+    def test_inscricao_sem_select_previo(self):
+        cliente = APIClient()
+        cliente.force_authenticate(self.novos[0])
+        with CaptureQueriesContext(connection) as contexto:
+            cliente.post(f'/api/eventos/{self.evento.pk}/participantes/')
+        sqls = [query['sql'] for query in contexto.captured_queries]
+        self.assertFalse(any('FROM "gestaoEventos_usereventos"' in sql and sql.startswith('SELECT') for sql in sqls))
+
+    def test_versao_sobe_depois_do_commit(self):
+        self.evento.capacidade = 10
+        self.evento.save()
+        antes, _ = versoes.obter(versoes.INSCRICAO)
+        with self.captureOnCommitCallbacks() as callbacks:
+            with CaptureQueriesContext(connection) as contexto:
+                inscricoes.inscrever(self.novos[0], self.evento)
+        # Nada de UPDATE na linha global de versões dentro da transação da inscrição
+        self.assertFalse([q for q in contexto.captured_queries if 'versaotabela' in q['sql'].lower()])
+        self.assertEqual(versoes.obter(versoes.INSCRICAO)[0], antes)
+
+        for callback in callbacks:
+            callback()
+        self.assertEqual(versoes.obter(versoes.INSCRICAO)[0][versoes.INSCRICAO], antes[versoes.INSCRICAO] + 1)
+
+
+# ---------------------------------------------------------
+# 13. Inscrição em lote
+# ---------------------------------------------------------
+
+class InscricaoLoteTest(TestCase):
+
+    def setUp(self):
+        eventos, self.usuarios = criar_dados(1, qtd_atividades=0, qtd_usuarios=2)
+        self.evento = eventos[0]
+        self.turma = [User.objects.create(username=f'aluno{i}') for i in range(30)]
+        self.cliente = APIClient()
+        self.cliente.force_authenticate(criar_organizador())
+        self.url = f'/api/eventos/{self.evento.pk}/participantes/lote/'
+
+    def test_resultado_por_item_e_queries_fixas(self):
+        corpo = {
+            'ids': [user.pk for user in self.turma[:20]] + [self.usuarios[0].pk, 999999],
+            'usernames': [user.username for user in self.turma[20:]] + ['aluno0', 'ninguem'],
+        }
+        with CaptureQueriesContext(connection) as contexto:
+            resposta = self.cliente.post(self.url, corpo, format='json')
+        dados = resposta.json()
+
+        self.assertEqual(resposta.status_code, 201)
+        self.assertEqual((dados['criadas'], dados['existentes'], dados['falhas']), (30, 2, 2))
+        self.assertEqual(dados['resultados'][-1], {
+            'username': 'ninguem', 'user_id': None, 'resultado': 'falha', 'motivo': 'Usuário não encontrado.',
+        })
+        self.assertEqual(UserEventos.objects.filter(evento=self.evento).count(), 32)
+        self.assertEqual(EstatisticaEvento.objects.get(evento=self.evento).total_confirmadas, 32)
+        self.assertLess(len(contexto.captured_queries), 20)
+
+    def test_capacidade_no_lote(self):
+        self.evento.capacidade = 12
+        self.evento.save()
+        resposta = self.cliente.post(self.url, {'ids': [user.pk for user in self.turma]}, format='json')
+        self.assertEqual((resposta.json()['criadas'], resposta.json()['falhas']), (10, 20))
+        self.assertEqual(UserEventos.objects.filter(evento=self.evento).count(), 12)
+
+    def test_inscrito_por_outra_transacao_conta_como_existente(self):
+        inserir_lote = inscricoes._inserir_lote
+
+        def concorrente(*args):
+            # Outra requisição inscreve o aluno0 entre a consulta dos existentes e o INSERT do lote
+            UserEventos.objects.create(user=self.turma[0], evento=self.evento)
+            return inserir_lote(*args)
+
+        with mock.patch('gestaoEventos.inscricoes._inserir_lote', side_effect=concorrente):
+            resultado = inscricoes.inscrever_em_massa(self.evento, ids=[user.pk for user in self.turma[:5]])
+
+        self.assertEqual((resultado['criadas'], resultado['existentes']), (4, 1))
+        self.assertEqual(resultado['resultados'][0]['resultado'], inscricoes.EXISTENTE)
+        # 2 de criar_dados, 1 da outra requisição e 4 do lote
+        self.assertEqual(EstatisticaEvento.objects.get(evento=self.evento).total_inscricoes, 7)
+
+    def test_so_organizadores(self):
+        cliente = APIClient()
+        cliente.force_authenticate(self.usuarios[0])
+        self.assertEqual(cliente.post(self.url, {'ids': [1]}, format='json').status_code, 403)
+        # is_staff sem o Perfil de organizador não basta (mesma regra das páginas de organização)
+        cliente.force_authenticate(User.objects.create(username='so_is_staff', is_staff=True))
+        self.assertEqual(cliente.post(self.url, {'ids': [1]}, format='json').status_code, 403)
+        self.assertEqual(self.cliente.post(self.url, {}, format='json').status_code, 400)
+
+
+# ---------------------------------------------------------
+# 14. Mudança de status em massa
+# ---------------------------------------------------------
+
+class MudancaStatusEmMassaTest(TestCase):
+
+    def setUp(self):
+        self.eventos, self.usuarios = criar_dados(2, qtd_atividades=0, qtd_usuarios=10)
+        UserEventos.objects.filter(evento=self.eventos[1]).update(status='P')
+        estatisticas.recalcular()
+        self.cliente = APIClient()
+        self.cliente.force_authenticate(criar_organizador())
+
+    def confirmadas(self, evento):
+        return EstatisticaEvento.objects.get(evento=evento).total_confirmadas
+
+    def test_um_update_por_lote_e_um_signal(self):
+        chamadas = []
+        receptor = lambda **kwargs: chamadas.append(kwargs)
+        status_inscricoes_alterado.connect(receptor)
+        self.addCleanup(status_inscricoes_alterado.disconnect, receptor)
+
+        with CaptureQueriesContext(connection) as contexto:
+            resultado = inscricoes.alterar_status(UserEventos.objects.all(), 'C', de='P', tamanho_lote=4)
+
+        self.assertEqual(resultado['atualizadas'], 10)
+        self.assertEqual(resultado['por_evento'], {self.eventos[1].pk: 10})
+        self.assertEqual(len(chamadas), 1)
+        self.assertEqual(chamadas[0]['confirmadas_por_evento'], {self.eventos[1].pk: 10})
+        updates = [q for q in contexto.captured_queries if q['sql'].startswith('UPDATE "gestaoEventos_userevento')]
+        self.assertEqual(len(updates), 3)  # 10 linhas em lotes de 4
+
+        self.assertEqual(self.confirmadas(self.eventos[1]), 10)
+        self.assertEqual(estatisticas.total_confirmadas(), 20)
+
+    def test_api_do_evento(self):
+        url = f'/api/eventos/{self.eventos[0].pk}/participantes/status/'
+        ids = [user.pk for user in self.usuarios[:4]]
+        resposta = self.cliente.post(url, {'para': 'X', 'ids': ids}, format='json')
+        self.assertEqual(resposta.status_code, 200)
+        self.assertEqual(resposta.json(), {'atualizadas': 4, 'sem_vaga': 0})
+        self.assertEqual(self.confirmadas(self.eventos[0]), 6)
+
+        # Repetir não muda nada (já estão em X)
+        self.assertEqual(self.cliente.post(url, {'para': 'X', 'ids': ids}, format='json').json()['atualizadas'], 0)
+        self.assertEqual(self.cliente.post(url, {'para': 'Z'}, format='json').status_code, 400)
+
+        cliente = APIClient()
+        cliente.force_authenticate(self.usuarios[0])
+        self.assertEqual(cliente.post(url, {'para': 'C'}, format='json').status_code, 403)
+
+    def test_confirmacao_respeita_capacidade(self):
+        # Capacidade reduzida depois das inscrições e contador desatualizado (UPDATE sem signals)
+        Evento.objects.filter(pk=self.eventos[1].pk).update(capacidade=4)
+        UserEventos.objects.filter(evento=self.eventos[1], user=self.usuarios[0]).update(status='C')
+
+        resultado = inscricoes.alterar_status(UserEventos.objects.all(), 'C', de='P', tamanho_lote=4)
+        self.assertEqual((resultado['atualizadas'], resultado['sem_vaga']), (3, 6))
+        self.assertEqual(UserEventos.objects.filter(evento=self.eventos[1], status='C').count(), 4)
+        self.assertEqual(UserEventos.objects.filter(evento=self.eventos[1], status='P').count(), 6)
+
+        # Lotado: nada muda
+        url = f'/api/eventos/{self.eventos[1].pk}/participantes/status/'
+        self.assertEqual(self.cliente.post(url, {'para': 'C'}, format='json').json(), {'atualizadas': 0, 'sem_vaga': 6})
+        # Quem não tem capacidade definida continua sem limite
+        self.assertEqual(inscricoes.alterar_status(UserEventos.objects.filter(evento=self.eventos[0]), 'P')['sem_vaga'], 0)
+
+    def test_acao_do_admin(self):
+        self.client.force_login(User.objects.create_superuser('admin', 'admin@x.com', 'x'))
+        selecionadas = UserEventos.objects.filter(evento=self.eventos[1]).values_list('pk', flat=True)[:3]
+        resposta = self.client.post('/admin/gestaoEventos/usereventos/', {
+            'action': 'confirmar_inscricoes', '_selected_action': [str(pk) for pk in selecionadas],
+        }, follow=True)
+        self.assertContains(resposta, '3 inscrição(ões) confirmada(s).')
+        self.assertEqual(self.confirmadas(self.eventos[1]), 3)
+
+
+# ---------------------------------------------------------
+# 15. Grupos do Perfil
+# ---------------------------------------------------------
+
+class PerfilGruposTest(TestCase):
+
+    def setUp(self):
+        Perfil.objects.limpar_ids_grupos()
+        self.addCleanup(Perfil.objects.limpar_ids_grupos)
+
+    def grupos(self, user):
+        return set(user.groups.values_list('name', flat=True))
+
+    def test_troca_de_tipo(self):
+        user = User.objects.create(username='ana')
+        perfil = Perfil.objects.create(user=user, tipo='P')
+        self.assertEqual(self.grupos(user), {'Participantes'})
+
+        perfil.tipo = 'O'
+        perfil.save()
+        user.refresh_from_db()
+        self.assertEqual(self.grupos(user), {'Staff'})
+        self.assertTrue(user.is_staff)
+
+    def test_salvar_sem_mudar_tipo_nao_mexe_nos_grupos(self):
+        user = User.objects.create(username='ana')
+        Perfil.objects.create(user=user, tipo='O')
+        perfil = Perfil.objects.get(user=user)
+        perfil.celular = '9999'
+        with CaptureQueriesContext(connection) as contexto:
+            perfil.save()
+        self.assertEqual(len([q for q in contexto.captured_queries if 'auth_user' in q['sql']]), 0)
+
+    def test_ids_dos_grupos_em_cache_depois_do_commit(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            Perfil.objects.ids_grupos()
+        user = User.objects.create(username='ana')
+        with self.assertNumQueries(5):
+            # Perfil (1), grupos antigos e novo (2), versão dos grupos (2): nenhum get_or_create.
+            # A versão do Perfil só sobe depois do commit
+            Perfil.objects.create(user=user, tipo='P')
+
+        # Grupo apagado: o cache é limpo
+        Group.objects.get(name='Staff').delete()
+        self.assertEqual(Perfil.objects._ids_grupos, {})
+
+    def test_atribuir_grupos_em_massa(self):
+        usuarios = [User.objects.create(username=f'u{i}') for i in range(30)]
+        Perfil.objects.ids_grupos()
+        tipos = {user.pk: 'O' if i % 3 == 0 else 'P' for i, user in enumerate(usuarios)}
+        with CaptureQueriesContext(connection) as contexto:
+            Perfil.objects.atribuir_grupos(tipos)
+        self.assertLess(len(contexto.captured_queries), 10)
+
+        self.assertEqual(User.objects.filter(groups__name='Staff').count(), 10)
+        self.assertEqual(User.objects.filter(groups__name='Participantes').count(), 20)
+        self.assertEqual(User.objects.filter(is_staff=True).count(), 10)
+
+
+# ---------------------------------------------------------
+# 16. ETag e cache das leituras da API
+# ---------------------------------------------------------
+
+class CacheHttpApiTest(TestCase):
+
+    def setUp(self):
+        self.eventos, self.usuarios = criar_dados(2, qtd_atividades=2)
+        self.cliente = APIClient()
+
+    def test_304_sem_serializar(self):
+        for url in ('/api/eventos/', f'/api/eventos/{self.eventos[0].pk}/',
+                    f'/api/eventos/{self.eventos[0].pk}/dashboard/', '/api/atividades/'):
+            resposta = self.cliente.get(url)
+            etag = resposta['ETag']
+            with self.assertNumQueries(1):  # só as versões das tabelas
+                condicional = self.cliente.get(url, HTTP_IF_NONE_MATCH=etag)
+            self.assertEqual(condicional.status_code, 304, url)
+
+    def test_escrita_muda_o_etag(self):
+        url = f'/api/eventos/{self.eventos[0].pk}/dashboard/'
+        etag = self.cliente.get(url)['ETag']
+
+        with self.captureOnCommitCallbacks(execute=True):
+            UserEventos.objects.filter(evento=self.eventos[0]).first().delete()
+        resposta = self.cliente.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(resposta.status_code, 200)
+        self.assertNotEqual(resposta['ETag'], etag)
+        self.assertEqual(len(resposta.json()['inscricoes']), 2)
+
+        # Atividade alterada: a lista de eventos (com atividades) também muda
+        etag_lista = self.cliente.get('/api/eventos/?expand=atividades')['ETag']
+        atividade = self.eventos[1].atividades.first()
+        atividade.titulo = 'Novo título'
+        with self.captureOnCommitCallbacks(execute=True):
+            atividade.save()
+        self.assertEqual(self.cliente.get('/api/eventos/?expand=atividades', HTTP_IF_NONE_MATCH=etag_lista).status_code, 200)
+
+    def test_cache_do_servidor(self):
+        url = '/api/atividades/?fields=id,titulo'
+        primeira = self.cliente.get(url)
+        with self.assertNumQueries(1):
+            # Outro cliente, sem ETag: os dados vêm do cache (CACHES['api'])
+            segunda = APIClient().get(url)
+        self.assertEqual(segunda.json(), primeira.json())
+        self.assertEqual(segunda['ETag'], primeira['ETag'])
+
+    def test_sem_alias_de_cache_so_etag(self):
+        url = '/api/atividades/'
+        with override_settings(API_CACHE='inexistente'):
+            etag = self.cliente.get(url)['ETag']
+            with self.assertNumQueries(2):
+                self.assertEqual(self.cliente.get(url).status_code, 200)
+            self.assertEqual(self.cliente.get(url, HTTP_IF_NONE_MATCH=etag).status_code, 304)
+
+
+# ---------------------------------------------------------
+# 17. Dashboard de vários eventos
+# ---------------------------------------------------------
+
+class DashboardEmLoteTest(TestCase):
+
+    def setUp(self):
+        self.cliente = APIClient()
+
+    def buscar(self, parametros=''):
+        resposta = self.cliente.get(f'/api/eventos/dashboard/{parametros}')
+        self.assertEqual(resposta.status_code, 200)
+        return {item['id']: item for item in resposta.json()['results']}
+
+    def test_totais_agregados(self):
+        eventos, usuarios = criar_dados(3, qtd_atividades=2, qtd_usuarios=4)
+        inscricao = UserEventos.objects.get(evento=eventos[0], user=usuarios[0])
+        inscricao.status = 'P'
+        inscricao.save()
+
+        dados = self.buscar(f'?ids={eventos[0].pk},{eventos[1].pk}')
+        self.assertEqual(set(dados), {eventos[0].pk, eventos[1].pk})
+        self.assertEqual(
+            {campo: dados[eventos[0].pk][campo] for campo in
+             ('total_inscricoes', 'total_confirmadas', 'total_pendentes', 'total_atividades', 'carga_horaria_total')},
+            {'total_inscricoes': 4, 'total_confirmadas': 3, 'total_pendentes': 1, 'total_atividades': 2,
+             'carga_horaria_total': 2},
+        )
+
+    def test_inscricoes_lidas_dos_contadores(self):
+        eventos, _ = criar_dados(1, qtd_atividades=0, qtd_usuarios=3)
+        # Os totais de inscrições são os de EstatisticaEvento, não uma nova contagem das linhas
+        EstatisticaEvento.objects.filter(evento=eventos[0]).update(total_inscricoes=7, total_confirmadas=5)
+        evento = Evento.objects.com_totais().get(pk=eventos[0].pk)
+        self.assertEqual((evento.total_inscricoes, evento.total_confirmadas), (7, 5))
+
+    def test_queries_fixas(self):
+        criar_dados(2, qtd_atividades=1, qtd_usuarios=1, prefixo='pequeno')
+        with CaptureQueriesContext(connection) as pequeno:
+            self.buscar()
+        criar_dados(10, qtd_atividades=4, qtd_usuarios=6, prefixo='grande')
+        with CaptureQueriesContext(connection) as grande:
+            self.assertEqual(len(self.buscar('?page_size=50')), 12)
+        self.assertEqual(len(pequeno.captured_queries), len(grande.captured_queries))
+        self.assertLessEqual(len(grande.captured_queries), 2)  # versões (ETag) + página
+
+    def test_filtro_por_periodo(self):
+        eventos, _ = criar_dados(3, qtd_atividades=0, qtd_usuarios=1)
+        amanha = eventos[1].data_inicio.date().isoformat()
+        self.assertEqual(set(self.buscar(f'?inicio={amanha}&fim={amanha}')), {eventos[1].pk})
+        self.assertEqual(set(self.buscar(f'?inicio={amanha}')), {eventos[1].pk, eventos[2].pk})
+
+        self.assertEqual(self.cliente.get('/api/eventos/dashboard/?ids=1,x').status_code, 400)
+        self.assertEqual(self.cliente.get('/api/eventos/dashboard/?fim=ontem').status_code, 400)
+
+
+# ---------------------------------------------------------
+# 18. Estatísticas agregadas da API
+# ---------------------------------------------------------
+
+class EstatisticasApiTest(TestCase):
+
+    def setUp(self):
+        self.eventos, self.usuarios = criar_dados(2, qtd_atividades=3, qtd_usuarios=4)
+        UserEventos.objects.filter(evento=self.eventos[0], user__in=self.usuarios[:2]).update(status='P')
+        # Metade das inscrições há 10 dias
+        antigas = UserEventos.objects.filter(evento=self.eventos[1], user__in=self.usuarios[:2])
+        antigas.update(data_inscricao=timezone.now() - timedelta(days=10))
+        self.cliente = APIClient()
+
+    def test_por_evento(self):
+        with CaptureQueriesContext(connection) as contexto:
+            dados = self.cliente.get(f'/api/eventos/{self.eventos[0].pk}/estatisticas/').json()
+        self.assertLessEqual(len(contexto.captured_queries), 5)  # versões + evento + 3 agregações
+
+        self.assertEqual(dados['inscricoes'], {'total': 4, 'por_status': {'C': 2, 'P': 2, 'X': 0}})
+        self.assertEqual(dados['atividades']['total'], 3)
+        self.assertEqual(dados['atividades']['horas'], 3)
+        self.assertEqual(dados['atividades']['por_tipo']['P'], {'total': 3, 'horas': 3})
+        self.assertEqual([dia['total'] for dia in dados['inscricoes_por_dia']], [4])
+
+    def test_geral_com_periodo(self):
+        dados = self.cliente.get('/api/eventos/estatisticas/').json()
+        self.assertEqual(dados['eventos'], 2)
+        self.assertEqual(dados['inscricoes']['total'], 8)
+        self.assertEqual([dia['total'] for dia in dados['inscricoes_por_dia']], [2, 6])
+
+        inicio = (timezone.localdate() - timedelta(days=1)).isoformat()
+        dados = self.cliente.get(f'/api/eventos/estatisticas/?inicio={inicio}').json()
+        self.assertEqual(dados['inscricoes']['total'], 6)
+        self.assertEqual(len(dados['inscricoes_por_dia']), 1)
+
+        resposta = self.cliente.get('/api/eventos/estatisticas/?fim=31-12-2025')
+        self.assertEqual(resposta.status_code, 400)
+        self.assertIn('fim', resposta.json())
+
+
+# ---------------------------------------------------------
+# 19. Dados sintéticos
+# ---------------------------------------------------------
+
+class DadosSinteticosTest(TestCase):
+
+    def gerar(self, *argumentos):
+        saida = StringIO()
+        call_command('gerar_dados_sinteticos', '--usuarios', '60', '--eventos', '8', '--atividades', '30',
+                     '--inscricoes', '200', '--lote', '50', *argumentos, stdout=saida)
+        return saida.getvalue()
+
+    def test_volumes_e_consistencia(self):
+        self.gerar('--semente', '7')
+        self.assertEqual(User.objects.filter(username__startswith='sint7_').count(), 60)
+        self.assertEqual(Perfil.objects.count(), 60)
+        self.assertEqual(Evento.objects.count(), 8)
+        self.assertEqual(Atividade.objects.count(), 30)
+        self.assertEqual(UserEventos.objects.count(), 200)
+        self.assertFalse(User.objects.filter(username__startswith='sint7_', groups__isnull=True).exists())
+
+        # Popularidade concentrada, capacidade nunca abaixo das inscrições, nenhuma data futura
+        por_evento = sorted(Evento.objects.com_totais().values_list('total_inscricoes', flat=True), reverse=True)
+        self.assertGreater(por_evento[0], por_evento[-1] * 2)
+        self.assertFalse(Evento.objects.com_totais().filter(capacidade__lt=F('total_inscricoes')).exists())
+        self.assertFalse(UserEventos.objects.filter(data_inscricao__gt=timezone.now()).exists())
+        # Contadores e carga horária atualizados no final
+        self.assertEqual(EstatisticaEvento.objects.aggregate(total=Sum('total_inscricoes'))['total'], 200)
+        self.assertGreater(Evento.objects.filter(carga_horaria__gt=timedelta(0)).count(), 0)
+
+    def test_mesma_semente_mesmos_dados(self):
+        def retrato(prefixo):
+            return [(u[2:], e[2:], s, d) for u, e, s, d in UserEventos.objects.filter(
+                user__username__startswith=f'{prefixo}_').order_by('id').values_list(
+                'user__username', 'evento__nome', 'status', 'data_inscricao')]
+
+        self.gerar('--prefixo', 'a')
+        # Em outro dia, os mesmos dados (inclusive as datas): a referência é fixa
+        with mock.patch('django.utils.timezone.now', return_value=timezone.now() + timedelta(days=3)):
+            self.gerar('--prefixo', 'b')
+        self.assertEqual(retrato('a'), retrato('b'))
+
+        self.gerar('--prefixo', 'c', '--referencia', '2030-06-01')
+        self.assertGreater(UserEventos.objects.filter(user__username__startswith='c_').latest('data_inscricao')
+                           .data_inscricao.year, 2029)
+
+        with self.assertRaises(CommandError):
+            self.gerar('--prefixo', 'a')
+        with self.assertRaises(CommandError):
+            self.gerar('--prefixo', 'd', '--referencia', 'amanhã')
+
+
+# ---------------------------------------------------------
+# 20. Benchmark das rotas
+# ---------------------------------------------------------
+
+class BenchmarkEndpointsTest(TestCase):
+
+    def setUp(self):
+        self.pasta = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.pasta, ignore_errors=True)
+        self.saida = os.path.join(self.pasta, 'endpoints.json')
+        self.base = os.path.join(self.pasta, 'base.json')
+
+    def medir(self, *argumentos):
+        call_command('benchmark_endpoints', '--inscricoes', '150', '--repeticoes', '2',
+                     '--rota', '/api/eventos/', '--rota', '/api/eventos/{evento}/participantes/',
+                     '--saida', self.saida, '--base', self.base, *argumentos, stdout=StringIO())
+        with open(self.saida, encoding='utf-8') as arquivo:
+            return json.load(arquivo)
+
+    def test_mede_rotas_e_salva_base(self):
+        dados = self.medir('--salvar-base')
+        self.assertEqual(dados['inscricoes'], 150)
+        self.assertEqual(set(dados['rotas']), {'/api/eventos/', '/api/eventos/{evento}/participantes/'})
+        for resultado in dados['rotas'].values():
+            self.assertGreater(resultado['queries'], 0)
+            self.assertLessEqual(resultado['p50_ms'], resultado['p99_ms'])
+        self.assertTrue(os.path.exists(self.base))
+        # O usuário criado para a medição não fica no banco
+        self.assertFalse(User.objects.filter(username='benchmark_endpoints').exists())
+
+    def test_regressao_em_queries_falha(self):
+        dados = self.medir('--salvar-base')
+        # Base "antiga" com uma query a menos na listagem
+        dados['rotas']['/api/eventos/']['queries'] -= 1
+        with open(self.base, 'w', encoding='utf-8') as arquivo:
+            json.dump(dados, arquivo)
+
+        with self.assertRaises(CommandError):
+            self.medir('--tolerancia', '1000')
+
+    def test_rota_desconhecida(self):
+        with self.assertRaises(CommandError):
+            self.medir('--rota', '/api/nao-existe/')
+
+
+# ---------------------------------------------------------
+# 21. Métricas por requisição
+# ---------------------------------------------------------
+
+class MetricasTest(TestCase):
+
+    def setUp(self):
+        metricas.registro.limpar()
+        self.addCleanup(metricas.registro.limpar)
+        criar_dados(3)
+
+    def exportar(self):
+        self.client.force_login(User.objects.create_superuser('admin_metricas', 'admin@x.com', 'x'))
+        resposta = self.client.get('/metricas/')
+        self.assertEqual(resposta.status_code, 200)
+        self.assertTrue(resposta['Content-Type'].startswith('text/plain'))
+        return resposta.content.decode()
+
+    def test_histogramas_por_view(self):
+        for _ in range(2):
+            self.client.get('/api/eventos/', HTTP_ACCEPT='application/json')
+        self.client.get('/api/eventos/999999/', HTTP_ACCEPT='application/json')
+
+        texto = self.exportar()
+        self.assertIn('gestaoeventos_requisicao_segundos_count{view="evento-list"} 2', texto)
+        self.assertIn('gestaoeventos_requisicao_segundos_bucket{view="evento-list",le="+Inf"} 2', texto)
+        self.assertIn('gestaoeventos_sql_queries_count{view="evento-list"} 2', texto)
+        self.assertIn('gestaoeventos_resposta_bytes_count{view="evento-list"} 2', texto)
+        self.assertIn('gestaoeventos_requisicoes_total{view="evento-list",status="200"} 2', texto)
+        self.assertIn('gestaoeventos_requisicoes_total{view="evento-detail",status="404"} 1', texto)
+
+    def test_sql_repetido_e_log_de_lentas(self):
+        def view_n_mais_1(request):
+            for evento in Evento.objects.all():
+                list(evento.atividades.all())
+            return HttpResponse('ok')
+
+        middleware = metricas.MetricasMiddleware(view_n_mais_1)
+        request = RequestFactory().get('/n-mais-1/')
+        with override_settings(METRICAS_LIMITE_REPETICOES=3, METRICAS_LENTA_MS=0):
+            with self.assertLogs('gestaoEventos.metricas', 'WARNING') as log:
+                middleware(request)
+
+        # 3 eventos -> o SELECT das atividades se repete 3 vezes
+        self.assertIn('3x', log.output[0])
+        self.assertIn('gestaoeventos_sql_repetido_total{view="<nao_resolvida>",assinatura=', self.exportar())
+
+    def test_somente_staff(self):
+        self.client.force_login(User.objects.create_user('comum', password='x'))
+        self.assertEqual(self.client.get('/metricas/').status_code, 302)
+
+
+# ---------------------------------------------------------
+# 22. Perfil sob demanda
+# ---------------------------------------------------------
+
+class PerfiladorTest(TestCase):
+
+    def setUp(self):
+        criar_dados(2)
+        self.admin = User.objects.create_superuser('admin_perfil', 'admin@x.com', 'x')
+        self.client.force_login(self.admin)
+
+    def test_salva_perfil_da_requisicao(self):
+        resposta = self.client.get('/api/eventos/?perfilar=1', HTTP_ACCEPT='application/json')
+        self.assertEqual(resposta.status_code, 200)
+
+        perfil = PerfilExecucao.objects.get(pk=resposta['X-Perfil-Id'])
+        self.assertEqual(perfil.view, 'evento-list')
+        self.assertEqual(perfil.usuario, self.admin)
+        self.assertGreater(perfil.queries, 0)
+        self.assertIn('cumulative', perfil.relatorio)
+        self.assertIn('orm', perfil.por_area)
+
+        # Lista e detalhe no admin
+        self.assertContains(self.client.get(reverse('admin:gestaoEventos_perfilexecucao_changelist')), 'evento-list')
+        detalhe = self.client.get(reverse('admin:gestaoEventos_perfilexecucao_change', args=[perfil.pk]))
+        self.assertContains(detalhe, 'Tempo próprio por área')
+
+    def test_relatorio_em_texto_pelo_cabecalho(self):
+        resposta = self.client.get('/api/eventos/', HTTP_ACCEPT='application/json', HTTP_X_PERFILAR='texto')
+        self.assertTrue(resposta['Content-Type'].startswith('text/plain'))
+        self.assertIn('GET /api/eventos/ -> 200', resposta.content.decode())
+
+    def test_chamada_da_api_com_token(self):
+        self.client.logout()
+        token = Token.objects.create(user=self.admin)
+        resposta = self.client.get('/api/eventos/?perfilar=1', HTTP_ACCEPT='application/json',
+                                   HTTP_AUTHORIZATION=f'Token {token.key}')
+        self.assertEqual(resposta.status_code, 200)
+        self.assertEqual(PerfilExecucao.objects.get(pk=resposta['X-Perfil-Id']).usuario, self.admin)
+
+        # Token inválido: nada de perfil, e a view responde o erro de autenticação normalmente
+        resposta = self.client.get('/api/eventos/?perfilar=1', HTTP_AUTHORIZATION='Token invalido')
+        self.assertEqual(resposta.status_code, 401)
+        self.assertNotIn('X-Perfil-Id', resposta)
+
+    def test_ignorado_para_quem_nao_e_staff(self):
+        self.client.force_login(User.objects.create_user('comum_perfil', password='x'))
+        resposta = self.client.get('/api/eventos/?perfilar=1', HTTP_ACCEPT='application/json')
+        self.assertEqual(resposta.status_code, 200)
+        self.assertNotIn('X-Perfil-Id', resposta)
+        self.assertFalse(PerfilExecucao.objects.exists())
+
+    @override_settings(PERFILADOR_MAX=2)
+    def test_guarda_so_os_mais_recentes(self):
+        ids = [self.client.get('/api/eventos/?perfilar=1', HTTP_ACCEPT='application/json')['X-Perfil-Id']
+               for _ in range(3)]
+        self.assertEqual(sorted(PerfilExecucao.objects.values_list('pk', flat=True)), [int(i) for i in ids[1:]])
+
+
+# ---------------------------------------------------------
+# 23. Busca textual
+# ---------------------------------------------------------
+
+class BuscaTextualTest(TestCase):
+
+    def setUp(self):
+        agora = timezone.now()
+        self.cliente = APIClient()
+
+        def evento(nome, descricao, local='Auditório'):
+            return Evento.objects.create(nome=nome, descricao=descricao, local=local,
+                                         data_inicio=agora, data_fim=agora + timedelta(hours=4))
+
+        self.conferencia = evento('Conferência de Python', 'Palestras sobre a linguagem')
+        self.semana = evento('Semana Acadêmica', 'Trilha de Python e de dados')
+        self.outro = evento('Feira de Ciências', 'Projetos dos alunos', local='Ginásio')
+        caches['api'].clear()
+        self.atividade = Atividade.objects.create(
+            titulo='Oficina de Sessões', descricao='Mão na massa', tipo='O', evento=self.outro,
+            horario_inicio=agora, horario_fim=agora + timedelta(hours=1),
+        )
+
+    def buscar(self, rota, termo, **extras):
+        resposta = self.cliente.get(rota, {'search': termo, **extras}, HTTP_ACCEPT='application/json')
+        self.assertEqual(resposta.status_code, 200)
+        return resposta.json()
+
+    def ids(self, rota, termo):
+        return [item['id'] for item in self.buscar(rota, termo)['results']]
+
+    def test_ordena_pela_relevancia(self):
+        # O nome pesa mais que a descrição
+        self.assertEqual(self.ids('/api/eventos/', 'python'), [self.conferencia.pk, self.semana.pk])
+        # Sem acento e por prefixo
+        self.assertEqual(self.ids('/api/eventos/', 'conferencia'), [self.conferencia.pk])
+        self.assertEqual(self.ids('/api/eventos/', 'gin'), [self.outro.pk])
+        self.assertEqual(self.ids('/api/atividades/', 'sessoes'), [self.atividade.pk])
+        # Operadores do FTS5 no termo não quebram a consulta
+        self.assertEqual(self.ids('/api/eventos/', 'python" (*'), [self.conferencia.pk, self.semana.pk])
+        self.assertEqual(self.ids('/api/eventos/', '!!!'), [])
+
+    def test_pagina_pelos_resultados(self):
+        pagina = self.buscar('/api/eventos/', 'python', page_size=1)
+        self.assertEqual([item['id'] for item in pagina['results']], [self.conferencia.pk])
+        pagina = self.cliente.get(pagina['next'], HTTP_ACCEPT='application/json').json()
+        self.assertEqual([item['id'] for item in pagina['results']], [self.semana.pk])
+        self.assertIsNone(pagina['next'])
+
+    def test_signals_mantem_o_indice(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            self.conferencia.nome = 'Congresso de Rust'
+            self.conferencia.save()
+            self.semana.delete()
+            # Apagar o evento apaga as atividades em cascata (post_delete de cada uma)
+            self.outro.delete()
+        self.assertEqual(self.ids('/api/eventos/', 'python'), [])
+        self.assertEqual(self.ids('/api/eventos/', 'rust'), [self.conferencia.pk])
+        self.assertEqual(self.ids('/api/atividades/', 'oficina'), [])
+
+    def test_reconstruir_depois_de_bulk_create(self):
+        agora = timezone.now()
+        Evento.objects.bulk_create([Evento(nome='Hackathon', descricao='-', local='Lab',
+                                           data_inicio=agora, data_fim=agora)])
+        self.assertEqual(self.ids('/api/eventos/', 'hackathon'), [])
+        call_command('reconstruir_busca', stdout=StringIO())
+        self.assertEqual(len(self.ids('/api/eventos/', 'hackathon')), 1)
+
+    def test_admin_usa_o_indice(self):
+        self.client.force_login(User.objects.create_superuser('admin_busca', 'admin@x.com', 'x'))
+        resposta = self.client.get(reverse('admin:gestaoEventos_evento_changelist'), {'q': 'python'})
+        self.assertEqual(list(resposta.context['cl'].result_list), [self.conferencia, self.semana])
+
+    @override_settings(BUSCA_BACKEND='gestaoEventos.busca.BuscaLike')
+    def test_backend_sem_indice(self):
+        self.assertEqual(sorted(self.ids('/api/eventos/', 'python')), [self.conferencia.pk, self.semana.pk])
+
+    def test_busca_dentro_de_subquery(self):
+        # Como subquery os aliases viram U0, U1...: o MATCH precisa acompanhar o alias do JOIN
+        encontrados = busca.backend().filtrar(Evento.objects.all(), 'python').values('pk')
+        self.assertEqual(set(Evento.objects.filter(pk__in=encontrados)), {self.conferencia, self.semana})
+
+    def test_busca_por_join_com_o_indice(self):
+        with CaptureQueriesContext(connection) as contexto:
+            self.ids('/api/eventos/', 'python')
+        sql = next(q['sql'] for q in contexto.captured_queries if 'MATCH' in q['sql'])
+        self.assertIn('INNER JOIN "gestaoEventos_busca_evento"', sql)
+        # Backends novos precisam implementar filtrar()
+        with self.assertRaises(TypeError):
+            busca.BackendBusca()
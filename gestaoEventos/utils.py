@@ -1,13 +1,181 @@
-from io import BytesIO
-from django.http import HttpResponse
+import gc
+from itertools import islice
+from tempfile import SpooledTemporaryFile
+
+from django.conf import settings
+from django.http import FileResponse
 from django.template.loader import get_template
+from pypdf import PdfReader
+from pypdf.generic import ArrayObject, DictionaryObject, IndirectObject, NameObject
 from xhtml2pdf import pisa
 
-def render_to_pdf(template_src, context_dict={}):
+# Até esse tamanho o PDF fica na memória; acima disso vai para um arquivo temporário em disco
+PDF_MEMORIA_MAX = getattr(settings, 'RELATORIOS_PDF_MEMORIA_MAX', 5 * 1024 * 1024)
+# Quantos registros cada bloco do relatório renderiza de uma vez
+PDF_TAMANHO_BLOCO = getattr(settings, 'RELATORIOS_PDF_BLOCO', 500)
+
+
+def arquivo_temporario():
+    return SpooledTemporaryFile(max_size=PDF_MEMORIA_MAX)
+
+
+def _resposta_pdf(arquivo):
+    """Devolve o arquivo em partes (FileResponse), sem copiar o PDF inteiro para a resposta."""
+    arquivo.seek(0)
+    return FileResponse(arquivo, content_type='application/pdf')
+
+
+def _blocos(queryset, tamanho):
+    """Percorre o queryset com .iterator() e devolve listas de `tamanho` registros."""
+    registros = queryset.iterator(chunk_size=tamanho)
+    while True:
+        bloco = list(islice(registros, tamanho))
+        if not bloco:
+            return
+        yield bloco
+
+
+class JuntadorPdf:
+    """
+    Junta PDFs gravando os objetos de cada um direto no arquivo de saída.
+
+    O PdfWriter do pypdf guarda todas as páginas na memória até o write()
+    final. Aqui cada PDF é lido, tem os objetos renumerados e escritos em
+    seguida, e é descartado: na memória fica só um PDF (um bloco) por vez,
+    mais os offsets da tabela xref. O catálogo (objeto 1) e a árvore de
+    páginas (objeto 2) são escritos no final.
+    """
+    CATALOGO, PAGINAS = 1, 2
+
+    def __init__(self, saida):
+        self.saida = saida
+        self.offsets = {}
+        self.proximo = 3
+        self.paginas = []
+        saida.write(b'%PDF-1.4\n%\xe2\xe3\xcf\xd3\n')
+
+    def adicionar(self, arquivo):
+        leitor = PdfReader(arquivo)
+        # (número, geração) no PDF lido -> número na saída
+        mapa, pendentes, paginas = {}, [], {}
+
+        def referencia(original):
+            chave = (original.idnum, original.generation)
+            if chave not in mapa:
+                mapa[chave] = self.proximo
+                self.proximo += 1
+                pendentes.append(original)
+            return IndirectObject(mapa[chave], 0, None)
+
+        def renumerar(objeto):
+            if isinstance(objeto, IndirectObject):
+                return referencia(objeto)
+            if isinstance(objeto, DictionaryObject):  # inclui StreamObject
+                for chave, valor in list(dict.items(objeto)):
+                    dict.__setitem__(objeto, chave, renumerar(valor))
+            elif isinstance(objeto, ArrayObject):
+                for i, valor in enumerate(list.__iter__(objeto)):
+                    list.__setitem__(objeto, i, renumerar(valor))
+            return objeto
+
+        # leitor.pages já traz nas páginas os atributos herdados (Resources, MediaBox...)
+        for pagina in leitor.pages:
+            numero = referencia(pagina.indirect_reference).idnum
+            paginas[numero] = pagina
+            self.paginas.append(numero)
+
+        while pendentes:
+            original = pendentes.pop()
+            numero = mapa[(original.idnum, original.generation)]
+            objeto = paginas.get(numero) or original.get_object()
+            if numero in paginas:
+                # O /Parent antigo levaria junto a árvore de páginas do PDF lido
+                dict.pop(objeto, NameObject('/Parent'), None)
+                renumerar(objeto)
+                objeto[NameObject('/Parent')] = IndirectObject(self.PAGINAS, 0, None)
+            else:
+                renumerar(objeto)
+            self._escrever(numero, objeto)
+
+    def _escrever(self, numero, objeto):
+        self.offsets[numero] = self.saida.tell()
+        self.saida.write(f'{numero} 0 obj\n'.encode())
+        if isinstance(objeto, bytes):
+            self.saida.write(objeto)
+        else:
+            objeto.write_to_stream(self.saida)
+        self.saida.write(b'\nendobj\n')
+
+    def finalizar(self):
+        kids = ' '.join(f'{numero} 0 R' for numero in self.paginas)
+        self._escrever(self.PAGINAS, f'<< /Type /Pages /Kids [{kids}] /Count {len(self.paginas)} >>'.encode())
+        self._escrever(self.CATALOGO, f'<< /Type /Catalog /Pages {self.PAGINAS} 0 R >>'.encode())
+
+        inicio_xref = self.saida.tell()
+        linhas = [f'xref\n0 {self.proximo}\n', '0000000000 65535 f \n']
+        linhas += [f'{self.offsets[numero]:010d} 00000 n \n' for numero in range(1, self.proximo)]
+        linhas.append(f'trailer\n<< /Size {self.proximo} /Root {self.CATALOGO} 0 R >>\nstartxref\n{inicio_xref}\n%%EOF\n')
+        self.saida.write(''.join(linhas).encode())
+
+
+def gerar_pdf_em_blocos(template_src, context_dict, chave, queryset, tamanho_bloco=None):
+    """
+    Renderiza o template em PDF, em blocos, num arquivo temporário (ou None se o pisa falhar).
+
+    Os registros de `queryset` são lidos em blocos e cada bloco é renderizado
+    (template + pisa) como um PDF separado, com `chave` apontando para a lista
+    do bloco. Cada PDF de bloco é gravado no arquivo temporário de saída assim
+    que fica pronto (JuntadorPdf), então a memória fica limitada ao tamanho de
+    um bloco e não do relatório.
+
+    No contexto de cada bloco vão também:
+      total_registros   -> total do queryset (para o cabeçalho)
+      ocultar_cabecalho -> True a partir do segundo bloco
+      ocultar_resumo    -> True em todos os blocos menos o último
+    """
+    tamanho_bloco = tamanho_bloco or PDF_TAMANHO_BLOCO
     template = get_template(template_src)
-    html  = template.render(context_dict)
-    result = BytesIO()
-    pdf = pisa.pisaDocument(BytesIO(html.encode("UTF-8")), result)
-    if not pdf.err:
-        return HttpResponse(result.getvalue(), content_type='application/pdf')
-    return None
\ No newline at end of file
+    total = queryset.count()
+
+    result = arquivo_temporario()
+    juntador = JuntadorPdf(result)
+    blocos = _blocos(queryset, tamanho_bloco)
+    bloco = next(blocos, [])
+    primeiro = True
+
+    while True:
+        proximo = next(blocos, None)
+        contexto = {
+            **context_dict,
+            chave: bloco,
+            'total_registros': total,
+            'ocultar_cabecalho': not primeiro,
+            'ocultar_resumo': proximo is not None,
+        }
+
+        with arquivo_temporario() as parcial:
+            pdf = pisa.pisaDocument(template.render(contexto), parcial, encoding='UTF-8')
+            if pdf.err:
+                result.close()
+                return None
+            parcial.seek(0)
+            juntador.adicionar(parcial)
+        # O DOM do pisa (minidom/html5lib) é cheio de referências circulares: sem isso o bloco
+        # anterior só sai da memória quando o coletor de lixo resolver rodar
+        del pdf
+        gc.collect()
+
+        if proximo is None:
+            break
+        bloco, primeiro = proximo, False
+
+    juntador.finalizar()
+    result.seek(0)
+    return result
+
+
+def render_to_pdf_em_blocos(template_src, context_dict, chave, queryset, tamanho_bloco=None):
+    result = gerar_pdf_em_blocos(template_src, context_dict, chave, queryset, tamanho_bloco)
+    if result is not None:
+        return _resposta_pdf(result)
+    return None
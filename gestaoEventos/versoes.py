@@ -0,0 +1,68 @@
+from django.db import connection, transaction
+from django.db.models import F
+from django.utils import timezone
+
+from .models import VersaoTabela
+
+# ---------------------------------------------------------
+# Versão de dados por tabela
+# ---------------------------------------------------------
+# Cada alteração em uma tabela monitorada incrementa o contador dela
+# (ver signals.py). Quem guarda algo calculado a partir dessas tabelas
+# (cache de PDFs, ETags) usa as versões como parte da chave: se a versão
+# mudou, a chave muda e o conteúdo antigo simplesmente deixa de ser usado.
+#
+# Operações em massa (update()/bulk_create()) não disparam signals, então
+# quem as usa deve chamar invalidar() depois.
+#
+# Os signals usam invalidar_no_commit(): o UPDATE da versão sai da transação
+# que grava os dados (senão toda inscrição disputaria a mesma linha de
+# VersaoTabela até o commit) e cada tabela sobe uma vez só por transação,
+# mesmo que um delete em cascata dispare o signal para centenas de linhas.
+
+EVENTO = 'gestaoEventos.evento'
+ATIVIDADE = 'gestaoEventos.atividade'
+INSCRICAO = 'gestaoEventos.usereventos'
+PERFIL = 'gestaoEventos.perfil'
+USUARIO = 'auth.user'
+GRUPO = 'auth.group'
+
+
+def invalidar(*tabelas):
+    """Incrementa a versão das tabelas informadas."""
+    agora = timezone.now()
+    VersaoTabela.objects.bulk_create(
+        [VersaoTabela(tabela=tabela) for tabela in tabelas], ignore_conflicts=True
+    )
+    VersaoTabela.objects.filter(tabela__in=tabelas).update(versao=F('versao') + 1, atualizado_em=agora)
+
+
+def invalidar_no_commit(*tabelas):
+    """Como invalidar(), mas depois do commit e uma vez por tabela na transação."""
+    # As tabelas se acumulam na conexão: o primeiro callback a rodar aplica todas, os outros não fazem nada
+    connection.__dict__.setdefault('_versoes_pendentes', set()).update(tabelas)
+    transaction.on_commit(_aplicar_pendentes)  # fora de uma transação, roda na hora
+
+
+def _aplicar_pendentes():
+    pendentes = connection.__dict__.get('_versoes_pendentes')
+    if pendentes:
+        tabelas = sorted(pendentes)
+        pendentes.clear()
+        invalidar(*tabelas)
+
+
+def obter(*tabelas):
+    """
+    Devolve ({tabela: versao}, data da última alteração) em uma única query.
+    Tabelas que nunca foram alteradas aparecem com versão 0.
+    """
+    versoes = dict.fromkeys(tabelas, 0)
+    ultima_alteracao = None
+    for tabela, versao, atualizado_em in VersaoTabela.objects.filter(tabela__in=tabelas).values_list(
+        'tabela', 'versao', 'atualizado_em'
+    ):
+        versoes[tabela] = versao
+        if ultima_alteracao is None or atualizado_em > ultima_alteracao:
+            ultima_alteracao = atualizado_em
+    return versoes, ultima_alteracao
@@ -1,53 +1,235 @@
+import os
+
 from rest_framework import viewsets, status, permissions
 from rest_framework.decorators import action
+from rest_framework.exceptions import ValidationError
 from rest_framework.response import Response
-from django.contrib.auth.models import User, Group
+from django.contrib.auth.models import User
+from django.http import FileResponse, Http404, HttpResponse, JsonResponse
 from django.shortcuts import get_object_or_404
+from django.utils import timezone
+from django.utils.dateparse import parse_date, parse_datetime
 # para gerar o pdf:
-from .utils import render_to_pdf
+from .relatorios import render_relatorio
+from . import estatisticas, inscricoes, metricas, tarefas, versoes
+from .busca import BuscaTextoFilter
+from .cache_api import CacheHttpMixin, com_cache_http
 from django.contrib.auth.decorators import user_passes_test
 from django.db.models import Prefetch
+from django_filters.rest_framework import DjangoFilterBackend
 
 # Importando models e serializers
-from .models import Evento, Atividade, UserEventos, Perfil
+from .models import Evento, Atividade, UserEventos, TarefaRelatorio
+from .permissoes import IsStaff, is_staff_check
+from .pagination import EventoPaginacao, AtividadePaginacao, InscricaoPaginacao, UsuarioPaginacao
 from .serializers import (
     UserSerializer, 
     EventoSerializer, 
     AtividadeSerializer, 
     UserEventosSerializer,
-    EventoDashboardSerializer
+    EventoDashboardSerializer,
+    EventoResumoSerializer,
+    InscricaoLoteSerializer,
+    MudancaStatusSerializer
 )
 
-class UserViewSet(viewsets.ModelViewSet):
+class CamposDinamicosMixin:
+    """
+    Permite ao cliente escolher o que vem na resposta:
+      ?fields=id,nome          -> só esses campos
+      ?expand=atividades       -> inclui campos "de detalhe" (aninhados/pesados)
+
+    Na listagem os campos de Meta.campos_detalhe do serializer ficam de fora por
+    padrão. A mesma escolha define o select_related/prefetch_related/only() do
+    queryset, então o cliente só paga pelas colunas e joins que pediu.
+    """
+    # Campo do serializer -> colunas usadas no only() (quando não é um campo direto do model)
+    colunas_por_campo = {}
+
+    def get_prefetches(self):
+        """Campo aninhado do serializer -> Prefetch que ele precisa."""
+        return {}
+
+    def _parametro_lista(self, nome):
+        valor = self.request.query_params.get(nome, '')
+        return {item.strip() for item in valor.split(',') if item.strip()}
+
+    def campos_solicitados(self):
+        """Lista final de campos do serializer para esta requisição (None = todos)."""
+        if self.request is None or self.action not in ('list', 'retrieve'):
+            return None
+
+        meta = self.get_serializer_class().Meta
+        detalhe = getattr(meta, 'campos_detalhe', ())
+        fields = self._parametro_lista('fields')
+        expand = self._parametro_lista('expand')
+
+        if fields:
+            base = fields
+        elif self.action == 'list':
+            base = [campo for campo in meta.fields if campo not in detalhe]
+        else:
+            base = meta.fields
+
+        return [campo for campo in meta.fields if campo in base or campo in expand]
+
+    def get_serializer_context(self):
+        context = super().get_serializer_context()
+        context['campos'] = self.campos_solicitados()
+        return context
+
+    def otimizar_queryset(self, queryset):
+        """Aplica os joins e o only() de acordo com os campos solicitados."""
+        campos = self.campos_solicitados()
+        if campos is None:
+            return queryset
+
+        model = queryset.model
+        colunas_diretas = {f.name for f in model._meta.concrete_fields}
+        prefetches = self.get_prefetches()
+
+        # As colunas da ordenação do cursor sempre precisam vir carregadas
+        ordenacao = getattr(self.pagination_class, 'ordering', ())
+        colunas = {campo.lstrip('-') for campo in ordenacao}
+        relacionados = set()
+        aninhados = []
+
+        for campo in campos:
+            if campo in prefetches:
+                aninhados.append(prefetches[campo])
+            elif campo in self.colunas_por_campo:
+                for coluna in self.colunas_por_campo[campo]:
+                    colunas.add(coluna)
+                    if '__' in coluna:
+                        relacionados.add(coluna.rsplit('__', 1)[0])
+            elif campo in colunas_diretas:
+                colunas.add(campo)
+
+        if relacionados:
+            queryset = queryset.select_related(*relacionados)
+        if aninhados:
+            queryset = queryset.prefetch_related(*aninhados)
+        return queryset.only(*colunas)
+
+
+class UserViewSet(CamposDinamicosMixin, viewsets.ModelViewSet):
     """
     Endpoint para gerenciar participantes (Users + Perfil).
     Rota: /api/participantes/ 
     """
     queryset = User.objects.all()
     serializer_class = UserSerializer
+    pagination_class = UsuarioPaginacao
     # Permite que qualquer um se cadastre (POST), mas só autenticados veem a lista
     permission_classes = [permissions.IsAuthenticatedOrReadOnly]
 
-class EventoViewSet(viewsets.ModelViewSet):
+    colunas_por_campo = {
+        'perfil': ['perfil__celular', 'perfil__tipo'],
+    }
+
+    def get_prefetches(self):
+        return {
+            'inscricoes': Prefetch('usereventos_set', queryset=UserEventos.objects.select_related('user', 'evento')),
+            'atividades_lideradas': Prefetch('atividades_responsavel', queryset=Atividade.objects.select_related('responsavel', 'evento')),
+        }
+
+    def get_queryset(self):
+        # Carrega só o perfil e os aninhados que foram pedidos, em um número fixo de queries.
+        # O join com o perfil vem de colunas_por_campo: sem 'perfil' no ?fields=, não há join
+        if self.action in ('list', 'retrieve'):
+            return self.otimizar_queryset(User.objects.all())
+        return User.objects.select_related('perfil')
+
+class EventoViewSet(CacheHttpMixin, CamposDinamicosMixin, viewsets.ModelViewSet):
     """
     Endpoint principal de Eventos.
     Rota: /api/eventos/ 
     """
     queryset = Evento.objects.all()
     serializer_class = EventoSerializer
+    pagination_class = EventoPaginacao
     # Leitura é pública, mas criar/editar exige login 
     permission_classes = [permissions.IsAuthenticatedOrReadOnly]
 
+    # ?search= usa o índice textual (busca.py), ordenado pela relevância
+    filter_backends = [DjangoFilterBackend, BuscaTextoFilter]
     filterset_fields = ['local', 'data_inicio']
 
+    colunas_por_campo = {
+        'carga_horaria_total': ['carga_horaria'],
+    }
+
+    # Tabelas de que cada leitura depende (ETag/cache, ver cache_api.py)
+    tabelas_cache = {
+        'list': (versoes.EVENTO, versoes.ATIVIDADE, versoes.USUARIO),
+        'retrieve': (versoes.EVENTO, versoes.ATIVIDADE, versoes.USUARIO),
+        'dashboard': (versoes.EVENTO, versoes.ATIVIDADE, versoes.USUARIO, versoes.INSCRICAO),
+        'dashboards': (versoes.EVENTO, versoes.ATIVIDADE, versoes.INSCRICAO),
+        'estatisticas': (versoes.EVENTO, versoes.ATIVIDADE, versoes.INSCRICAO),
+        'estatisticas_gerais': (versoes.EVENTO, versoes.ATIVIDADE, versoes.INSCRICAO),
+    }
+
+    def get_prefetches(self):
+        return {
+            'atividades': Prefetch('atividades', queryset=Atividade.objects.select_related('responsavel', 'evento')),
+        }
+
+    def get_queryset(self):
+        """
+        Monta o queryset de acordo com a action, para que list/retrieve/dashboard
+        rodem sempre com o mesmo número de queries, independente do volume.
+        """
+        queryset = Evento.objects.all()
+
+        if self.action in ('list', 'retrieve'):
+            queryset = self.otimizar_queryset(queryset)
+
+        if self.action == 'dashboard':
+            queryset = queryset.prefetch_related(
+                self.get_prefetches()['atividades'],
+                Prefetch('usereventos_set', queryset=UserEventos.objects.select_related('user', 'evento')),
+            )
+
+        return queryset
+
+    def filtros_periodo(self, campo):
+        """
+        Filtros de ?inicio= e ?fim= sobre o campo de data `campo`: aceita data
+        (dia inteiro) ou data e hora. Data inválida -> 400.
+        """
+        filtros = {}
+        for parametro, comparacao in (('inicio', 'gte'), ('fim', 'lte')):
+            valor = self.request.query_params.get(parametro)
+            if not valor:
+                continue
+            try:
+                data = parse_date(valor)
+                data_hora = None if data else parse_datetime(valor)
+            except ValueError:
+                data = data_hora = None
+            if data:
+                filtros[f'{campo}__date__{comparacao}'] = data
+            elif data_hora:
+                if timezone.is_naive(data_hora):
+                    data_hora = timezone.make_aware(data_hora)
+                filtros[f'{campo}__{comparacao}'] = data_hora
+            else:
+                raise ValidationError({parametro: 'Informe uma data (AAAA-MM-DD) ou data e hora.'})
+        return filtros
+
+    def resposta_paginada(self, queryset, serializer_class, paginador):
+        """Pagina as listas das rotas aninhadas com o cursor próprio de cada modelo."""
+        pagina = paginador.paginate_queryset(queryset, self.request, view=self)
+        serializer = serializer_class(pagina, many=True)
+        return paginador.get_paginated_response(serializer.data)
+
     # Rota: /api/eventos/{id}/atividades/ 
     @action(detail=True, methods=['get'])
     def atividades(self, request, pk=None):
         """Lista apenas as atividades de um evento específico"""
         evento = self.get_object()
-        atividades = Atividade.objects.filter(evento=evento)
-        serializer = AtividadeSerializer(atividades, many=True)
-        return Response(serializer.data)
+        atividades = Atividade.objects.filter(evento=evento).select_related('responsavel', 'evento')
+        return self.resposta_paginada(atividades, AtividadeSerializer, AtividadePaginacao())
 
     # Rota: /api/eventos/{id}/participantes/ 
     @action(detail=True, methods=['get', 'post'])
@@ -60,26 +242,60 @@ class EventoViewSet(viewsets.ModelViewSet):
 
         if request.method == 'GET':
             # Retorna quem está inscrito
-            inscricoes = UserEventos.objects.filter(evento=evento)
-            serializer = UserEventosSerializer(inscricoes, many=True)
-            return Response(serializer.data)
+            inscritos = UserEventos.objects.filter(evento=evento).select_related('user', 'evento')
+            return self.resposta_paginada(inscritos, UserEventosSerializer, InscricaoPaginacao())
 
         elif request.method == 'POST':
-            # Inscreve o usuário logado (request.user)
-            # Verifica se já está inscrito para evitar duplicidade
-            if UserEventos.objects.filter(user=request.user, evento=evento).exists():
-                return Response(
-                    {"mensagem": "Você já está inscrito neste evento."}, 
-                    status=status.HTTP_400_BAD_REQUEST
-                )
-            
-            # Cria a inscrição
-            inscricao = UserEventos.objects.create(user=request.user, evento=evento)
+            # Inscreve o usuário logado (request.user) com um único INSERT;
+            # duplicidade e capacidade são garantidas pelo banco (ver inscricoes.py)
+            try:
+                inscricao = inscricoes.inscrever(request.user, evento)
+            except inscricoes.JaInscrito as erro:
+                return Response({"mensagem": str(erro)}, status=status.HTTP_400_BAD_REQUEST)
+            except inscricoes.EventoLotado as erro:
+                return Response({"mensagem": str(erro)}, status=status.HTTP_409_CONFLICT)
+
             serializer = UserEventosSerializer(inscricao)
             return Response(serializer.data, status=status.HTTP_201_CREATED)
 
+    # Rota: /api/eventos/{id}/participantes/lote/ 
+    @action(detail=True, methods=['post'], url_path='participantes/lote',
+            permission_classes=[IsStaff])
+    def participantes_lote(self, request, pk=None):
+        """
+        Inscreve vários usuários de uma vez (organizadores).
+        Corpo: {"ids": [...], "usernames": [...], "status": "C"}
+        """
+        evento = self.get_object()
+        serializer = InscricaoLoteSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+
+        resultado = inscricoes.inscrever_em_massa(evento, **serializer.validated_data)
+        codigo = status.HTTP_201_CREATED if resultado['criadas'] else status.HTTP_200_OK
+        return Response(resultado, status=codigo)
+
+    # Rota: /api/eventos/{id}/participantes/status/ 
+    @action(detail=True, methods=['post'], url_path='participantes/status',
+            permission_classes=[IsStaff])
+    def participantes_status(self, request, pk=None):
+        """
+        Muda o status das inscrições do evento em massa (organizadores).
+        Corpo: {"de": "P", "para": "C", "ids": [ids de usuários, opcional]}
+        """
+        evento = self.get_object()
+        serializer = MudancaStatusSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        dados = serializer.validated_data
+
+        alvo = UserEventos.objects.filter(evento=evento)
+        if 'ids' in dados:
+            alvo = alvo.filter(user_id__in=dados['ids'])
+        resultado = inscricoes.alterar_status(alvo, dados['para'], de=dados.get('de'))
+        return Response({'atualizadas': resultado['atualizadas'], 'sem_vaga': resultado['sem_vaga']})
+
     # Rota: /api/eventos/{id}/dashboard/ 
     @action(detail=True, methods=['get'])
+    @com_cache_http
     def dashboard(self, request, pk=None):
         """Retorna uma visão completa do evento (Atividades + Participantes)"""
         evento = self.get_object()
@@ -87,14 +303,80 @@ class EventoViewSet(viewsets.ModelViewSet):
         serializer = EventoDashboardSerializer(evento)
         return Response(serializer.data)
 
-class AtividadeViewSet(viewsets.ModelViewSet):
+    # Rota: /api/eventos/dashboard/?ids=1,2,3 ou ?inicio=2025-01-01&fim=2025-12-31
+    @action(detail=False, methods=['get'], url_path='dashboard')
+    @com_cache_http
+    def dashboards(self, request):
+        """
+        Dashboard de vários eventos em uma resposta (paginada), com os totais de
+        inscrições e atividades calculados pelo banco: uma query por página.
+        """
+        eventos = Evento.objects.defer('descricao').com_totais().filter(**self.filtros_periodo('data_inicio'))
+
+        ids = self._parametro_lista('ids')
+        if ids:
+            if not all(item.isdigit() for item in ids):
+                raise ValidationError({'ids': 'Informe uma lista de números separados por vírgula.'})
+            eventos = eventos.filter(pk__in=[int(item) for item in ids])
+
+        return self.resposta_paginada(eventos, EventoResumoSerializer, EventoPaginacao())
+
+    # Rota: /api/eventos/{id}/estatisticas/?inicio=2025-01-01&fim=2025-12-31
+    @action(detail=True, methods=['get'])
+    @com_cache_http
+    def estatisticas(self, request, pk=None):
+        """
+        Totais do evento calculados pelo banco: inscrições por status e por dia
+        (período sobre data_inscricao), atividades e horas por tipo (horario_inicio).
+        """
+        evento = self.get_object()
+        dados = estatisticas.agregar(
+            UserEventos.objects.filter(evento=evento, **self.filtros_periodo('data_inscricao')),
+            Atividade.objects.filter(evento=evento, **self.filtros_periodo('horario_inicio')),
+        )
+        return Response({'evento': evento.pk, **dados})
+
+    # Rota: /api/eventos/estatisticas/?inicio=2025-01-01&fim=2025-12-31
+    @action(detail=False, methods=['get'], url_path='estatisticas')
+    @com_cache_http
+    def estatisticas_gerais(self, request):
+        """
+        Totais de todos os eventos, calculados pelo banco. O período vale para
+        a data de cada registro: data_inicio dos eventos, data_inscricao das
+        inscrições e horario_inicio das atividades.
+        """
+        dados = estatisticas.agregar(
+            UserEventos.objects.filter(**self.filtros_periodo('data_inscricao')),
+            Atividade.objects.filter(**self.filtros_periodo('horario_inicio')),
+        )
+        total_eventos = Evento.objects.filter(**self.filtros_periodo('data_inicio')).count()
+        return Response({'eventos': total_eventos, **dados})
+
+class AtividadeViewSet(CacheHttpMixin, CamposDinamicosMixin, viewsets.ModelViewSet):
     """
     Endpoint para gerenciar Atividades.
     Rota: /api/atividades/ 
     """
-    queryset = Atividade.objects.all()
+    queryset = Atividade.objects.select_related('responsavel', 'evento')
     serializer_class = AtividadeSerializer
+    pagination_class = AtividadePaginacao
     permission_classes = [permissions.IsAuthenticatedOrReadOnly]
+    filter_backends = [DjangoFilterBackend, BuscaTextoFilter]
+
+    colunas_por_campo = {
+        'evento_titulo': ['evento', 'evento__nome'],
+        'responsavel_nome': ['responsavel', 'responsavel__username'],
+    }
+
+    tabelas_cache = {
+        'list': (versoes.ATIVIDADE, versoes.EVENTO, versoes.USUARIO),
+        'retrieve': (versoes.ATIVIDADE, versoes.EVENTO, versoes.USUARIO),
+    }
+
+    def get_queryset(self):
+        if self.action in ('list', 'retrieve'):
+            return self.otimizar_queryset(Atividade.objects.all())
+        return Atividade.objects.select_related('responsavel', 'evento')
 
     # Rota: /api/atividades/{id}/responsavel/ 
     @action(detail=True, methods=['patch'])
@@ -115,92 +397,70 @@ class AtividadeViewSet(viewsets.ModelViewSet):
 
 # ------------------ Funções para criar o pdf ----------------
 
-# Função auxiliar para verificar se é staff
-
-# No início do arquivo views.py
-
-def is_staff_check(user):
-    # 1. Se não estiver logado, barra direto
-    if not user.is_authenticated:
-        return False
-        
-    # 2. Se for Superusuário (admin geral), LIBERA GERAL
-    if user.is_superuser:
-        return True
-
-    # 3. Se for usuário comum, verifica se tem perfil e se é do tipo Staff ('O')
-    if hasattr(user, 'perfil') and user.perfil.is_grupo_staff:
-        return True
-        
-    return False
-
-# Desativei para usar o SuperUser
-'''def is_staff_check(user):
-    return user.is_authenticated and hasattr(user, 'perfil') and user.perfil.is_grupo_staff'''
+def responder_relatorio(request, tipo, parametros=None):
+    """
+    Gera o relatório na hora (PDF) ou, com ?assincrono=1, coloca na fila e
+    devolve o id da tarefa para o cliente acompanhar e baixar depois.
+    """
+    if request.GET.get('assincrono'):
+        tarefa = tarefas.enfileirar(tipo, parametros, request.user)
+        return JsonResponse(tarefas.status_tarefa(tarefa, request), status=202)
+    return render_relatorio(tipo, parametros, request)
 
 # 1. Relatório de Eventos
 @user_passes_test(is_staff_check)
 def relatorio_eventos(request):
-    '''eventos = Evento.objects.all().order_by('data_inicio').prefetch_related(
-        'atividade_set', 
-        'usereventos_set__user'
-    )'''
-    eventos = Evento.objects.all().order_by('data_inicio')
-
-
-    context = {'eventos': eventos, 'titulo': 'Relatório Geral de Eventos'}
-    return render_to_pdf('relatorios/relatorio_eventos.html', context)
+    # Queryset com prefetch em relatorios.py (o prefetch é feito a cada bloco do .iterator())
+    return responder_relatorio(request, 'eventos')
 
 # 2. Relatório de Atividades
 @user_passes_test(is_staff_check)
 def relatorio_atividades(request):
-    # Busca todas as atividades, já trazendo os dados relacionados para ser rápido
-    atividades = Atividade.objects.all().select_related('evento', 'responsavel').order_by('horario_inicio')
-    
-    context = {
-        'atividades': atividades, 
-        'titulo': 'Relatório Geral de Atividades'
-    }
-    
-    return render_to_pdf('relatorios/relatorio_atividades.html', context)
+    return responder_relatorio(request, 'atividades')
 
 # 3. Relatório de Participantes
 @user_passes_test(is_staff_check)
 def relatorio_participantes(request):
-    # Pega usuários que são participantes (P)
-    # Prefetch para otimizar a busca das inscrições (usereventos) e responsabilidades (atividade_set)
-    participantes = User.objects.filter(perfil__tipo='P').order_by('first_name').prefetch_related(
-        'usereventos_set__evento'
-    )
-
-    context = {'participantes': participantes, 'titulo': 'Relatório de Participantes'}
-    return render_to_pdf('relatorios/relatorio_participantes.html', context)
+    # Usuários do tipo Participante (P), com inscrições e atividades em prefetch
+    return responder_relatorio(request, 'participantes')
 
 # 4. Relatório de Inscrições
 @user_passes_test(is_staff_check)
 def relatorio_inscricoes(request):
-    inscricoes = UserEventos.objects.all().select_related('user', 'evento').order_by('-data_inscricao')
+    # Reutiliza o mesmo HTML que criamos para a Action do Admin, renderizado em blocos
+    return responder_relatorio(request, 'inscricoes')
 
-    context = {
-        'inscricoes': inscricoes,
-        'titulo': 'Relatório Geral de Inscrições'
-    }
+@user_passes_test(is_staff_check)
+def relatorio_grupos_geral(request):
+    return responder_relatorio(request, 'grupos')
+
+# ------------------ Fila de relatórios ----------------
 
-    # Reutiliza o mesmo HTML que criamos para a Action do Admin
-    return render_to_pdf('relatorios/relatorio_inscricoes.html', context)
+def _tarefa_do_usuario(request, pk):
+    # Cada um acompanha as próprias tarefas; superusuário vê todas
+    tarefa = get_object_or_404(TarefaRelatorio, pk=pk)
+    if not request.user.is_superuser and tarefa.solicitante_id != request.user.pk:
+        raise Http404
+    return tarefa
 
+# Rota: /relatorios/tarefas/{id}/
 @user_passes_test(is_staff_check)
-def relatorio_grupos_geral(request):
-    # Busca TODOS os grupos com a otimização de consulta
-    grupos = Group.objects.all().prefetch_related(
-        'user_set',                           
-        'user_set__usereventos_set__evento',  
-        'user_set__atividades_responsavel'
-    )
-    
-    context = {
-        'grupos': grupos, 
-        'titulo': 'Relatório Geral de Grupos'
-    }
-    # Reutiliza o mesmo HTML bonito que já criamos
-    return render_to_pdf('relatorios/relatorio_grupos.html', context)
\ No newline at end of file
+def relatorio_tarefa_status(request, pk):
+    tarefa = _tarefa_do_usuario(request, pk)
+    return JsonResponse(tarefas.status_tarefa(tarefa, request))
+
+# Rota: /relatorios/tarefas/{id}/download/
+@user_passes_test(is_staff_check)
+def relatorio_tarefa_download(request, pk):
+    tarefa = _tarefa_do_usuario(request, pk)
+    if tarefa.status != 'C' or not tarefa.arquivo:
+        return JsonResponse(tarefas.status_tarefa(tarefa, request), status=409)
+    # O Content-Type sai da extensão do arquivo (PDF dos relatórios, ZIP dos certificados)
+    return FileResponse(tarefa.arquivo.open('rb'), filename=os.path.basename(tarefa.arquivo.name))
+
+# ------------------ Métricas (Prometheus) ----------------
+
+# Rota: /metricas/ (números deste processo, ver metricas.py)
+@user_passes_test(is_staff_check)
+def metricas_prometheus(request):
+    return HttpResponse(metricas.registro.exportar(), content_type='text/plain; version=0.0.4; charset=utf-8')
@@ -47,12 +47,16 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    # Primeiro da lista: mede a requisição inteira (latência, queries, tamanho; ver /metricas/)
+    'gestaoEventos.metricas.MetricasMiddleware',
     'corsheaders.middleware.CorsMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
     'django.middleware.csrf.CsrfViewMiddleware',
     'django.contrib.auth.middleware.AuthenticationMiddleware',
+    # ?perfilar=1 (staff): roda a requisição no cProfile (ver gestaoEventos/perfilador.py)
+    'gestaoEventos.perfilador.PerfiladorMiddleware',
     'django.contrib.messages.middleware.MessageMiddleware',
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
 ]
@@ -130,6 +134,10 @@ STATICFILES_DIRS = [
 
 STATIC_ROOT = BASE_DIR / 'staticfiles'
 
+# Arquivos gerados pelo sistema (PDFs da fila de relatórios)
+MEDIA_URL = 'media/'
+MEDIA_ROOT = BASE_DIR / 'media'
+
 
 
 # Default primary key field type
@@ -157,6 +165,12 @@ REST_FRAMEWORK = {
     'DEFAULT_PERMISSION_CLASSES': [
         'rest_framework.permissions.IsAuthenticatedOrReadOnly',
     ],
+
+    # Paginação por cursor (cada ViewSet define sua ordenação em pagination.py)
+    'DEFAULT_PAGINATION_CLASS': 'gestaoEventos.pagination.CursorPaginacaoPadrao',
+    'PAGE_SIZE': 50,
+    # Limite para o ?page_size= enviado pelo cliente
+    'MAX_PAGE_SIZE': 500,
 }
 
 # Configurações opcionais (Título e descrição da API)
@@ -210,6 +224,8 @@ JAZZMIN_SETTINGS = {
         "gestaoEventos.UserEventos": "fas fa-pen",
         "gestaoEventos.Evento": "fas fa-calendar",
         "gestaoEventos.Perfil": "fas fa-user-tag",
+        "gestaoEventos.TarefaRelatorio": "fas fa-tasks",
+        "gestaoEventos.PerfilExecucao": "fas fa-stopwatch",
 
         # icone do token
         "authtoken.TokenProxy": "fas fa-key",
@@ -250,4 +266,52 @@ JAZZMIN_UI_TWEAKS = {
     "actions_sticky_top": False
 }
 
-LOGIN_URL = '/admin/login/'
\ No newline at end of file
+LOGIN_URL = '/admin/login/'
+
+# Relatórios em PDF: registros por bloco e limite de memória antes de usar arquivo temporário
+RELATORIOS_PDF_BLOCO = 500
+RELATORIOS_PDF_MEMORIA_MAX = 5 * 1024 * 1024
+# Cache em disco dos PDFs (chave = dados da versão atual das tabelas; LRU por tamanho)
+RELATORIOS_CACHE_ATIVO = True
+RELATORIOS_CACHE_DIR = BASE_DIR / 'cache' / 'relatorios'
+RELATORIOS_CACHE_MAX_BYTES = 200 * 1024 * 1024
+# Nas actions do admin, seleções maiores que isso vão para a fila (comando processar_relatorios)
+RELATORIOS_LIMITE_SINCRONO = 200
+# Processos usados na emissão de certificados individuais (action ZIP do admin)
+CERTIFICADOS_WORKERS = 2
+# Segundos que os números do dashboard do admin ficam em cache (os contadores já limpam o cache ao mudar)
+DASHBOARD_CACHE_SEGUNDOS = 60
+# Máximo de usuários por requisição em POST /api/eventos/{id}/participantes/lote/
+INSCRICOES_LOTE_MAX = 5000
+
+# Caches: 'api' guarda as respostas de leitura da API (chave = ETag, ver gestaoEventos/cache_api.py).
+# Troque o BACKEND (ex.: Redis) para compartilhar entre processos; a expulsão segue o backend.
+CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+    },
+    'api': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        'LOCATION': 'gestaoEventos-api',
+        'TIMEOUT': 600,
+        'OPTIONS': {'MAX_ENTRIES': 1000, 'CULL_FREQUENCY': 4},
+    },
+}
+# Alias de CACHES usado pela API (se não existir, só o ETag/304 funciona)
+API_CACHE = 'api'
+
+# Métricas por requisição (gestaoEventos/metricas.py, expostas em /metricas/)
+METRICAS_ATIVAS = True
+# Requisições acima disso (ms) vão para o log "gestaoEventos.metricas" com os SQLs mais repetidos
+METRICAS_LENTA_MS = 1000
+# Um mesmo SQL executado esse número de vezes numa requisição conta como N+1
+METRICAS_LIMITE_REPETICOES = 5
+
+# Perfil sob demanda (?perfilar=1 ou cabeçalho X-Perfilar, só staff): perfis guardados e linhas do pstats
+PERFILADOR_ATIVO = True
+PERFILADOR_MAX = 100
+PERFILADOR_LINHAS = 60
+
+# Busca textual (?search= e pesquisa do admin, ver gestaoEventos/busca.py). None = FTS5 no SQLite,
+# icontains nos outros bancos; ou o caminho de uma subclasse de gestaoEventos.busca.BackendBusca
+BUSCA_BACKEND = None
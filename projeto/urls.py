@@ -14,7 +14,8 @@ from drf_spectacular.views import (
 # Importações das suas Views (Use os nomes do seu projeto)
 from gestaoEventos.views import (
 EventoViewSet, AtividadeViewSet, UserViewSet,
-relatorio_eventos, relatorio_atividades, relatorio_participantes, relatorio_inscricoes, relatorio_grupos_geral) 
+relatorio_eventos, relatorio_atividades, relatorio_participantes, relatorio_inscricoes, relatorio_grupos_geral,
+relatorio_tarefa_status, relatorio_tarefa_download, metricas_prometheus) 
 
 # --- FORÇAR O LOGIN ---
 from django.contrib.auth import logout
@@ -74,4 +75,11 @@ urlpatterns = [
     path('relatorios/participantes/', relatorio_participantes, name='relatorio_participantes'),
     path('relatorios/inscricoes/', relatorio_inscricoes, name='relatorio_inscricoes'),
     path('relatorios/grupos/geral/', relatorio_grupos_geral, name='relatorio_grupos_geral'),
+
+    # Fila de relatórios (?assincrono=1 nas rotas acima devolve o id da tarefa)
+    path('relatorios/tarefas/<int:pk>/', relatorio_tarefa_status, name='relatorio_tarefa_status'),
+    path('relatorios/tarefas/<int:pk>/download/', relatorio_tarefa_download, name='relatorio_tarefa_download'),
+
+    # Métricas por view no formato do Prometheus (staff)
+    path('metricas/', metricas_prometheus, name='metricas'),
 ]